@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:52:09 2026
+
+@author: keziah
+
+Benchmarks for StoryTeller's hot paths, run without a display.
+
+Synthetic story libraries and documents are generated in a work directory
+(and reused on later runs), each benchmark is timed, and the results are
+written as JSON, so that runs can be compared over time.
+
+Usage
+-----
+    python benchmarks/bench.py --output results.json
+    python benchmarks/bench.py --library-sizes 10 1000 --compare old.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import date, datetime, timedelta
+
+# must be set before Qt is imported
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QEventLoop, QTimer, QT_VERSION_STR, PYQT_VERSION_STR
+
+_wordList = ("the a of and to in was he she it that his her with as for on at by "
+             "story night house river stone light dark voice hand door window "
+             "said walked looked remembered found under over again never always "
+             "quickly slowly quietly suddenly old young small great last first").split()
+
+_htmlHeader = ('<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.0//EN" '
+               '"http://www.w3.org/TR/REC-html40/strict.dtd">\n'
+               '<html><head><meta name="qrichtext" content="1" />'
+               '<style type="text/css">\np, li { white-space: pre-wrap; }\n</style>'
+               '</head><body style=" font-family:\'Sans Serif\'; font-size:11pt; '
+               'font-weight:400; font-style:normal;">\n')
+_paraStyle = ('margin-top:0px; margin-bottom:0px; margin-left:0px; '
+              'margin-right:0px; -qt-block-indent:0; text-indent:0px;')
+
+
+def makeText(numWords, rng, wordsPerParagraph=120):
+    """ Return list of paragraphs, with `numWords` words in total. """
+    paragraphs = []
+    remaining = numWords
+    while remaining > 0:
+        n = min(remaining, wordsPerParagraph)
+        words = [rng.choice(_wordList) for _ in range(n)]
+        paragraphs.append(" ".join(words).capitalize() + ".")
+        remaining -= n
+    return paragraphs
+
+
+def makeHtml(title, paragraphs, rng):
+    """ Return story html, as written by older versions of
+        `StoryTeller.saveStory`.
+    """
+    body = []
+    for para in paragraphs:
+        words = para.split(' ')
+        # make some of the words bold, to have spans like Qt's html
+        if len(words) > 3 and rng.random() < 0.3:
+            words[1] = f'<span style=" font-weight:600;">{words[1]}</span>'
+        body.append(f'<p style=" {_paraStyle}">{" ".join(words)}</p>')
+    return f"<h1>{title}</h1>" + _htmlHeader + "\n".join(body) + "</body></html>"
+
+
+def makeLibrary(path, numStories, wordsPerStory=300, seed=0):
+    """ Make directory of `numStories` synthetic stories and a title list,
+        unless it already exists.
+    """
+    marker = os.path.join(path, '.complete')
+    if os.path.exists(marker):
+        return path
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    titles = []
+    for n in range(numStories):
+        title = f"{rng.choice(_wordList).capitalize()} {rng.choice(_wordList)} {n}"
+        day = (start + timedelta(days=rng.randrange(2000))).isoformat()
+        html = makeHtml(title, makeText(wordsPerStory, rng), rng)
+        with open(os.path.join(path, f"{day} {title}.html"), 'w') as fileobj:
+            fileobj.write(html)
+        titles.append(title)
+    with open(os.path.join(path, 'title_list'), 'w') as fileobj:
+        fileobj.write("\n".join(titles))
+    with open(marker, 'w') as fileobj:
+        fileobj.write("")
+    return path
+
+
+def waitFor(signal, timeout=600000):
+    """ Run the event loop until `signal` is emitted. """
+    loop = QEventLoop()
+    signal.connect(loop.quit)
+    QTimer.singleShot(timeout, loop.quit)
+    loop.exec_()
+    signal.disconnect(loop.quit)
+
+
+def processEvents():
+    QApplication.processEvents()
+
+
+class Benchmarks:
+    """ Collection of timing results. """
+
+    def __init__(self, repeat=5):
+        self.repeat = repeat
+        self.results = []
+
+    def time(self, name, func, setup=None, repeat=None, **params):
+        """ Call `func` `repeat` times and record the timings.
+
+            If given, `setup` is called before each repeat and its return
+            value passed to `func`.
+        """
+        repeat = self.repeat if repeat is None else repeat
+        times = []
+        for _ in range(repeat):
+            arg = setup() if setup is not None else None
+            t0 = time.perf_counter()
+            func(arg) if setup is not None else func()
+            times.append(time.perf_counter() - t0)
+        result = {'name':name, 'params':params, 'repeat':repeat,
+                  'min':min(times), 'median':statistics.median(times),
+                  'mean':statistics.mean(times), 'max':max(times)}
+        self.results.append(result)
+        paramStr = ", ".join(f"{k}={v}" for k, v in params.items())
+        print(f"{name:<40} {paramStr:<30} median {result['median']*1000:10.3f} ms",
+              file=sys.stderr)
+        return result
+
+
+def benchWordCount(bench, docSizes):
+    from storyteller.editor import StoryEditor
+    rng = random.Random(1)
+    for numWords in docSizes:
+        paragraphs = makeText(numWords, rng)
+        text = "\n".join(paragraphs)
+        bench.time('countWordsInText', lambda: StoryEditor.countWordsInText(text),
+                   words=numWords)
+
+        editor = StoryEditor()
+        editor.setPlainText(text)
+        bench.time('StoryEditor.countWords', editor.countWords, words=numWords)
+
+        def keystroke():
+            cursor = editor.textCursor()
+            cursor.setPosition(editor.document().characterCount() // 2)
+            cursor.insertText("x ")
+        bench.time('StoryEditor keystroke', keystroke, words=numWords)
+        editor.deleteLater()
+
+
+def benchHtmlWordCount(bench, docSizes, libraries):
+    # that the counts match is tested in tests/test_wordcount.py
+    from storyteller.editor import StoryEditor
+    from storyteller.storyparser import storyText
+    from storyteller.wordcount import countWordsInHtml, countWordsInFiles
+    rng = random.Random(2)
+    for numWords in docSizes:
+        html = makeHtml("Title", makeText(numWords, rng), rng)
+        data = html.encode()
+
+        bench.time('countWordsInHtml', lambda: countWordsInHtml(data), words=numWords)
+        bench.time('countWordsInText (raw html)',
+                   lambda: StoryEditor.countWordsInText(html), words=numWords)
+        bench.time('countWordsInText (parsed html)',
+                   lambda: StoryEditor.countWordsInText(storyText(html)),
+                   words=numWords)
+
+    for numStories, path in libraries.items():
+        paths = [os.path.join(path, filename) for filename in os.listdir(path)
+                 if filename.endswith('.html')]
+        repeat = 1 if numStories > 10000 else None
+        for jobs in sorted({1, os.cpu_count() or 1}):
+            bench.time('countWordsInFiles', lambda: countWordsInFiles(paths, jobs),
+                       repeat=repeat, stories=numStories, jobs=jobs)
+
+
+def benchProse(bench, docSizes):
+    try:
+        from storyteller.prose import ProseCache
+    except ImportError:
+        print("NumPy isn't installed; skipping prose analytics", file=sys.stderr)
+        return
+    rng = random.Random(3)
+    for numWords in docSizes:
+        paragraphs = makeText(numWords, rng)
+        bench.time('ProseCache.analyse (all blocks)',
+                   lambda: ProseCache().analyse(paragraphs), words=numWords)
+
+        cache = ProseCache()
+        cache.analyse(paragraphs)
+        def edit():
+            n = rng.randrange(len(paragraphs))
+            paragraphs[n] += " x"
+            return paragraphs
+        bench.time('ProseCache.analyse (one edited block)', cache.analyse,
+                   setup=edit, words=numWords)
+
+
+def benchOpenStoryDialog(bench, libraries):
+    from storyteller.dialogs import OpenStoryDialog
+    from storyteller.storyindex import StoryIndex
+    for numStories, path in libraries.items():
+        indexPath = os.path.join(path, StoryIndex.indexName)
+
+        def coldSetup():
+            if os.path.exists(indexPath):
+                os.remove(indexPath)
+
+        def construct(_=None):
+            diag = OpenStoryDialog(path)
+            diag.library.stop()
+            diag.deleteLater()
+
+        def scan(_=None):
+            diag = OpenStoryDialog(path)
+            if not diag._scanFinished:
+                waitFor(diag.library.ready)
+            diag.deleteLater()
+
+        repeat = 1 if numStories > 10000 else None
+        bench.time('OpenStoryDialog scan (no index)', scan, setup=coldSetup,
+                   repeat=repeat, stories=numStories)
+        bench.time('OpenStoryDialog construction', construct, stories=numStories)
+        bench.time('OpenStoryDialog scan (index)', scan, repeat=repeat,
+                   stories=numStories)
+
+        diag = OpenStoryDialog(path)
+        if not diag._scanFinished:
+            waitFor(diag.library.ready)
+        records = list(diag.stories)
+
+        def clearTable():
+            diag.widget.clear()
+            diag.rows = {}
+            diag.stories = []
+
+        bench.time('OpenStoryDialog.populateWidget',
+                   lambda _: diag.populateWidget(records), setup=clearTable,
+                   stories=numStories)
+
+        for query in ['a', 'story', '2021-0', 'zzzz']:
+            bench.time('OpenStoryDialog.search', lambda: diag.search(query, False),
+                       stories=numStories, query=query)
+        bench.time('OpenStoryDialog.search', lambda: diag.search('Story', True),
+                   stories=numStories, query='Story', caseSensitive=True)
+
+        # first full text search loads and refreshes the index
+        bench.time('OpenStoryDialog.searchText (first)',
+                   lambda: diag.searchText('river'), repeat=1, stories=numStories)
+        for query in ['river', 'riv*', '"dark voice"']:
+            bench.time('OpenStoryDialog.searchText',
+                       lambda: diag.searchText(query), stories=numStories,
+                       query=query)
+
+        bench.time('TableView.sort', lambda: diag.widget.sort('Title'),
+                   stories=numStories)
+        diag.done(0)
+        diag.deleteLater()
+        processEvents()
+
+
+def benchTitleListDialog(bench, libraries):
+    from storyteller.dialogs import TitleListDialog
+    for numStories, path in libraries.items():
+        diag = None
+
+        def construct():
+            nonlocal diag
+            diag = TitleListDialog(path)
+        bench.time('TitleListDialog construction', construct, titles=numStories)
+
+        for query in ['a', 'story', 'zzzz']:
+            bench.time('TitleListDialog.search', lambda: diag.search(query, False),
+                       titles=numStories, query=query)
+        diag.deleteLater()
+
+
+def benchTableWidget(bench, sizes):
+    from storyteller.tablewidget import TableWidget
+    rng = random.Random(2)
+    for size in sizes:
+        if size > 10000:
+            # far too slow with an item per cell
+            continue
+        table = TableWidget(['Title', 'Date', 'Wordcount'])
+        for n in range(size):
+            table.addRow(f"title {rng.random()}", f"2020-01-{n%28+1:02d}", rng.randrange(1000))
+        bench.time('TableWidget.sort', lambda: table.sort('Title'), rows=size)
+        table.deleteLater()
+
+
+def benchSaveOpen(bench, docSizes, workdir):
+    home = os.path.join(workdir, 'home')
+    if os.path.exists(home):
+        shutil.rmtree(home)
+    os.makedirs(home)
+    os.environ['HOME'] = home
+    from storyteller import StoryTeller
+    from storyteller.storyformat import extension
+    window = StoryTeller()
+    rng = random.Random(3)
+    for numWords in docSizes:
+        window.title.setText(f"Benchmark {numWords}")
+        window.textEdit.setPlainText("\n".join(makeText(numWords, rng)))
+
+        def modified():
+            # each save writes the chapter again
+            window.saver.wait()
+            window.textEdit.document().setModified(True)
+
+        def saveAndWait(_):
+            window.saveStory()
+            window.saver.wait()
+        # how long the GUI thread is blocked, then how long until it's on disk
+        bench.time('StoryTeller.saveStory', lambda _: window.saveStory(),
+                   setup=modified, words=numWords)
+        bench.time('StoryTeller.saveStory (written)', saveAndWait,
+                   setup=modified, words=numWords)
+        window.saver.wait()
+
+        filename = f"{date.today().strftime('%Y-%m-%d')} Benchmark {numWords}{extension}"
+
+        def openFile():
+            window._openFile(filename)
+            if window.loader.loading:
+                waitFor(window.loader.finished)
+        bench.time('StoryTeller._openFile', openFile, words=numWords)
+    window.close()
+    window.deleteLater()
+    processEvents()
+
+
+def gitCommit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def compare(results, previous):
+    """ Print ratio of median times to those in `previous` results. """
+    def key(result):
+        return (result['name'], json.dumps(result['params'], sort_keys=True))
+    old = {key(result):result for result in previous['results']}
+    print(f"{'benchmark':<40} {'params':<30} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+    for result in results:
+        prev = old.get(key(result), None)
+        if prev is None:
+            continue
+        paramStr = ", ".join(f"{k}={v}" for k, v in result['params'].items())
+        ratio = result['median'] / prev['median'] if prev['median'] else float('inf')
+        print(f"{result['name']:<40} {paramStr:<30} {prev['median']*1000:10.3f} "
+              f"{result['median']*1000:10.3f} {ratio:7.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('Usage')[0].strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', '-o', help="File to write JSON results to "
+                        "(default is stdout)")
+    parser.add_argument('--workdir', default=os.path.join(os.path.expanduser('~'),
+                        '.cache', 'storyteller-bench'),
+                        help="Directory for synthetic libraries (reused between runs)")
+    parser.add_argument('--library-sizes', type=int, nargs='+',
+                        default=[10, 1000, 100000], help="Numbers of stories")
+    parser.add_argument('--doc-sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000, 500000],
+                        help="Numbers of words in documents")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Number of times to run each benchmark")
+    parser.add_argument('--compare', help="JSON results from a previous run to compare with")
+    args = parser.parse_args(argv)
+
+    workdir = os.path.abspath(args.workdir)
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    libraries = {}
+    for size in args.library_sizes:
+        print(f"Making library of {size} stories...", file=sys.stderr)
+        libraries[size] = makeLibrary(os.path.join(workdir, f"library-{size}"), size)
+
+    bench = Benchmarks(args.repeat)
+    benchWordCount(bench, args.doc_sizes)
+    benchHtmlWordCount(bench, args.doc_sizes, libraries)
+    benchProse(bench, args.doc_sizes)
+    benchOpenStoryDialog(bench, libraries)
+    benchTitleListDialog(bench, libraries)
+    benchTableWidget(bench, args.library_sizes)
+    benchSaveOpen(bench, args.doc_sizes, workdir)
+
+    output = {'meta':{'timestamp':datetime.now().isoformat(timespec='seconds'),
+                      'commit':gitCommit(),
+                      'python':platform.python_version(),
+                      'qt':QT_VERSION_STR, 'pyqt':PYQT_VERSION_STR,
+                      'platform':platform.platform(),
+                      'repeat':args.repeat},
+              'results':bench.results}
+
+    text = json.dumps(output, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w') as fileobj:
+            fileobj.write(text)
+
+    if args.compare is not None:
+        with open(args.compare) as fileobj:
+            compare(bench.results, json.load(fileobj))
+
+    del app
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,41 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import time
+startTime = time.perf_counter()
+
+import os
 import sys
-from PyQt5.QtWidgets import QApplication
-from storyteller import StoryTeller
+import argparse
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Write stories to a word count goal.")
+    parser.add_argument('--instrument', nargs='?', const='1', metavar='FILE',
+                        help="Record timings of the main operations and write "
+                             "them to FILE on exit (Prometheus textfile if it "
+                             "ends in .prom, JSON otherwise)")
+    parser.add_argument('--startup-profile', action='store_true',
+                        help="Print how long each step of startup takes, "
+                             "up to the window being painted")
+    # leave any other args for Qt
+    args, qtArgs = parser.parse_known_args()
+    
+    # instrumentation has to be configured before the package is imported
+    if args.instrument is not None:
+        os.environ['STORYTELLER_INSTRUMENT'] = args.instrument
+    
+    from PyQt5.QtWidgets import QApplication
+    qtImportTime = time.perf_counter()
+    from storyteller import StoryTeller, startup
+    
+    if args.startup_profile:
+        startup.start(startTime)
+        startup.mark('import PyQt5', qtImportTime)
+        startup.mark('import storyteller')
+    
+    app = QApplication(sys.argv[:1] + qtArgs)
+    startup.mark('QApplication')
+    if args.startup_profile:
+        startup.watchFirstPaint(app)
     window = StoryTeller()
-    sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(app.exec_())
@@ -1,3 +1,10 @@
-from .storyteller import StoryTeller
+__all__ = ['StoryTeller']
 
-__all__ = ['StoryTeller']
\ No newline at end of file
+
+def __getattr__(name):
+    # the window is only imported when it's used, so that the command line
+    # tools (see cli.py) work without PyQt5 or a display
+    if name == 'StoryTeller':
+        from .storyteller import StoryTeller
+        return StoryTeller
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:03:44 2026
+
+@author: keziah
+"""
+
+import os
+import json
+import queue
+import threading
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtCore import QObject, QTimer, pyqtSlot
+from .loader import documentParagraphs, setDocumentParagraphs
+from .storyformat import encodeStory, decodeStory
+
+
+class _JournalWriter(threading.Thread):
+    """ Thread which does all the file writing for an `AutosaveJournal`.
+
+        Jobs are put on the `jobs` queue as tuples of (name, args).
+    """
+
+    def __init__(self, journalPath, snapshotPath, stashPrefix):
+        super().__init__(daemon=True)
+        self.journalPath = journalPath
+        self.snapshotPath = snapshotPath
+        self.stashPrefix = stashPrefix
+        self.jobs = queue.Queue()
+        self._fileobj = None
+
+    def run(self):
+        while True:
+            name, args = self.jobs.get()
+            if name == 'stop':
+                self._close()
+                break
+            try:
+                getattr(self, name)(*args)
+            except OSError:
+                # nothing useful to do here; the next snapshot will try again
+                self._close()
+
+    def _close(self):
+        if self._fileobj is not None:
+            self._fileobj.close()
+            self._fileobj = None
+
+    def append(self, data):
+        if self._fileobj is None:
+            self._fileobj = open(self.journalPath, 'ab')
+        self._fileobj.write(data)
+        self._fileobj.flush()
+        os.fsync(self._fileobj.fileno())
+
+    def snapshot(self, generation, header, document=None, title=""):
+        """ Write snapshot and start a new journal for this `generation`.
+
+            The snapshot is the `header` line, followed by the story in
+            `document` (a clone, which no other thread uses) if given.
+        """
+        self._close()
+        data = header
+        if document is not None:
+            # not compressed, so it is quick to write
+            data += encodeStory(title, documentParagraphs(document), compress=False)
+        _writeAtomic(self.snapshotPath, data)
+        header = json.dumps({'generation':generation}).encode() + b'\n'
+        _writeAtomic(self.journalPath, header)
+
+    def stash(self, path, data):
+        _writeAtomic(path, data)
+
+    def clear(self):
+        self._close()
+        for path in [self.snapshotPath, self.journalPath] + _stashPaths(self.stashPrefix):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _stashPaths(prefix):
+    directory, name = os.path.split(prefix)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, filename)
+                  for filename in os.listdir(directory)
+                  if filename.startswith(name) and not filename.endswith('.tmp'))
+
+
+def _writeAtomic(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as fileobj:
+        fileobj.write(data)
+        fileobj.flush()
+        os.fsync(fileobj.fileno())
+    os.replace(tmp, path)
+
+
+class AutosaveJournal(QObject):
+    """ Autosave edits to a document, so they can be recovered after a crash.
+
+        Each change to the document is recorded as a small delta and
+        appended to a journal file; the deltas are collected for up to
+        `interval` ms and written on a separate thread. Occasionally the
+        journal is compacted into a snapshot of the whole document, in the
+        native story format, which is made from a clone of the document on
+        the writer thread. Once the document has been saved, the journal
+        starts from the saved chapter instead (see `reset`), so it doesn't
+        need a snapshot.
+
+        Deltas only hold text, so formatting changes since the last snapshot
+        are not recovered.
+
+        A story in chapters only has one chapter in the document at a time;
+        other changed chapters can be kept with `stash`. A `context` dict,
+        e.g. which chapter is in the document, is saved with each snapshot.
+
+        Parameters
+        ----------
+        path : str
+            Directory to write the journal and snapshot files in.
+        name : str
+            Name of the journal, so that more than one can be kept in `path`.
+            Default is 'story'.
+        interval : int
+            Maximum time in ms before edits are written. Default is 1000.
+        minCompactSize : int
+            The journal is compacted when it is larger than the last snapshot,
+            or this many bytes, whichever is larger. Default is 256kB.
+    """
+
+    def __init__(self, path, name='story', interval=1000, minCompactSize=256*1024):
+        super().__init__()
+
+        os.makedirs(path, exist_ok=True)
+        self.journalPath = os.path.join(path, f"{name}.journal")
+        self.snapshotPath = os.path.join(path, f"{name}.snapshot")
+        self.stashPrefix = os.path.join(path, f"{name}.stash-")
+        self.minCompactSize = minCompactSize
+
+        self.document = None
+        self.title = ""
+        self.context = {}
+        self.enabled = True
+        self._pending = []
+        self._journalSize = 0
+        self._snapshotSize = 0
+        self._generation = 0
+        self._needSnapshot = True
+        # the journal starts from the chapter as it was saved
+        self._fromSaved = False
+
+        self.writer = _JournalWriter(self.journalPath, self.snapshotPath,
+                                     self.stashPrefix)
+        self.writer.start()
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.flush)
+
+    def setDocument(self, document):
+        """ Record changes to `document`, or stop recording if it is None,
+            e.g. while its story isn't in the editor. The snapshot and
+            journal are kept.
+        """
+        if self.document is not None:
+            self.document.contentsChange.disconnect(self._contentsChange)
+        self.document = document
+        if self.document is not None:
+            self.document.contentsChange.connect(self._contentsChange)
+        self._needSnapshot = True
+
+    def setContext(self, context):
+        """ Set dict of `context` to save with the snapshot of the document. """
+        self.context = context
+        self._needSnapshot = True
+
+    def stash(self, key, paragraphs, context):
+        """ Keep changed `paragraphs` which aren't in the document, e.g. of
+            another chapter, with dict of `context`, until `reset`.
+        """
+        header = json.dumps({'context':context}).encode() + b'\n'
+        data = header + encodeStory(self.title, paragraphs, compress=False)
+        self.writer.jobs.put(('stash', (f"{self.stashPrefix}{key}", data)))
+
+    def setEnabled(self, enabled):
+        """ Turn recording on or off, e.g. while a story is being loaded. """
+        self.enabled = enabled
+
+    @pyqtSlot(str)
+    def setTitle(self, title):
+        """ Record new story `title`. """
+        self.title = title
+        if self.enabled:
+            self._record({'title':title})
+
+    @pyqtSlot()
+    def reset(self, saved=False):
+        """ Discard the journal and stashes, e.g. when the document has just
+            been saved or loaded.
+
+            If `saved` is True, the document is the same as the chapter given
+            by the context in the saved story, so the next journal starts
+            from that, and `recover` is given its paragraphs, rather than a
+            snapshot of the document being taken.
+        """
+        self._pending = []
+        self._journalSize = 0
+        self._needSnapshot = not saved
+        self._fromSaved = saved
+        self.timer.stop()
+        self.writer.jobs.put(('clear', ()))
+
+    def close(self):
+        """ Write any pending edits and stop the writer thread. """
+        self.flush()
+        self.writer.jobs.put(('stop', ()))
+        self.writer.join()
+
+    @pyqtSlot(int, int, int)
+    def _contentsChange(self, position, removed, added):
+        if not self.enabled:
+            return
+        # replacing the whole document (e.g. with setHtml) is recorded as a
+        # snapshot rather than a delta
+        end = self.document.characterCount() - 1
+        if position == 0 and added >= end:
+            self._pending = []
+            self._needSnapshot = True
+            self._startTimer()
+            return
+        text = ""
+        if added:
+            cursor = QTextCursor(self.document)
+            cursor.setPosition(position)
+            cursor.setPosition(min(position + added, end), QTextCursor.KeepAnchor)
+            # selectedText uses the unicode paragraph separator between blocks
+            text = cursor.selectedText().replace('\u2029', '\n')
+        self._record({'p':position, 'r':removed, 't':text})
+
+    def _record(self, delta):
+        self._pending.append(delta)
+        self._startTimer()
+
+    def _startTimer(self):
+        # don't restart the timer if it's already running, so that edits are
+        # written at least every `interval` ms while typing
+        if not self.timer.isActive():
+            self.timer.start()
+
+    @pyqtSlot()
+    def flush(self):
+        """ Send pending edits to the writer thread. """
+        if self.document is None:
+            return
+        if self._fromSaved and self._pending and not self._needSnapshot:
+            # only start a journal once there is something to recover
+            self._startJournal(None)
+        compact = self._journalSize > max(self.minCompactSize, self._snapshotSize)
+        if self._needSnapshot or compact:
+            if self._pending or self._needSnapshot:
+                self._snapshot()
+            return
+        if not self._pending:
+            return
+        data = "".join(json.dumps(delta) + '\n' for delta in self._pending).encode()
+        self._pending = []
+        self._journalSize += len(data)
+        self.writer.jobs.put(('append', (data,)))
+
+    def _snapshot(self):
+        # the clone is serialised on the writer thread, so typing isn't held
+        # up by it
+        document = self.document.clone()
+        document.moveToThread(None)
+        self._startJournal(document)
+        self._pending = []
+        self._needSnapshot = False
+
+    def _startJournal(self, document):
+        """ Start a new generation of the journal, from a snapshot of
+            `document`, or from the saved chapter if it is None.
+        """
+        self._generation += 1
+        # snapshot is a line with the generation, then the story, if any
+        info = {'generation':self._generation, 'context':self.context}
+        if document is None:
+            info.update(saved=True, title=self.title)
+        header = json.dumps(info).encode() + b'\n'
+        self._journalSize = 0
+        # roughly the size the snapshot would be
+        self._snapshotSize = self.document.characterCount()
+        self._fromSaved = False
+        self.writer.jobs.put(('snapshot', (self._generation, header, document,
+                                           self.title)))
+
+    @staticmethod
+    def journalNames(path):
+        """ Return names of the journals in directory `path` which have
+            something to recover, 'story' first.
+        """
+        if not os.path.isdir(path):
+            return []
+        names = set()
+        for filename in os.listdir(path):
+            name, dot, suffix = filename.partition('.')
+            if dot and (suffix == 'snapshot' or suffix.startswith('stash-')):
+                names.add(name)
+        return sorted(names, key=lambda name: (name != 'story', name))
+
+    def hasRecovery(self):
+        """ Return True if there is a snapshot or stash to recover from. """
+        return os.path.exists(self.snapshotPath) or bool(_stashPaths(self.stashPrefix))
+
+    def recoveryContext(self):
+        """ Return context dict saved with the snapshot, or None if there is
+            no snapshot.
+        """
+        if not os.path.exists(self.snapshotPath):
+            return None
+        with open(self.snapshotPath, 'rb') as fileobj:
+            return json.loads(fileobj.readline()).get('context', {})
+
+    def stashes(self):
+        """ Return list of (context, paragraphs) kept with `stash`. """
+        stashes = []
+        for path in _stashPaths(self.stashPrefix):
+            try:
+                with open(path, 'rb') as fileobj:
+                    line, _, data = fileobj.read().partition(b'\n')
+                _, paragraphs = decodeStory(data)
+                stashes.append((json.loads(line)['context'], paragraphs))
+            except (OSError, ValueError, KeyError):
+                continue
+        return stashes
+
+    def isSavedSnapshot(self):
+        """ Return True if the snapshot is of the chapter as it was saved
+            (see `reset`), whose paragraphs `recover` needs.
+        """
+        with open(self.snapshotPath, 'rb') as fileobj:
+            return json.loads(fileobj.readline()).get('saved', False)
+
+    def recover(self, document, saved=None):
+        """ Restore the snapshot into `document` and replay the journal.
+
+            If the snapshot is of the saved chapter, list of its `saved`
+            paragraphs is restored instead.
+
+            Returns the recovered title.
+        """
+        with open(self.snapshotPath, 'rb') as fileobj:
+            line, _, data = fileobj.read().partition(b'\n')
+        snapshot = json.loads(line)
+
+        enabled = self.enabled
+        self.enabled = False
+        if 'html' in snapshot:
+            # snapshot from before the native format
+            title = snapshot['title']
+            document.setHtml(snapshot['html'])
+        elif snapshot.get('saved', False):
+            title = snapshot['title']
+            setDocumentParagraphs(document, [] if saved is None else saved)
+        else:
+            header, paragraphs = decodeStory(data)
+            title = header['title']
+            setDocumentParagraphs(document, paragraphs)
+
+        deltas = []
+        if os.path.exists(self.journalPath):
+            with open(self.journalPath, 'rb') as fileobj:
+                lines = fileobj.read().split(b'\n')
+            try:
+                header = json.loads(lines[0])
+            except ValueError:
+                header = {}
+            # a journal from an older generation has already been included
+            # in the snapshot
+            if header.get('generation', None) == snapshot['generation']:
+                for line in lines[1:]:
+                    try:
+                        deltas.append(json.loads(line))
+                    except ValueError:
+                        # last line may have been partly written
+                        break
+
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        for delta in deltas:
+            if 'title' in delta:
+                title = delta['title']
+                continue
+            end = document.characterCount() - 1
+            position = min(delta['p'], end)
+            cursor.setPosition(position)
+            cursor.setPosition(min(position + delta['r'], end), QTextCursor.KeepAnchor)
+            text = delta['t']
+            # formatting changes are recorded with the same text; don't
+            # replace that, so that the snapshot formatting is kept
+            if cursor.selectedText().replace('\u2029', '\n') == text:
+                continue
+            cursor.insertText(text)
+        cursor.endEditBlock()
+
+        self.enabled = enabled
+        self.title = title
+        self._generation = snapshot['generation']
+        # start again from a snapshot of the recovered document
+        self._needSnapshot = True
+        self._startTimer()
+        return title
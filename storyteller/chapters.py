@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:20:45 2026
+
+@author: keziah
+
+Stories saved in chapters.
+
+A story is split into chapters at headings: paragraphs such as "Chapter 3",
+"Part IV: Home" or "Prologue", or which begin with Markdown '#'s. Each chapter that
+has changed is written to the end of the story file as a block (in the same
+encoding as a `.story` body) and the chapter table in the header is updated.
+The header is kept in two slots, padded with spaces, and the new one is
+written over the older slot, so that saving a story only writes its changed
+chapters and a crash while saving leaves the previous version. Old blocks are
+left in the file until they take up as much space as the blocks in use, when
+the whole file is rewritten (to a temporary file, which is renamed over it).
+"""
+
+import os
+import re
+from .storyformat import (magic, slottedMagic, encodeBody, decodeBody,
+                          encodeHeaderSlot, readHeader, readHeaderSlots, readStory,
+                          readStoryParagraphs)
+from .storyparser import paragraphText
+from .wordcount import countWordsInText
+
+_numberWords = ("one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|"
+                "thirteen|fourteen|fifteen|sixteen|seventeen|eighteen|nineteen|"
+                "twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety|hundred")
+# a number in digits, Roman numerals or words, e.g. "12", "XIV", "Twenty-One"
+_number = (r"(?:\d+"
+           r"|(?=[mdclxvi])m{0,3}(?:cm|cd|d?c{0,3})(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3})"
+           rf"|(?:{_numberWords})(?:[- ](?:{_numberWords}))*)")
+# the rest of a heading: nothing, or a subtitle after punctuation
+_headingEnd = r"\s*(?:[:.\-–—].*)?$"
+# "Chapter" etc. need a number after them and the others have to be the whole
+# heading, so that sentences like "Part of me wanted to leave." aren't
+# headings
+headingPattern = re.compile(rf"\s*(?:chapter|part|book)\s+{_number}{_headingEnd}"
+                            rf"|\s*(?:prologue|epilogue|interlude){_headingEnd}"
+                            r"|\s*#{1,6}\s", re.IGNORECASE)
+maxHeadingLength = 80
+# header lines are padded to a multiple of this many bytes
+headerPadding = 1024
+# when to fsync a story as it's saved: 'always' also syncs the directory
+# after a rename and the file after its header has been rewritten, 'file'
+# syncs the data before it is made visible by a rename or header, and 'never'
+# leaves it to the OS (so a crash may lose blocks which a header refers to)
+fsyncPolicies = ('always', 'file', 'never')
+
+
+def isHeading(text):
+    """ Return True if paragraph `text` is a chapter heading. """
+    return len(text) <= maxHeadingLength and headingPattern.match(text) is not None
+
+
+def splitChapters(paragraphs):
+    """ Return list of (start, stop) ranges of the chapters in list of
+        `paragraphs`.
+
+        There is always at least one chapter. Paragraphs before the first
+        heading are a chapter of their own.
+    """
+    starts = [n for n, runs in enumerate(paragraphs)
+              if n > 0 and isHeading(paragraphText(runs))]
+    starts = [0] + starts
+    stops = starts[1:] + [len(paragraphs)]
+    return list(zip(starts, stops))
+
+
+def chapterTitle(paragraphs, start, number):
+    """ Return title of chapter `number` (from 0) starting at paragraph
+        `start`: its heading, or a name from its number if it hasn't one.
+    """
+    if start < len(paragraphs):
+        text = paragraphText(paragraphs[start]).strip()
+        if isHeading(text):
+            return text.lstrip('#').strip()
+    return "Opening" if number == 0 else f"Section {number + 1}"
+
+
+def chapterTable(paragraphs):
+    """ Return list of the chapters in list of `paragraphs`, as dicts with
+        'title', 'words' and 'paragraphs'.
+    """
+    chapters = []
+    for n, (start, stop) in enumerate(splitChapters(paragraphs)):
+        text = "\n".join(paragraphText(runs) for runs in paragraphs[start:stop])
+        chapters.append({'title':chapterTitle(paragraphs, start, n),
+                         'words':countWordsInText(text),
+                         'paragraphs':paragraphs[start:stop]})
+    return chapters
+
+
+def isChaptered(header):
+    """ Return True if story `header` has a chapter table. """
+    return 'chapters' in header
+
+
+def _slotSize(header):
+    """ Return size of header slots for `header`: the next multiple of
+        `headerPadding` with at least half of that to spare.
+    """
+    # room for sequence numbers of any length
+    size = len(encodeHeaderSlot(header, 0)) + 20 + headerPadding // 2
+    return size + -size % headerPadding
+
+
+def _bodyStart(path):
+    with open(path, 'rb') as fileobj:
+        _, start, _ = readHeaderSlots(fileobj)
+        return start
+
+
+def _syncDirectory(path):
+    """ fsync the directory containing `path`, so a rename is durable. """
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        # directories can't be opened on some platforms, e.g. Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def checkFsyncPolicy(fsync):
+    """ Raise ValueError if `fsync` isn't one of `fsyncPolicies`. """
+    if fsync not in fsyncPolicies:
+        msg = f"fsync policy should be one of {', '.join(fsyncPolicies)}, not '{fsync}'"
+        raise ValueError(msg)
+
+
+def encodeChapters(chapters, compress=True):
+    """ Encode the chapters in list of `chapters` (as given to
+        `writeChapters`) which have changed.
+
+        Returns list of (chapter, data, entries) tuples, where `data` is the
+        encoded block and `entries` are its chapter table entries, without
+        their 'offset' and 'length'.
+    """
+    blocks = []
+    for chapter in chapters:
+        if 'paragraphs' not in chapter:
+            continue
+        paragraphs = chapter['paragraphs']
+        data, _ = encodeBody(paragraphs, compress)
+        entries = []
+        for n, (start, stop) in enumerate(splitChapters(paragraphs)):
+            text = "\n".join(paragraphText(runs) for runs in paragraphs[start:stop])
+            entries.append({'title':chapterTitle(paragraphs, start, n),
+                            'words':countWordsInText(text),
+                            'start':start, 'stop':stop})
+        blocks.append((chapter, data, entries))
+    return blocks
+
+
+def readChapter(path, entries, header=None):
+    """ Return list of paragraphs of chapter table `entries` of the story at
+        `path`.
+    """
+    if header is None:
+        header = readHeader(path)
+    compression = header.get('compression', None)
+    start = _bodyStart(path)
+    blocks = {}
+    paragraphs = []
+    with open(path, 'rb') as fileobj:
+        for entry in entries:
+            offset = entry['offset']
+            if offset not in blocks:
+                fileobj.seek(start + offset)
+                blocks[offset] = decodeBody(fileobj.read(entry['length']),
+                                            compression)
+            paragraphs += blocks[offset][entry['start']:entry['stop']]
+    return paragraphs
+
+
+def writeChapters(path, title, chapters, date=None, goal=None, compress=True,
+                  source=None, fsync='file'):
+    """ Write story in chapters to `path`, and return the header.
+
+        Parameters
+        ----------
+        path : str
+            File to write to.
+        title : str
+            Story title
+        chapters : list
+            List of dicts. A chapter which has changed has 'paragraphs', and
+            is written as a new block, which is split into chapters at its
+            headings. Any other chapter has 'entries', its list of entries in
+            the chapter table of `source`, which are kept as they are.
+        date : str, optional
+            Date in ISO format
+        goal : int, optional
+            Word count goal
+        compress : bool
+            If True (default), compress the blocks with zlib.
+        source : str, optional
+            File the unchanged chapters are in. Default is `path`.
+        fsync : {'always', 'file', 'never'}
+            When to flush the file to disk; see `fsyncPolicies`. Default is
+            'file'.
+
+        Returns the new header. The new chapter table entries for each of
+        `chapters` are in its 'entries' list.
+    """
+    checkFsyncPolicy(fsync)
+    if source is None:
+        source = path
+    sourceHeader = {}
+    if os.path.exists(source):
+        try:
+            sourceHeader = readHeader(source)
+        except ValueError:
+            pass
+    compression = 'zlib' if compress else None
+    blocks = encodeChapters(chapters, compress)
+
+    # blocks from the source which are still used
+    used = {}
+    for chapter in chapters:
+        if 'paragraphs' not in chapter:
+            for entry in chapter['entries']:
+                used[entry['offset']] = entry['length']
+    usedSize = sum(used.values())
+
+    incremental = (source == path and isChaptered(sourceHeader)
+                   and sourceHeader.get('compression', None) == compression)
+    if incremental:
+        with open(path, 'rb') as fileobj:
+            _, bodyStart, slots = readHeaderSlots(fileobj)
+        # a story with one header line can't be updated safely in place, so
+        # it is rewritten with two slots
+        incremental = slots is not None
+    if incremental:
+        bodySize = os.path.getsize(path) - bodyStart
+        newSize = sum(len(data) for _, data, _ in blocks)
+        # rewrite the whole file once old blocks are half of it
+        incremental = bodySize - usedSize <= max(usedSize + newSize, 65536)
+
+    header = {'title':title, 'date':date, 'goal':goal, 'wordcount':0,
+              'compression':compression, 'chapters':[]}
+    if incremental:
+        with open(path, 'r+b') as fileobj:
+            fileobj.seek(0, os.SEEK_END)
+            offsets = {}
+            for chapter, data, entries in blocks:
+                offsets[id(chapter)] = fileobj.tell() - bodyStart
+                fileobj.write(data)
+            buildChapterTable(header, chapters, blocks, offsets, {})
+            # the current header is in the slot with the highest sequence
+            # number, so the new one is written over the other slot
+            current = max(range(2), key=lambda n: -1 if slots[n][2] is None else slots[n][2])
+            offset, size, _ = slots[1 - current]
+            line = encodeHeaderSlot(header, slots[current][2] + 1, size)
+            if line is not None:
+                if fsync != 'never':
+                    # blocks are written first, so the header never refers
+                    # to missing data
+                    fileobj.flush()
+                    os.fsync(fileobj.fileno())
+                fileobj.seek(offset)
+                fileobj.write(line)
+                if fsync == 'always':
+                    fileobj.flush()
+                    os.fsync(fileobj.fileno())
+                return header
+        # header no longer fits; rewrite the whole file
+        header['chapters'] = []
+
+    # copy blocks still used from the source, then write the new ones
+    data = []
+    moved = {}
+    position = 0
+    if used:
+        sourceStart = _bodyStart(source)
+        with open(source, 'rb') as fileobj:
+            for offset, length in sorted(used.items()):
+                fileobj.seek(sourceStart + offset)
+                data.append(fileobj.read(length))
+                moved[offset] = position
+                position += length
+    offsets = {}
+    for chapter, block, entries in blocks:
+        offsets[id(chapter)] = position
+        data.append(block)
+        position += len(block)
+    buildChapterTable(header, chapters, blocks, offsets, moved)
+    tmp = path + '.tmp'
+    size = _slotSize(header)
+    with open(tmp, 'wb') as fileobj:
+        fileobj.write(slottedMagic + encodeHeaderSlot(header, 1, size)
+                      + encodeHeaderSlot(header, 0, size))
+        for block in data:
+            fileobj.write(block)
+        if fsync != 'never':
+            fileobj.flush()
+            os.fsync(fileobj.fileno())
+    os.replace(tmp, path)
+    if fsync == 'always':
+        _syncDirectory(path)
+    return header
+
+
+def buildChapterTable(header, chapters, blocks, offsets, moved):
+    """ Fill in the chapter table of `header` and the 'entries' of each of
+        `chapters`.
+
+        `blocks` are from `encodeChapters`, `offsets` gives the offset of
+        each new block, by chapter id, and `moved` maps the offsets of kept
+        blocks to their new offsets, if they have been moved.
+    """
+    newEntries = {id(chapter):(data, entries) for chapter, data, entries in blocks}
+    table = []
+    for chapter in chapters:
+        if id(chapter) in newEntries:
+            data, entries = newEntries[id(chapter)]
+            entries = [dict(entry, offset=offsets[id(chapter)], length=len(data))
+                       for entry in entries]
+        else:
+            entries = [dict(entry, offset=moved.get(entry['offset'], entry['offset']))
+                       for entry in chapter['entries']]
+        chapter['entries'] = entries
+        table += entries
+    header['chapters'] = table
+    header['wordcount'] = sum(entry['words'] for entry in table)
+
+
+def readChapterTable(path):
+    """ Return (header, list of chapters) of story at `path`, where each
+        chapter is a dict with 'title', 'words' and 'entries'.
+
+        Stories which aren't saved in chapters are read and split into
+        chapters, which have 'paragraphs' instead of 'entries'.
+    """
+    with open(path, 'rb') as fileobj:
+        data = fileobj.read(len(slottedMagic))
+    if data in (magic, slottedMagic):
+        header = readHeader(path)
+        if isChaptered(header):
+            chapters = [{'title':entry['title'], 'words':entry['words'],
+                         'entries':[entry]} for entry in header['chapters']]
+            return header, chapters
+        header, paragraphs = readStory(path)
+    else:
+        title, paragraphs = readStoryParagraphs(path)
+        header = {'title':title}
+    return header, chapterTable(paragraphs)
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:05:12 2026
+
+@author: keziah
+"""
+
+from collections import OrderedDict
+from PyQt5.QtGui import QTextDocument
+from .chapters import chapterTable, readChapter, writeChapters
+from .loader import documentParagraphs
+from .storyformat import decodeBody, encodeBody
+from .storyparser import paragraphText
+from .wordcount import countWordsInText
+
+
+def _countWords(paragraphs):
+    return countWordsInText("\n".join(paragraphText(runs) for runs in paragraphs))
+
+
+class Chapter:
+    """ One chapter of a `ChapteredStory`.
+
+        A chapter's text is in one of four places: its live `document`, if
+        it is open; its cached `paragraphs`, if it hasn't been saved in
+        chapters yet; its `compact` encoding, if it was closed with unsaved
+        changes; or its `entries` in the chapter table of the story file.
+
+        `source` is the list of entries in the story file which the chapter
+        was read from, or replaces, if it has been recovered.
+
+        `indexed` is whatever was made from the chapter when it was last
+        saved to index the story (see `StoryTeller._indexSavedStory`), so
+        the chapter doesn't have to be read again to index it while it
+        hasn't changed.
+    """
+
+    def __init__(self, title, words, entries=None, paragraphs=None, source=None):
+        self.title = title
+        self.words = words
+        self.entries = entries
+        self.paragraphs = paragraphs
+        self.source = entries if source is None else source
+        self.document = None
+        self.compact = None
+        self.indexed = None
+
+    @property
+    def dirty(self):
+        """ True if the chapter needs to be written when the story is saved. """
+        if self.document is not None and self.document.isModified():
+            return True
+        return self.entries is None or self.compact is not None
+
+
+class ChapteredStory:
+    """ A story split into chapters, of which only a few are open in a
+        QTextDocument at a time.
+
+        The word count of the story is the sum of the chapters' word counts,
+        which are read from the chapter table, so closed chapters don't need
+        to be read. Saving only writes the chapters which have changed.
+
+        Parameters
+        ----------
+        chapters : list
+            List of `Chapter`s.
+        path : str, optional
+            Story file the chapters' `entries` refer to, or the name of the
+            story in `storage`.
+        header : dict, optional
+            Header of the story file.
+        maxOpen : int
+            Number of unchanged chapters to keep open. Changed chapters are
+            kept open until they are saved, or evicted by the `cache`.
+            Default is 3.
+        storage : StoryStorage, optional
+            Storage the story is in, if `path` isn't a file.
+
+        If `cache` is set to a `DocumentCache`, the open documents are also
+        closed when those of all the stories using it take too much memory.
+    """
+
+    def __init__(self, chapters, path=None, header=None, maxOpen=3, storage=None):
+        self.chapters = chapters
+        self.path = path
+        self.header = {} if header is None else header
+        self.maxOpen = maxOpen
+        self.storage = storage
+        self.cache = None
+        # open chapters, least recently used first
+        self._open = OrderedDict()
+
+    @classmethod
+    def fromStorage(cls, storage, filename, maxOpen=3):
+        """ Return story `filename` in `StoryStorage` `storage`. Only its
+            chapter table is read, if it was saved in chapters.
+        """
+        header, table = storage.readChapterTable(filename)
+        return cls(cls._chapters(table), path=filename, header=header,
+                   maxOpen=maxOpen, storage=storage)
+
+    @staticmethod
+    def _chapters(table):
+        return [Chapter(chapter['title'], chapter['words'],
+                        entries=chapter.get('entries', None),
+                        paragraphs=chapter.get('paragraphs', None))
+                for chapter in table]
+
+    @classmethod
+    def fromParagraphs(cls, paragraphs, maxOpen=3, path=None, header=None,
+                       storage=None):
+        """ Return unsaved story of list of `paragraphs`, split into chapters.
+
+            If the paragraphs were read from a story which isn't saved in
+            chapters, e.g. html, `path`, `header` and `storage` are those of
+            the story, as for `ChapteredStory`.
+        """
+        return cls(cls._chapters(chapterTable(paragraphs)), path=path,
+                   header=header, maxOpen=maxOpen, storage=storage)
+
+    @classmethod
+    def fromDocument(cls, document, maxOpen=3):
+        """ Return unsaved story of one chapter, open in `document`. """
+        chapter = Chapter("Opening", 0, paragraphs=[])
+        story = cls([chapter], maxOpen=maxOpen)
+        story.setDocument(0, document)
+        return story
+
+    def __len__(self):
+        return len(self.chapters)
+
+    @property
+    def words(self):
+        """ Word count of the whole story. """
+        return sum(chapter.words for chapter in self.chapters)
+
+    def setWords(self, n, words):
+        """ Set word count of chapter `n`. """
+        self.chapters[n].words = words
+
+    def document(self, n):
+        """ Return open QTextDocument of chapter `n`, or None. """
+        document = self.chapters[n].document
+        if document is not None:
+            self._open.move_to_end(n)
+            if self.cache is not None:
+                self.cache.touch(self, n)
+        return document
+
+    def setDocument(self, n, document):
+        """ Set QTextDocument `document` for chapter `n`, and close the least
+            recently used unchanged chapters if too many are open.
+        """
+        self.chapters[n].document = document
+        self._open[n] = document
+        self._open.move_to_end(n)
+        self._closeUnused()
+        if self.cache is not None:
+            self.cache.touch(self, n)
+
+    def _closeUnused(self):
+        """ Close unchanged chapters, apart from the most recently used
+            `maxOpen`.
+        """
+        unchanged = [n for n in self._open if not self.chapters[n].dirty]
+        for n in unchanged[:max(len(unchanged) - self.maxOpen, 0)]:
+            self._close(n)
+
+    def _close(self, n):
+        chapter = self.chapters[n]
+        if chapter.entries is not None:
+            # it can be read from the file again
+            chapter.paragraphs = None
+        chapter.document = None
+        del self._open[n]
+        if self.cache is not None:
+            self.cache.discard(self, n)
+
+    def evict(self, n):
+        """ Close chapter `n` to save memory. If it has unsaved changes, it
+            is kept in the compact encoding of the story format.
+        """
+        chapter = self.chapters[n]
+        if chapter.document is None:
+            return
+        if chapter.dirty:
+            chapter.compact, _ = encodeBody(self.paragraphs(n), compress=True)
+            chapter.paragraphs = None
+        chapter.document = None
+        self._open.pop(n, None)
+        if self.cache is not None:
+            self.cache.discard(self, n)
+
+    @staticmethod
+    def newDocument():
+        """ Return new, empty QTextDocument for a chapter. """
+        return QTextDocument()
+
+    def paragraphs(self, n):
+        """ Return list of paragraphs of chapter `n`. """
+        chapter = self.chapters[n]
+        if chapter.document is not None:
+            return documentParagraphs(chapter.document)
+        if chapter.paragraphs is not None:
+            return chapter.paragraphs
+        if chapter.compact is not None:
+            return decodeBody(chapter.compact, 'zlib')
+        if self.storage is not None:
+            return self.storage.readChapter(self.path, chapter.entries, self.header)
+        return readChapter(self.path, chapter.entries, self.header)
+
+    def allParagraphs(self):
+        """ Return list of paragraphs of the whole story. """
+        paragraphs = []
+        for n in range(len(self.chapters)):
+            paragraphs += self.paragraphs(n)
+        return paragraphs
+
+    def text(self):
+        """ Return plain text of the whole story. """
+        return "\n".join(paragraphText(runs) for runs in self.allParagraphs())
+
+    def snapshot(self):
+        """ Return list of chapters to save with `writeChapters`: the
+            paragraphs of each chapter which has changed, and the entries of
+            the others.
+
+            Only the changed chapters are copied, so this is cheap enough to
+            do on the GUI thread and write on a worker. Changed chapters
+            also have the 'revision' of their document, if they are open,
+            and their 'compact' encoding, so `applySave` can tell if they
+            have changed again since. The others have what they were
+            'indexed' as, if anything; changed chapters can be given it
+            while they are saved.
+        """
+        table = []
+        for n, chapter in enumerate(self.chapters):
+            if chapter.dirty:
+                saved = {'paragraphs':self.paragraphs(n), 'compact':chapter.compact}
+                if chapter.document is not None:
+                    saved['revision'] = chapter.document.revision()
+            else:
+                saved = {'entries':chapter.entries, 'indexed':chapter.indexed}
+            table.append(saved)
+        return table
+
+    def applySave(self, path, header, table, storage=None):
+        """ Update the chapters once `table`, from `snapshot`, has been
+            written to `path` (in `storage`, if given) by `writeChapters`,
+            which returned `header`.
+
+            A chapter which has been edited since the snapshot is left
+            modified, so it is written again by the next save.
+        """
+        for chapter, saved in zip(self.chapters, table):
+            chapter.entries = chapter.source = saved['entries']
+            chapter.indexed = saved.get('indexed', None)
+            document = chapter.document
+            if document is not None and document.revision() == saved.get('revision'):
+                document.setModified(False)
+            if chapter.compact is saved.get('compact'):
+                # otherwise it was evicted with more changes since
+                chapter.compact = None
+            chapter.paragraphs = None
+        self.path = path
+        self.header = header
+        self.storage = storage
+        # chapters which were kept open because they had changed can be
+        # closed now
+        self._closeUnused()
+
+    def save(self, path, title, date=None, goal=None, compress=True, fsync='file',
+             storage=None):
+        """ Save story to `path`, or as `path` in `storage`, writing only the
+            chapters which have changed, if it was saved there before, and
+            return the header.
+        """
+        table = self.snapshot()
+        write = writeChapters if storage is None else storage.writeChapters
+        header = write(path, title, table, date=date, goal=goal,
+                       compress=compress, source=self.path, fsync=fsync)
+        self.applySave(path, header, table, storage)
+        return header
+
+    def replaceSource(self, source, paragraphs):
+        """ Replace the chapters read from the chapter table entries in
+            `source`, e.g. from `Chapter.source` in a previous session, with
+            one unsaved chapter of `paragraphs`.
+
+            Returns the number of the new chapter, or None if the entries
+            aren't in the story.
+        """
+        keys = {(entry['offset'], entry['start']) for entry in source}
+        found = [n for n, chapter in enumerate(self.chapters)
+                 if chapter.entries and all((entry['offset'], entry['start']) in keys
+                                            for entry in chapter.entries)]
+        if not found:
+            return None
+        first = found[0]
+        chapter = Chapter(self.chapters[first].title, _countWords(paragraphs),
+                          paragraphs=paragraphs, source=source)
+        self.chapters[first:found[-1]+1] = [chapter]
+        return first
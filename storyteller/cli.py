@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:10:22 2026
+
+@author: keziah
+
+Command line tools for a stories directory, which don't need a display or
+PyQt5, e.g. for maintenance and reports from cron.
+
+    python -m storyteller.cli [--path PATH] [--jobs N] index
+    python -m storyteller.cli [--path PATH] [--jobs N] stats [--json] [--days N]
+    python -m storyteller.cli [--path PATH] [--jobs N] search QUERY [--limit N] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import date, timedelta
+from .storyindex import StoryIndex
+from .textindex import TextIndex
+from .statsstore import StatsStore
+
+defaultPath = os.path.join(os.path.expanduser('~'), 'Documents', 'stories')
+
+_summaryLabels = {'today':"Words today",
+                  'dailyMean':"Daily average (7 days)",
+                  'currentStreak':"Current streak (days)",
+                  'longestStreak':"Longest streak (days)",
+                  'goalHitRate':"Goals reached",
+                  'sessions':"Writing sessions",
+                  'velocity':"Words per minute"}
+
+
+def refreshIndexes(path, jobs=1):
+    """ Bring the story and text indexes of directory `path` up to date,
+        reading changed stories in `jobs` processes.
+
+        Stories which can't be read are reported on stderr and left out.
+        Returns list of `StoryRecord`s, oldest first, and the `TextIndex`.
+    """
+    errors = []
+    records = StoryIndex(path).refresh(jobs=jobs, errors=errors)
+    textIndex = TextIndex(path)
+    errors += textIndex.refresh(records, jobs=jobs)
+    for filename, message in errors:
+        print(f"Couldn't read {filename}: {message}", file=sys.stderr)
+    records.sort(key=lambda record: (record.date, record.title))
+    return records, textIndex
+
+
+def formatTable(rows, headings):
+    """ Return list of `rows` (lists of values) as a plain text table with
+        `headings`. Numbers are right aligned.
+    """
+    cells = [[str(value) if value is not None else "" for value in row]
+             for row in rows]
+    widths = [max([len(heading)] + [len(row[n]) for row in cells])
+              for n, heading in enumerate(headings)]
+    numeric = [bool(rows) and all(isinstance(row[n], (int, float)) or row[n] is None
+                                  for row in rows)
+               for n in range(len(headings))]
+
+    def line(values):
+        return "  ".join(value.rjust(width) if right else value.ljust(width)
+                         for value, width, right in zip(values, widths, numeric)).rstrip()
+
+    lines = [line(headings), line(["-" * width for width in widths])]
+    lines += [line(row) for row in cells]
+    return "\n".join(lines)
+
+
+def writingSummary(path, days=30):
+    """ Return dict of writing statistics for directory `path`, or None if
+        NumPy isn't installed.
+    """
+    try:
+        from .stats import summarise
+    except ImportError:
+        return None
+    summary = summarise(StatsStore(path), days=days)
+    summary['recentWords'] = summary['recentWords'].tolist()
+    # local day number since 1970-01-01, from `dayNumbers`
+    firstDay = date(1970, 1, 1) + timedelta(days=int(summary['recentFirstDay']))
+    summary['recentFirstDay'] = firstDay.isoformat()
+    return summary
+
+
+def indexCommand(args):
+    t0 = time.perf_counter()
+    records, textIndex = refreshIndexes(args.path, args.jobs)
+    elapsed = time.perf_counter() - t0
+    print(f"Indexed {len(records)} stories "
+          f"({sum(record.wordcount for record in records)} words) "
+          f"in {elapsed:.1f}s")
+    return 0
+
+
+def statsCommand(args):
+    records, _ = refreshIndexes(args.path, args.jobs)
+    summary = writingSummary(args.path, args.days)
+    total = sum(record.wordcount for record in records)
+
+    if args.json:
+        stories = [record._asdict() for record in records]
+        json.dump({'stories':stories, 'totalWords':total, 'summary':summary},
+                  sys.stdout, indent=2)
+        print()
+        return 0
+
+    rows = []
+    for record in records:
+        progress = f"{record.wordcount / record.goal:.0%}" if record.goal else None
+        rows.append([record.date, record.title, record.wordcount, record.goal,
+                     progress])
+    print(formatTable(rows, ["Date", "Title", "Words", "Goal", "Progress"]))
+    print(f"\n{len(records)} stories, {total} words")
+    if summary is None:
+        print("Install NumPy for writing statistics", file=sys.stderr)
+        return 0
+    print()
+    for key, label in _summaryLabels.items():
+        value = summary[key]
+        if key == 'goalHitRate':
+            text = f"{value:.0%}"
+        elif isinstance(value, float):
+            text = f"{value:.1f}"
+        else:
+            text = str(value)
+        print(f"{label}: {text}")
+    return 0
+
+
+def searchCommand(args):
+    records, textIndex = refreshIndexes(args.path, args.jobs)
+    titles = {record.filename:record.title for record in records}
+    results = textIndex.search(args.query, limit=args.limit)
+
+    if args.json:
+        json.dump([{'filename':filename, 'title':titles.get(filename, None),
+                    'score':score} for filename, score in results],
+                  sys.stdout, indent=2)
+        print()
+        return 0
+
+    if not results:
+        print("No stories found")
+        return 0
+    rows = [[titles.get(filename, ""), filename, round(score, 2)]
+            for filename, score in results]
+    print(formatTable(rows, ["Title", "File", "Score"]))
+    return 0
+
+
+def makeParser():
+    """ Return ArgumentParser for the command line tools. """
+    parser = argparse.ArgumentParser(description="Index, report on and search a "
+                                                 "stories directory without a display")
+    parser.add_argument('--path', default=defaultPath,
+                        help="Stories directory. Default is ~/Documents/stories")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="Number of processes to read changed stories in. "
+                             "Default is the number of CPUs")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    index = commands.add_parser('index', help="Build or refresh the story and "
+                                              "search indexes")
+    index.set_defaults(func=indexCommand)
+
+    stats = commands.add_parser('stats', help="Print word counts and writing "
+                                              "statistics")
+    stats.add_argument('--json', action='store_true', help="Print as JSON")
+    stats.add_argument('--days', type=int, default=30,
+                       help="Days of words per day to include in JSON. "
+                            "Default is 30")
+    stats.set_defaults(func=statsCommand)
+
+    search = commands.add_parser('search', help="Search the text of the stories")
+    search.add_argument('query', help='Words to find; use "quotes" for '
+                                      'phrases and * for prefixes')
+    search.add_argument('--limit', type=int, default=20,
+                        help="Maximum number of results. Default is 20")
+    search.add_argument('--json', action='store_true', help="Print as JSON")
+    search.set_defaults(func=searchCommand)
+    return parser
+
+
+def main(argv=None):
+    parser = makeParser()
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if not os.path.isdir(args.path):
+        parser.error(f"{args.path} is not a directory")
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:02:36 2026
+
+@author: keziah
+"""
+
+from PyQt5.QtWidgets import QPushButton, QVBoxLayout, QWidget
+from PyQt5.QtCore import QTimer, pyqtSlot
+from .tablewidget import TableWidget
+from .instrument import instruments
+
+
+class InstrumentationWindow(QWidget):
+    """ Window showing the timing histograms recorded by `instrument`.
+
+        Parameters
+        ----------
+        interval : int
+            Time in ms between updates of the table. Default is 1000.
+    """
+
+    def __init__(self, interval=1000):
+        super().__init__()
+
+        header = ['Operation', 'Count', 'Mean (ms)', 'p50 (ms)', 'p95 (ms)',
+                  'Max (ms)']
+        self.table = TableWidget(header, showRowNumbers=False, readOnly=True)
+
+        self.clearButton = QPushButton("Clear")
+        self.clearButton.clicked.connect(self.clear)
+
+        self.timer = QTimer()
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.refresh)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.table)
+        layout.addWidget(self.clearButton)
+        self.setLayout(layout)
+
+        self.setWindowTitle("Instrumentation")
+        self.resize(600, 300)
+        self.refresh()
+
+    def showEvent(self, event):
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    @pyqtSlot()
+    def clear(self):
+        """ Remove all recorded timings. """
+        instruments.histograms.clear()
+        self.refresh()
+
+    @pyqtSlot()
+    def refresh(self):
+        """ Update the table from the current histograms. """
+        self.table.setRowCount(0)
+        for name, hist in sorted(instruments.histograms.items()):
+            self.table.addRow(name, hist.count, f"{hist.mean*1000:.3f}",
+                              f"{hist.quantile(0.5)*1000:.3f}",
+                              f"{hist.quantile(0.95)*1000:.3f}",
+                              f"{hist.max*1000:.3f}")
+        self.table.resizeColumnsToContents()
@@ -6,16 +6,24 @@ Created on Wed Dec 23 16:32:35 2020
 @author: keziah
 """
 
-import os
-import re
+import time
 from abc import abstractmethod
+from datetime import date
 from PyQt5.QtWidgets import (QDialog, QDialogButtonBox, QVBoxLayout,
-                             QAbstractItemView, QListWidget)
+                             QAbstractItemView, QListView, QLabel, QCheckBox,
+                             QProgressBar)
 from PyQt5.QtCore import pyqtSlot, Qt
 from .metaclass import PyQtMetaclass
-from .tablewidget import TableWidget
-from .editor import StoryEditor
+from .tableview import TableView
+from .library import StoryLibrary
+from .storage import FileStorage
+from .textindex import TextIndex
+from .filterengine import FilterEngine
+from .titleindex import TitleIndex
+from .titlemodel import TitleListModel
 from .searchbar import SearchBar
+from . import instrument
+from .instrument import instruments, timed
 
 
 class AbstractDialog(QDialog, metaclass=PyQtMetaclass):
@@ -74,132 +82,281 @@ class AbstractDialog(QDialog, metaclass=PyQtMetaclass):
 class OpenStoryDialog(AbstractDialog):
     """ Dialog showing a searchable table of story titles, dates and wordcounts.
     
+        The table can either be searched by title, date and wordcount, or
+        by the text of the stories.
+        
+        Stories come from a `StoryLibrary`. If it hasn't finished its first 
+        scan, the dialog is shown straight away and rows are added as they 
+        are found. Rows are updated while the dialog is open if stories 
+        change on disk.
+    
         Parameters
         ----------
         path : str
             Path to directory where stories are stored.
+        library : StoryLibrary, optional
+            Library of the stories, e.g. one kept by the main window, so 
+            that they aren't listed again. If not given, a new one is made 
+            of the story files in `path`. The full text index is kept in 
+            `path` either way.
+        textIndex : TextIndex, optional
+            Full text index of the stories, e.g. the one the main window 
+            updates when a story is saved, so that there is only one copy 
+            of it. If not given, a new one is made for `path`.
     """
     
-    def __init__(self, path):
+    @timed('OpenStoryDialog construction')
+    def __init__(self, path, library=None, textIndex=None):
         super().__init__(path, "Open story")
         
-        stories = os.listdir(self.path)
-        stories = [story for story in stories if os.path.splitext(story)[1]=='.html']
+        self.stories = []
+        # storage row in table for each filename
+        self.rows = {}
+        
+        # full text index is only loaded when it is first searched
+        self.textIndex = TextIndex(self.path) if textIndex is None else textIndex
+        self._textIndexChecked = False
+        self._scanFinished = False
+        self.fullTextLabel = QLabel("Search story text")
+        self.fullTextBox = QCheckBox()
+        self.fullTextBox.stateChanged.connect(self.searchBar.requestSearch)
+        self.searchBar.layout.addWidget(self.fullTextLabel)
+        self.searchBar.layout.addWidget(self.fullTextBox)
         
-        header = ['Title', 'Date', 'Wordcount']
-        self.widget = TableWidget(header, showRowNumbers=False, readOnly=True)
+        self.filterEngine = FilterEngine()
+        self.filterEngine.filtered.connect(self.applyFilter)
+        self.filterEngine.costMeasured.connect(self.searchBar.setFilterCost)
+        
+        # filename column is hidden, but needed to open the story
+        header = ['Title', 'Date', 'Wordcount', 'Filename']
+        columnTypes = [str, date, int, str]
+        self.widget = TableView(header, columnTypes, showRowNumbers=False, 
+                                readOnly=True)
+        self.widget.setColumnHidden(header.index('Filename'), True)
         self.widget.setSelectionMode(QAbstractItemView.SingleSelection)
-        self.populateWidget(stories)
-        self.widget.resizeColumnsToContents()
+        self.widget.setSelectionBehavior(QAbstractItemView.SelectRows)
+        # most recent first
+        self.widget.sort('Date', Qt.DescendingOrder)
+        
+        self.progressBar = QProgressBar()
+        self.progressBar.setFormat("Found %v of %m stories")
+        self.progressBar.setMaximum(0)
         
         self._makeLayout()
+        self.layout.insertWidget(self.layout.indexOf(self.widget)+1, 
+                                 self.progressBar)
+        
+        if library is None:
+            library = StoryLibrary(FileStorage(self.path))
+        self.library = library
+        self.library.storiesAdded.connect(self.populateWidget)
+        self.library.storiesChanged.connect(self.updateStories)
+        self.library.storiesRemoved.connect(self.removeStories)
+        self.library.progress.connect(self.setProgress)
+        self.library.ready.connect(self.scanFinished)
+        if instrument.enabled:
+            instruments.mark('OpenStoryDialog scan')
+        # stories the library has already found
+        if self.library.records:
+            self.populateWidget(list(self.library.records.values()))
+        if self.library.isReady:
+            self.scanFinished()
+        # storage which can't be watched is listed again
+        self.library.start()
         
         
     @pyqtSlot()
     def accept(self):
         """ Set `story` proprety from currently selected list item. """
         row = self.widget.currentRow
-        self.value = f"{row['Date']} {row['Title']}.html"
+        if row is None:
+            # nothing selected, so leave the dialog open
+            return
+        self.value = row['Filename']
         super().accept()
         
         
-    def populateWidget(self, titles):
-        """ Add data from list of `titles` to the table. """
-        for t in titles:
-            title, _ = os.path.splitext(t)
-            srch = re.search(r"(\d{4}-\d{2}-\d{2} )(.+)", title)
-            date = srch.group(1).strip()
-            title = srch.group(2).strip()
-            # TODO store this info in database
-            # Also the wordcount returned here is wrong
-            with open(os.path.join(self.path, t)) as fileobj:
-                text = fileobj.read()
-            wordcount = StoryEditor.countWordsInText(text)
-            self.widget.addRow(title, date, wordcount)
-        # most recent first
-        self.widget.sort('Date', Qt.DescendingOrder)
+    def done(self, result):
+        """ Stop following the library when the dialog is closed. """
+        for signal, slot in [(self.library.storiesAdded, self.populateWidget),
+                             (self.library.storiesChanged, self.updateStories),
+                             (self.library.storiesRemoved, self.removeStories),
+                             (self.library.progress, self.setProgress),
+                             (self.library.ready, self.scanFinished)]:
+            signal.disconnect(slot)
+        self.filterEngine.cancel()
+        super().done(result)
+        
+        
+    @pyqtSlot(list)
+    def populateWidget(self, stories):
+        """ Add data from list of `StoryRecord`s to the table. """
+        start = self.widget.tableModel.storageRowCount
+        rows = [(story.title, story.date, story.wordcount, story.filename)
+                for story in stories]
+        self.widget.addRows(rows)
+        for n, story in enumerate(stories):
+            self.rows[story.filename] = start + n
+        if start == 0:
+            self.widget.resizeColumnsToContents()
+        self.stories += stories
+        self.filterEngine.addRows([(story.title, story.date, str(story.wordcount)) 
+                                   for story in stories])
+        self._textIndexChecked = False
+        # if there is a full text search, apply it to the new rows
+        if self.fullTextBox.isChecked() and self.searchBar.edit.text():
+            self.searchBar.requestSearch()
+        
+    @pyqtSlot(list)
+    def updateStories(self, stories):
+        """ Update the table rows of list of changed `StoryRecord`s. """
+        rows = {self.rows[story.filename]:story for story in stories 
+                if story.filename in self.rows}
+        self.widget.updateRows({row:(story.title, story.date, story.wordcount, 
+                                     story.filename)
+                                for row, story in rows.items()})
+        self.filterEngine.updateRows({row:(story.title, story.date, 
+                                           str(story.wordcount))
+                                      for row, story in rows.items()})
+        for row, story in rows.items():
+            self.stories[row] = story
+        self._textIndexChecked = False
+        
+    @pyqtSlot(list)
+    def removeStories(self, filenames):
+        """ Remove the table rows of list of `filenames`. """
+        rows = [self.rows.pop(filename) for filename in filenames 
+                if filename in self.rows]
+        self.widget.dropRows(rows)
+        self.filterEngine.dropRows(rows)
+        for row in rows:
+            self.stories[row] = None
+        
+        
+    @pyqtSlot(int, int)
+    def setProgress(self, done, total):
+        self.progressBar.setMaximum(total)
+        self.progressBar.setValue(done)
+        
+        
+    @pyqtSlot()
+    def scanFinished(self):
+        if instrument.enabled:
+            instruments.elapsed('OpenStoryDialog scan')
+        self.progressBar.hide()
+        self._scanFinished = True
     
     
     @pyqtSlot(str, bool)
+    @timed('OpenStoryDialog.search')
     def search(self, text, caseSensitive):
-        """ Search for `text` in the table. """
-        if not text:
-            # if empty search string, make sure all rows are visible and 
-            # return from this method
-            for idx in range(self.widget.rowCount):
-                self.widget.showRow(idx)
-            return None
+        """ Search for `text` in the table. 
         
-        if not caseSensitive:
-            text = text.lower()
-
-        for idx in range(self.widget.rowCount):
-            row = self.widget.getRow(idx)
-            hideRow = True
-            for item in row:
-                if not caseSensitive:
-                    item = item.lower()
-                if text in item:
-                    hideRow = False
-            if hideRow:
-                self.widget.hideRow(idx)
-            elif self.widget.isRowHidden(idx):
-                self.widget.showRow(idx)
+            Title, date and wordcount are searched by the `FilterEngine`, 
+            which calls `applyFilter` when it has finished.
+        """
+        if text and self.fullTextBox.isChecked():
+            self.filterEngine.cancel()
+            start = time.perf_counter()
+            self.searchText(text)
+            self.searchBar.setFilterCost(time.perf_counter() - start)
+        else:
+            self.filterEngine.setQuery(text, caseSensitive)
+        
+        
+    @pyqtSlot(object)
+    def applyFilter(self, rows):
+        """ Show only storage `rows` in the table, or all rows if None. """
+        self.widget.setRowFilter(rows)
+        if instrument.enabled:
+            instruments.elapsed('search', 'search to rows filtered')
+        
+        
+    def searchText(self, query):
+        """ Show stories whose text matches `query`, best match first.
+        
+            Search is not case sensitive. Phrases can be given in double 
+            quotes and prefixes with a trailing '*'.
+        """
+        # only bring the text index up to date once all the stories are known,
+        # otherwise stories not found yet would be removed from it
+        if self._scanFinished and not self._textIndexChecked:
+            failed = self.textIndex.refresh([story for story in self.stories 
+                                             if story is not None], 
+                                            storage=self.library.storage)
+            self._textIndexChecked = True
+            self._showUnreadable(failed)
+        results = self.textIndex.search(query)
+        rows = [self.rows[filename] for filename, _ in results 
+                if filename in self.rows]
+        self.widget.setRowFilter(rows, ordered=True)
+        if instrument.enabled:
+            instruments.elapsed('search', 'search to rows filtered')
+        
+    def _showUnreadable(self, failed):
+        """ Say which stories couldn't be searched, from list of 
+            (filename, message). 
+        """
+        if not failed:
+            self.fullTextLabel.setText("Search story text")
+            self.fullTextLabel.setToolTip("")
+            return
+        self.fullTextLabel.setText(f"Search story text ({len(failed)} unreadable)")
+        self.fullTextLabel.setToolTip("\n".join(f"{filename}: {message}" 
+                                                for filename, message in failed))
     
     
 class TitleListDialog(AbstractDialog):
+    """ Dialog showing a searchable list of titles from the 'title_list' file.
+    
+        Titles are searched by prefix, then substring, then similarity, 
+        using a `TitleIndex`, so searching stays quick with very long lists.
+    
+        Parameters
+        ----------
+        path : str
+            Path to directory where stories are stored.
+    """
     
+    @timed('TitleListDialog construction')
     def __init__(self, path):
         super().__init__(path, "View or edit list of titles")
         
         self.path = path
         
-        file = os.path.join(self.path, 'title_list')
-        
-        # make file if it doesn't exist
-        if not os.path.exists(file):
-            with open(file, 'w') as fileobj:
-                fileobj.write("")
-
-        with open(file) as fileobj:
-            text = fileobj.read()
-        titles = [title for title in text.split('\n') if title]
-        
-        self.widget = QListWidget()
-        self.populateWidget(titles)
+        self.widget = QListView()
+        self.widget.setUniformItemSizes(True)
+        self.widget.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.populateWidget(TitleIndex(self.path))
         
         self._makeLayout()
         
         
     def populateWidget(self, titles):
-        self.widget.addItems(sorted(titles))
+        """ Show titles from `TitleIndex`. """
+        self.titles = titles
+        self.titleModel = TitleListModel(self.titles)
+        self.widget.setModel(self.titleModel)
+        
+        
+    @pyqtSlot()
+    def accept(self):
+        """ Set `value` to the currently selected title. """
+        index = self.widget.currentIndex()
+        self.value = self.titleModel.data(index) if index.isValid() else None
+        super().accept()
         
         
     @pyqtSlot(str, bool)
+    @timed('TitleListDialog.search')
     def search(self, text, caseSensitive):
-        """ Search for `text` in the table. """
+        """ Search for `text` in the list. """
         if not text:
-            # if empty search string, make sure all rows are visible and 
-            # return from this method
-            for idx in range(self.widget.count):
-                item = self.widget.item(idx)
-                item.setHidden(False)
+            # if empty search string, show all titles
+            self.titleModel.setMatches(None)
             return None
-        
-        if not caseSensitive:
-            text = text.lower()
-
-        for idx in range(self.widget.count):
-            item = self.widget.item(idx)
-            itemText = item.text()
-            hideRow = True
-            if not caseSensitive:
-                itemText = itemText.lower()
-            if text in itemText:
-                hideRow = False
-            if hideRow:
-                item.setHidden(True)
-            elif item.isHidden():
-                item.setHidden(False)
-    
-        
\ No newline at end of file
+        # matches are found lazily as the view needs them, so there's nothing 
+        # left running to cancel when the next search comes in
+        start = time.perf_counter()
+        self.titleModel.setMatches(self.titles.search(text, caseSensitive))
+        self.searchBar.setFilterCost(time.perf_counter() - start)
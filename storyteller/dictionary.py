@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:02:44 2026
+
+@author: keziah
+
+Compact, memory-mapped dictionary for spellchecking.
+
+A word list is compiled into a file of the sorted, casefolded words, as
+UTF-8, with an array of offsets, so that words can be looked up by binary
+search without loading the list into memory.
+
+Suggestions come from a symmetric delete index: every word, and every
+string made by deleting one character from a word, is hashed, and the
+(hash, word number) pairs are stored as a sorted array of 64 bit integers.
+A misspelled word matches dictionary words which share a hash with it or
+one of its deletes, which finds most words within two edits.
+"""
+
+import os
+import json
+import mmap
+import zlib
+from array import array
+from bisect import bisect_left
+
+magic = b"DICT1\n"
+indexMagic = b"DELS1\n"
+
+
+def _sourceSignature(paths):
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append([os.path.abspath(path), stat.st_size, stat.st_mtime])
+    return signature
+
+
+def _writeWithHeader(path, fileMagic, header, data):
+    """ Write `fileMagic`, JSON `header` line padded so that `data` starts on
+        an 8 byte boundary, then `data`.
+    """
+    head = fileMagic + json.dumps(header).encode() + b"\n"
+    head += b" " * (-len(head) % 8)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as fileobj:
+        fileobj.write(head)
+        for part in data:
+            fileobj.write(part)
+    os.replace(tmp, path)
+
+
+def _readHeader(mm, fileMagic):
+    """ Return (header, start of data) of file written by `_writeWithHeader`. """
+    if mm[:len(fileMagic)] != fileMagic:
+        raise ValueError("Not a dictionary file")
+    end = mm.find(b"\n", len(fileMagic)) + 1
+    header = json.loads(mm[len(fileMagic):end])
+    # skip the padding
+    start = end + (-end % 8)
+    return header, start
+
+
+def normaliseWord(word):
+    """ Return `word` as it is stored in the dictionary. """
+    return word.replace('’', "'").casefold()
+
+
+def compileWordList(sources, dest):
+    """ Compile word list files `sources` (one word per line) into a
+        dictionary at `dest`.
+    """
+    words = set()
+    for source in sources:
+        with open(source, errors='replace') as fileobj:
+            for line in fileobj:
+                word = line.strip()
+                if word:
+                    words.add(normaliseWord(word).encode('utf-8'))
+    words = sorted(words)
+    offsets = array('I', [0])
+    total = 0
+    for word in words:
+        total += len(word)
+        offsets.append(total)
+    header = {'sources':_sourceSignature(sources), 'count':len(words)}
+    _writeWithHeader(dest, magic, header, [offsets.tobytes()] + words)
+
+
+def deletes(word):
+    """ Return set of strings made by deleting one character from `word`. """
+    return {word[:n] + word[n+1:] for n in range(len(word))}
+
+
+def _hash(word):
+    return zlib.crc32(word.encode('utf-8'))
+
+
+def compileDeleteIndex(dictPath, dest, maxLength=20):
+    """ Compile symmetric delete index for the dictionary at `dictPath` into
+        `dest`. Words longer than `maxLength` are left out.
+    """
+    dictionary = Dictionary(dictPath)
+    entries = []
+    for n in range(len(dictionary)):
+        word = dictionary.word(n)
+        if len(word) > maxLength:
+            continue
+        for string in deletes(word) | {word}:
+            entries.append(_hash(string) << 32 | n)
+    entries.sort()
+    dictionary.close()
+    header = {'dictionary':_sourceSignature([dictPath])}
+    _writeWithHeader(dest, indexMagic, header, [array('Q', entries).tobytes()])
+
+
+def isCurrent(path, fileMagic, key, sources):
+    """ Return True if compiled file at `path` is up to date with `sources`. """
+    if not os.path.exists(path):
+        return False
+    try:
+        with open(path, 'rb') as fileobj:
+            mm = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            header, _ = _readHeader(mm, fileMagic)
+        finally:
+            mm.close()
+    except (OSError, ValueError):
+        return False
+    return header.get(key, None) == _sourceSignature(sources)
+
+
+def prepareDictionary(sources, dictPath, indexPath):
+    """ Compile the dictionary and delete index, if they are out of date.
+
+        This is a module level function so that it can be run in another
+        process.
+    """
+    if not isCurrent(dictPath, magic, 'sources', sources):
+        compileWordList(sources, dictPath)
+    if not isCurrent(indexPath, indexMagic, 'dictionary', [dictPath]):
+        compileDeleteIndex(dictPath, indexPath)
+
+
+class Dictionary:
+    """ Sorted word list compiled by `compileWordList`, memory-mapped from
+        `path`.
+
+        Supports `len`, indexing (returning the UTF-8 bytes of each word)
+        and `in` (with a str).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fileobj:
+            self._mmap = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        header, start = _readHeader(self._mmap, magic)
+        self._length = header['count']
+        end = start + (self._length + 1) * 4
+        self._offsets = memoryview(self._mmap)[start:end].cast('I')
+        self._wordsStart = end
+
+    def close(self):
+        self._offsets.release()
+        self._mmap.close()
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, n):
+        if n < 0 or n >= self._length:
+            raise IndexError("Dictionary index out of range")
+        start = self._wordsStart + self._offsets[n]
+        return self._mmap[start:self._wordsStart + self._offsets[n+1]]
+
+    def word(self, n):
+        """ Return word `n` as a str. """
+        return self[n].decode('utf-8')
+
+    def __contains__(self, word):
+        key = normaliseWord(word).encode('utf-8')
+        n = bisect_left(self, key)
+        return n < self._length and self[n] == key
+
+
+class DeleteIndex:
+    """ Symmetric delete index compiled by `compileDeleteIndex`, memory-mapped
+        from `path`, for finding suggestions in `dictionary`.
+    """
+
+    def __init__(self, path, dictionary):
+        self.path = path
+        self.dictionary = dictionary
+        with open(path, 'rb') as fileobj:
+            self._mmap = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        _, start = _readHeader(self._mmap, indexMagic)
+        self._entries = memoryview(self._mmap)[start:].cast('Q')
+
+    def close(self):
+        self._entries.release()
+        self._mmap.close()
+
+    def candidates(self, word):
+        """ Return set of numbers of dictionary words sharing a delete with
+            `word`.
+        """
+        found = set()
+        entries = self._entries
+        for string in deletes(word) | {word}:
+            key = _hash(string) << 32
+            n = bisect_left(entries, key)
+            while n < len(entries) and entries[n] >> 32 == key >> 32:
+                found.add(entries[n] & 0xffffffff)
+                n += 1
+        return found
+
+    def suggest(self, word, limit=8, maxDistance=2):
+        """ Return up to `limit` dictionary words within `maxDistance` edits
+            of `word`, closest first.
+        """
+        key = normaliseWord(word)
+        scored = []
+        for n in self.candidates(key):
+            candidate = self.dictionary.word(n)
+            distance = editDistance(key, candidate, maxDistance)
+            if distance <= maxDistance:
+                scored.append((distance, abs(len(candidate) - len(key)), candidate))
+        scored.sort()
+        return [matchCase(word, candidate) for *_, candidate in scored[:limit]]
+
+
+def editDistance(a, b, maxDistance=None):
+    """ Return the Damerau-Levenshtein (optimal string alignment) distance
+        between strings `a` and `b`.
+
+        If `maxDistance` is given, stop as soon as the distance must be
+        larger, and return `maxDistance + 1`.
+    """
+    if maxDistance is not None and abs(len(a) - len(b)) > maxDistance:
+        return maxDistance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i-1] == b[j-1] else 1
+            current[j] = min(previous[j] + 1, current[j-1] + 1, previous[j-1] + cost)
+            if (i > 1 and j > 1 and a[i-1] == b[j-2] and a[i-2] == b[j-1]):
+                current[j] = min(current[j], previous2[j-2] + 1)
+        if maxDistance is not None and min(current) > maxDistance:
+            return maxDistance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def matchCase(original, word):
+    """ Return `word` with the same capitalisation as `original`. """
+    if original.isupper() and len(original) > 1:
+        return word.upper()
+    if original[:1].isupper():
+        return word[:1].upper() + word[1:]
+    return word
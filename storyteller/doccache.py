@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 09:41:17 2026
+
+@author: keziah
+"""
+
+from collections import OrderedDict
+
+
+class DocumentCache:
+    """ Open chapter documents of any number of `ChapteredStory`s, least
+        recently used first, which are closed when their estimated memory
+        is more than `maxBytes`.
+
+        A closed chapter which hasn't changed is read from its story again
+        when it is next opened; one which has changed is kept encoded in the
+        compact story format (see `ChapteredStory.evict`) and decoded.
+
+        The `current` document, i.e. the one in the editor, and the most
+        recently used one are never closed.
+
+        Parameters
+        ----------
+        maxBytes : int
+            Estimated memory the documents can use. Default is 64MB.
+    """
+
+    # rough memory used by a QTextDocument for each character (UTF-16 text,
+    # fragments and formats) and each block (layout, once it has been shown)
+    bytesPerCharacter = 16
+    bytesPerBlock = 1024
+
+    def __init__(self, maxBytes=64*1024*1024):
+        self.maxBytes = maxBytes
+        self.current = None
+        # (story, chapter number) for each open document, by (id(story), n)
+        self._documents = OrderedDict()
+
+    def __len__(self):
+        return len(self._documents)
+
+    @classmethod
+    def estimate(cls, document):
+        """ Return estimated memory used by QTextDocument `document`. """
+        return (document.characterCount() * cls.bytesPerCharacter
+                + document.blockCount() * cls.bytesPerBlock)
+
+    def size(self):
+        """ Return estimated memory used by all the open documents. """
+        return sum(self.estimate(story.chapters[n].document)
+                   for story, n in self._documents.values())
+
+    def touch(self, story, n):
+        """ Mark chapter `n` of `story` as the most recently used, and close
+            the least recently used documents if there are too many.
+        """
+        key = (id(story), n)
+        self._documents[key] = (story, n)
+        self._documents.move_to_end(key)
+        self.evict()
+
+    def discard(self, story, n):
+        """ Forget chapter `n` of `story`, e.g. because it has been closed. """
+        self._documents.pop((id(story), n), None)
+
+    def discardStory(self, story):
+        """ Forget all the chapters of `story`, e.g. when its tab is closed. """
+        for key in [key for key in self._documents if key[0] == id(story)]:
+            del self._documents[key]
+
+    def evict(self):
+        """ Close least recently used documents until they fit in `maxBytes`. """
+        sizes = []
+        for key, (story, n) in self._documents.items():
+            document = story.chapters[n].document
+            if document is None:
+                # closed without being discarded
+                sizes.append((key, None, 0))
+            else:
+                sizes.append((key, document, self.estimate(document)))
+        total = sum(size for _, _, size in sizes)
+        # the most recently used is kept, however big it is
+        for key, document, size in sizes[:-1]:
+            if document is None:
+                del self._documents[key]
+                continue
+            if total <= self.maxBytes:
+                break
+            if document is self.current:
+                continue
+            story, n = self._documents.pop(key)
+            story.evict(n)
+            total -= size
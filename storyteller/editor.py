@@ -6,39 +6,166 @@ Created on Wed Dec 23 17:46:05 2020
 @author: keziah
 """
 
-import re
+from PyQt5.QtGui import QTextCursor, QTextDocument
 from PyQt5.QtWidgets import QTextEdit
-from PyQt5.QtCore import pyqtSlot, pyqtSignal, QTimer
+from PyQt5.QtCore import pyqtSlot, pyqtSignal
+from .wordcount import countWordsInText, BlockWordCounter
+from .spellcheck import SpellHighlighter, wordAt
+from . import instrument
+from .instrument import instruments, timed
 
 
 class StoryEditor(QTextEdit):
-    
+
     wordCount = pyqtSignal(int)
-    """ **signal** wordCount 
-    
+    """ **signal** wordCount
+
         Emitted when the word count changes.
     """
-    
+
+    blocksChanged = pyqtSignal(int, list, int)
+    """ **signal** blocksChanged(int `first`, list `texts`, int `blockCount`)
+
+        Emitted with the text of the blocks touched by an edit, starting
+        with block number `first`, and the number of blocks in the document
+        after it (see `BlockWordCounter.update`). `first` is -1 if `texts`
+        are all the blocks, e.g. when another document has been set.
+    """
+
     def __init__(self):
         super().__init__()
-        
+        # the editor's own document would be deleted when another is set
+        super().setDocument(QTextDocument(self))
+
         self.count = 0
-        self.timer = QTimer()
-        self.timer.setSingleShot(True)
-        self.timer.setInterval(100)
-        self.timer.timeout.connect(self.countWords)
-        self.textChanged.connect(self.timer.start)
-        
-    @staticmethod    
-    def countWordsInText(text):
-        words = re.split(r"\s+", text.strip())
-        words = [word for word in words if word]
-        return len(words)
-       
-    @pyqtSlot()
-    def countWords(self):
-        text = self.toPlainText()
-        count = self.countWordsInText(text)
+        # word count of each paragraph, so only edited paragraphs need to be
+        # counted again
+        self.counter = BlockWordCounter()
+        self.document().contentsChange.connect(self._contentsChange)
+        self.countWords()
+
+        self.spellChecker = None
+        self.highlighter = None
+
+    countWordsInText = staticmethod(countWordsInText)
+
+    def setDocument(self, document):
+        """ Show `document`, e.g. another chapter, in the editor. """
+        self.document().contentsChange.disconnect(self._contentsChange)
+        document.setDefaultFont(self.font())
+        super().setDocument(document)
+        document.contentsChange.connect(self._contentsChange)
+        self.countWords()
+        if self.spellChecker is not None:
+            self.setSpellChecker(self.spellChecker)
+
+    def _blockTexts(self, first=None, last=None):
+        """ Return list of text in blocks from `first` to `last` (inclusive).
+
+            If not given, `first` and `last` default to the start and end of
+            the document.
+        """
+        doc = self.document()
+        block = doc.firstBlock() if first is None else first
+        last = doc.lastBlock() if last is None else last
+        texts = []
+        while block.isValid():
+            texts.append(block.text())
+            if block == last:
+                break
+            block = block.next()
+        return texts
+
+    def keyPressEvent(self, event):
+        if instrument.enabled:
+            instruments.mark('keystroke')
+        super().keyPressEvent(event)
+
+    def _setCount(self, count):
         if count != self.count:
             self.count = count
-            self.wordCount.emit(self.count)
\ No newline at end of file
+            self.wordCount.emit(self.count)
+        if instrument.enabled:
+            instruments.elapsed('keystroke', 'keystroke to wordCount')
+
+    @pyqtSlot()
+    @timed('StoryEditor.countWords')
+    def countWords(self):
+        """ Count words in the whole document. """
+        texts = self._blockTexts()
+        self.counter.reset(texts)
+        self._setCount(self.counter.total)
+        self.blocksChanged.emit(-1, texts, len(texts))
+
+    @pyqtSlot(int, int, int)
+    def _contentsChange(self, position, removed, added):
+        """ Update word count for the blocks affected by an edit. """
+        doc = self.document()
+        first = doc.findBlock(position)
+        last = doc.findBlock(position + added)
+        if not last.isValid():
+            last = doc.lastBlock()
+        if not first.isValid():
+            self.countWords()
+            return
+        texts = self._blockTexts(first, last)
+        if self.counter.update(first.blockNumber(), texts, doc.blockCount()):
+            self._setCount(self.counter.total)
+            self.blocksChanged.emit(first.blockNumber(), texts, doc.blockCount())
+        else:
+            self.countWords()
+
+    def setSpellChecker(self, checker):
+        """ Underline words misspelled according to `SpellChecker` `checker`,
+            or stop spellchecking if `checker` is None.
+        """
+        if self.highlighter is not None:
+            self.highlighter.stop()
+            self.highlighter.setDocument(None)
+            self.highlighter.deleteLater()
+            self.highlighter = None
+        self.spellChecker = checker
+        if checker is not None:
+            self.highlighter = SpellHighlighter(self.document(), checker)
+
+    def contextMenuEvent(self, event):
+        menu = self.createStandardContextMenu(event.pos())
+        cursor = self._misspelledWordAt(event.pos())
+        if cursor is not None:
+            word = cursor.selectedText()
+            first = menu.actions()[0] if menu.actions() else None
+            suggestions = self.spellChecker.suggest(word)
+            if not suggestions:
+                action = menu.addAction("No suggestions")
+                action.setEnabled(False)
+                menu.insertAction(first, action)
+            for suggestion in suggestions:
+                action = menu.addAction(suggestion)
+                action.triggered.connect(
+                    lambda _, c=cursor, s=suggestion: c.insertText(s))
+                menu.insertAction(first, action)
+            action = menu.addAction("Add to dictionary")
+            action.triggered.connect(lambda _, w=word: self._addWord(w))
+            menu.insertAction(first, action)
+            menu.insertSeparator(first)
+        menu.exec_(event.globalPos())
+
+    def _misspelledWordAt(self, pos):
+        """ Return cursor selecting misspelled word at `pos`, or None. """
+        if self.spellChecker is None or not self.spellChecker.ready:
+            return None
+        cursor = self.cursorForPosition(pos)
+        block = cursor.block()
+        span = wordAt(block.text(), cursor.positionInBlock())
+        if span is None:
+            return None
+        start, end = span
+        cursor.setPosition(block.position() + start)
+        cursor.setPosition(block.position() + end, QTextCursor.KeepAnchor)
+        if self.spellChecker.check(cursor.selectedText()):
+            return None
+        return cursor
+
+    def _addWord(self, word):
+        self.spellChecker.addWord(word)
+        self.highlighter.recheck()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:40:12 2026
+
+@author: keziah
+
+Export stories as plain text or Markdown files, or a zip of them.
+"""
+
+import os
+import re
+import json
+import zlib
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from .storyindex import parseStoryFilename, storyEntries
+from .storyparser import lineSeparator, paragraphText
+from . import storyformat
+
+exportFormats = ['txt', 'md']
+
+_markdownSpecial = re.compile(r"([\\`*_\[\]#<>~|])")
+
+
+def paragraphMarkdown(runs):
+    """ Return Markdown for a paragraph, from its list of (text, format) runs. """
+    parts = []
+    for text, fmt in runs:
+        text = _markdownSpecial.sub(r"\\\1", text)
+        markers = ""
+        if fmt.get('bold', False):
+            markers += "**"
+        if fmt.get('italic', False):
+            markers += "*"
+        if fmt.get('strike', False):
+            markers += "~~"
+        stripped = text.strip()
+        if (markers or fmt.get('underline', False)) and stripped:
+            # markers have to be next to the text, so keep whitespace outside
+            lead = text[:len(text) - len(text.lstrip())]
+            trail = text[len(text.rstrip()):]
+            if fmt.get('underline', False):
+                stripped = f"<u>{stripped}</u>"
+            text = f"{lead}{markers}{stripped}{markers[::-1]}{trail}"
+        parts.append(text)
+    return "".join(parts).replace(lineSeparator, "  \n")
+
+
+def formatStory(title, paragraphs, fmt='txt'):
+    """ Return story as a string in format `fmt`, 'txt' or 'md'.
+
+        `paragraphs` is a list of lists of (text, format) runs.
+    """
+    if fmt == 'md':
+        title = _markdownSpecial.sub(r"\\\1", title)
+        body = "\n\n".join(paragraphMarkdown(runs) for runs in paragraphs if runs)
+        return f"# {title}\n\n{body}\n"
+    if fmt == 'txt':
+        body = "\n".join(paragraphText(runs).replace(lineSeparator, "\n")
+                         for runs in paragraphs)
+        return f"{title}\n\n{body}\n"
+    msg = f"Export format should be one of {exportFormats}, not '{fmt}'."
+    raise ValueError(msg)
+
+
+def convertStory(path, fmt='txt'):
+    """ Return story at `path` as a string in format `fmt`.
+
+        This is a module level function so that it can be used in a
+        process pool.
+    """
+    title, paragraphs = storyformat.readStoryParagraphs(path)
+    if not title:
+        parsed = parseStoryFilename(os.path.basename(path))
+        title = parsed[1] if parsed is not None else ""
+    return formatStory(title, paragraphs, fmt)
+
+
+def _convertStory(path, fmt):
+    # for the process pool: return errors, rather than raising them, so that
+    # one bad story doesn't stop the export
+    try:
+        return path, convertStory(path, fmt), None
+    except (OSError, ValueError, KeyError, IndexError, AssertionError,
+            zlib.error) as err:
+        return path, None, str(err)
+
+
+def exportName(filename, fmt):
+    """ Return name of exported file for story `filename`. """
+    return os.path.splitext(filename)[0] + '.' + fmt
+
+
+def exportStory(path, dest, fmt=None):
+    """ Export story at `path` to file `dest`.
+
+        If `fmt` is not given, it is taken from the extension of `dest`.
+    """
+    if fmt is None:
+        fmt = os.path.splitext(dest)[1].lstrip('.')
+    writeExport(dest, convertStory(path, fmt))
+
+
+def writeExport(dest, text, archive=False):
+    """ Write exported story `text` to file `dest`.
+
+        If `archive` is True, `dest` is a zip file, containing one file named
+        after `dest` without the '.zip' extension.
+    """
+    if not archive:
+        _writeText(dest, text)
+        return
+    name = os.path.basename(dest)
+    if name.endswith('.zip'):
+        name = name[:-len('.zip')]
+    with zipfile.ZipFile(dest, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(name, text.encode('utf-8'))
+
+
+def _writeText(path, text):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fileobj:
+        fileobj.write(text)
+    os.replace(tmp, path)
+
+
+def libraryStories(path):
+    """ Return dict of story filename: (size, mtime) for stories in `path`.
+
+        If a story has been saved in both html and the native format, only
+        the native file is included.
+    """
+    stories = {}
+    for entry in storyEntries(path):
+        stat = entry.stat()
+        stories[entry.name] = (stat.st_size, stat.st_mtime)
+    return stories
+
+
+class LibraryExport:
+    """ Export every story in a directory, to a directory of text or Markdown
+        files, or a zip of them.
+
+        A manifest of the stories and their size and modification time is
+        kept with the export, so that exporting again only converts the
+        stories that have changed. Stories are converted in a process pool
+        if there are many of them, and written as each one is finished.
+
+        Parameters
+        ----------
+        path : str
+            Path to directory where stories are stored.
+        dest : str
+            Directory to export to or, if `archive` is True, path of zip file.
+        fmt : {'txt', 'md'}
+            Format of exported stories. Default is 'txt'.
+        archive : bool
+            If True, write a zip file. Default is False.
+        jobs : int, optional
+            Number of processes to use. Default is the number of CPUs.
+        processThreshold : int
+            Only use a process pool if more than this many stories have
+            changed. Default is 20.
+    """
+
+    manifestName = '.export-manifest.json'
+    archiveManifestName = 'manifest.json'
+
+    def __init__(self, path, dest, fmt='txt', archive=False, jobs=None,
+                 processThreshold=20):
+        if fmt not in exportFormats:
+            msg = f"Export format should be one of {exportFormats}, not '{fmt}'."
+            raise ValueError(msg)
+        self.path = path
+        self.dest = dest
+        self.fmt = fmt
+        self.archive = archive
+        self.jobs = jobs
+        self.processThreshold = processThreshold
+        self.errors = {}
+
+    def readManifest(self):
+        """ Return dict of filename: [size, mtime] from the last export. """
+        try:
+            if self.archive:
+                with zipfile.ZipFile(self.dest) as zf:
+                    data = json.loads(zf.read(self.archiveManifestName))
+            else:
+                with open(os.path.join(self.dest, self.manifestName)) as fileobj:
+                    data = json.load(fileobj)
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return {}
+        if data.get('format', None) != self.fmt:
+            return {}
+        return data.get('stories', {})
+
+    def changes(self, stories=None):
+        """ Compare the library with the last export.
+
+            `stories` is the dict returned by `libraryStories`; if not given,
+            the directory is scanned.
+
+            Returns
+            -------
+            changed : list
+                Filenames of stories which are new or have changed
+            unchanged : dict
+                filename: (size, mtime) for stories which haven't changed
+            removed : list
+                Filenames of exported stories which are no longer in the
+                library
+        """
+        if stories is None:
+            stories = libraryStories(self.path)
+        manifest = self.readManifest()
+        changed = []
+        unchanged = {}
+        for filename, stat in sorted(stories.items()):
+            if tuple(manifest.get(filename, ())) == stat:
+                unchanged[filename] = stat
+            else:
+                changed.append(filename)
+        removed = [filename for filename in manifest if filename not in stories]
+        return changed, unchanged, removed
+
+    def _converted(self, filenames, cancelled):
+        """ Yield (filename, text) for each story in `filenames`, as they are
+            converted. Stories which can't be read are added to `errors`.
+        """
+        paths = [os.path.join(self.path, filename) for filename in filenames]
+        if len(paths) <= self.processThreshold:
+            results = (_convertStory(path, self.fmt) for path in paths)
+            for path, text, err in results:
+                if cancelled():
+                    return
+                yield from self._result(path, text, err)
+            return
+
+        jobs = self.jobs if self.jobs else (os.cpu_count() or 1)
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        # only keep a few stories in flight, so that converted text doesn't
+        # pile up in memory if writing is slower than converting
+        maxPending = 4 * jobs
+        try:
+            pending = set()
+            remaining = iter(paths)
+            while True:
+                for path in remaining:
+                    pending.add(executor.submit(_convertStory, path, self.fmt))
+                    if len(pending) >= maxPending:
+                        break
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if cancelled():
+                        return
+                    yield from self._result(*future.result())
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _result(self, path, text, err):
+        filename = os.path.basename(path)
+        if err is None:
+            yield filename, text
+        else:
+            self.errors[filename] = err
+
+    def run(self, progress=None, cancelled=None):
+        """ Export the stories which have changed since the last export.
+
+            Parameters
+            ----------
+            progress : callable, optional
+                Called with (done, total) after each story is exported.
+            cancelled : callable, optional
+                Called after each story; if it returns True, the export is
+                stopped. When exporting to a directory, the stories already
+                written are kept and recorded in the manifest.
+
+            Returns
+            -------
+            Number of stories exported, or None if cancelled.
+        """
+        if progress is None:
+            progress = lambda done, total: None
+        if cancelled is None:
+            cancelled = lambda: False
+        self.errors = {}
+        stories = libraryStories(self.path)
+        changed, unchanged, removed = self.changes(stories)
+        if self.archive:
+            return self._runArchive(changed, unchanged, stories, progress, cancelled)
+        return self._runDirectory(changed, unchanged, removed, stories, progress,
+                                  cancelled)
+
+    def _manifest(self, stories):
+        return json.dumps({'format':self.fmt, 'stories':stories}, indent=1)
+
+    def _runDirectory(self, changed, unchanged, removed, stories, progress, cancelled):
+        os.makedirs(self.dest, exist_ok=True)
+        for filename in removed:
+            exported = os.path.join(self.dest, exportName(filename, self.fmt))
+            if os.path.exists(exported):
+                os.remove(exported)
+
+        manifest = dict(unchanged)
+        done = 0
+        try:
+            for filename, text in self._converted(changed, cancelled):
+                _writeText(os.path.join(self.dest, exportName(filename, self.fmt)), text)
+                manifest[filename] = stories[filename]
+                done += 1
+                progress(done, len(changed))
+        finally:
+            # record whatever was written, so it isn't converted again
+            _writeText(os.path.join(self.dest, self.manifestName),
+                       self._manifest(manifest))
+        return None if cancelled() else done
+
+    def _runArchive(self, changed, unchanged, stories, progress, cancelled):
+        tmp = self.dest + '.tmp'
+        manifest = dict(unchanged)
+        done = 0
+        try:
+            with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED) as new:
+                # copy the stories which haven't changed from the old archive
+                if unchanged:
+                    with zipfile.ZipFile(self.dest) as old:
+                        names = set(old.namelist())
+                        for filename in list(unchanged):
+                            name = exportName(filename, self.fmt)
+                            if name not in names:
+                                manifest.pop(filename)
+                                changed.append(filename)
+                                continue
+                            with old.open(name) as src, new.open(name, 'w') as dst:
+                                shutil.copyfileobj(src, dst)
+                for filename, text in self._converted(changed, cancelled):
+                    new.writestr(exportName(filename, self.fmt), text.encode('utf-8'))
+                    manifest[filename] = stories[filename]
+                    done += 1
+                    progress(done, len(changed))
+                if cancelled():
+                    return None
+                new.writestr(self.archiveManifestName, self._manifest(manifest))
+            os.replace(tmp, self.dest)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return done
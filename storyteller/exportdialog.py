@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:05:37 2026
+
+@author: keziah
+"""
+
+import os
+import threading
+from PyQt5.QtWidgets import (QComboBox, QDialog, QDialogButtonBox, QFileDialog,
+                             QFormLayout, QHBoxLayout, QLineEdit, QPushButton,
+                             QRadioButton, QVBoxLayout, QWidget)
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+from .export import LibraryExport
+
+
+class LibraryExporter(QObject):
+    """ Run a `LibraryExport` on a worker thread.
+
+        Parameters
+        ----------
+        path : str
+            Path to directory where stories are stored.
+        dest : str
+            Directory or zip file to export to.
+        fmt : {'txt', 'md'}
+            Format of exported stories.
+        archive : bool
+            If True, write a zip file.
+    """
+
+    progress = pyqtSignal(int, int)
+    """ **signal** progress(int `done`, int `total`)
+
+        Emitted with the number of stories exported so far and the number to
+        export.
+    """
+
+    finished = pyqtSignal(int)
+    """ **signal** finished(int `count`)
+
+        Emitted with the number of stories exported, unless the export was
+        cancelled.
+    """
+
+    failed = pyqtSignal(str)
+    """ **signal** failed(str `message`)
+
+        Emitted if the export could not be written.
+    """
+
+    def __init__(self, path, dest, fmt='txt', archive=False):
+        super().__init__()
+        self.export = LibraryExport(path, dest, fmt=fmt, archive=archive)
+        self._cancelled = threading.Event()
+        self._task = None
+
+    def start(self):
+        """ Start exporting on the global thread pool. """
+        self._cancelled.clear()
+        self._task = _ExportTask(self)
+        QThreadPool.globalInstance().start(self._task)
+
+    @pyqtSlot()
+    def cancel(self):
+        """ Stop exporting as soon as possible. """
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        """ Export the library. This is called on a worker thread by `start`. """
+        try:
+            count = self.export.run(progress=self.progress.emit,
+                                    cancelled=lambda: self.cancelled)
+        except OSError as err:
+            self.failed.emit(str(err))
+            return
+        except Exception as err:
+            # anything else would be lost on the worker thread
+            self.failed.emit(f"{type(err).__name__}: {err}")
+            return
+        if count is not None:
+            self.finished.emit(count)
+
+
+class _ExportTask(QRunnable):
+    """ Runnable to call `LibraryExporter.run` on the thread pool. """
+
+    def __init__(self, exporter):
+        super().__init__()
+        self.exporter = exporter
+        self.setAutoDelete(False)
+
+    def run(self):
+        self.exporter.run()
+
+
+class ExportDialog(QDialog):
+    """ Dialog to choose what to export, in which format, and where.
+
+        Parameters
+        ----------
+        path : str
+            Path to directory where stories are stored, used as the default
+            export location.
+    """
+
+    formats = [("Plain text", 'txt', False), ("Markdown", 'md', False),
+               ("Zip of plain text", 'txt', True), ("Zip of Markdown", 'md', True)]
+
+    def __init__(self, path):
+        super().__init__()
+        self.setWindowTitle("Export")
+        self.path = path
+
+        self.storyButton = QRadioButton("Current story")
+        self.libraryButton = QRadioButton("Whole library")
+        self.storyButton.setChecked(True)
+
+        self.formatBox = QComboBox()
+        self.formatBox.addItems([name for name, *_ in self.formats])
+
+        self.destEdit = QLineEdit()
+        self.browseButton = QPushButton("Browse")
+        self.browseButton.clicked.connect(self.browse)
+        destLayout = QHBoxLayout()
+        destLayout.setContentsMargins(0, 0, 0, 0)
+        destLayout.addWidget(self.destEdit)
+        destLayout.addWidget(self.browseButton)
+        destWidget = QWidget()
+        destWidget.setLayout(destLayout)
+
+        for widget in [self.storyButton, self.libraryButton]:
+            widget.toggled.connect(self._setDefaultDest)
+        self.formatBox.currentIndexChanged.connect(self._setDefaultDest)
+
+        form = QFormLayout()
+        form.addRow(self.storyButton)
+        form.addRow(self.libraryButton)
+        form.addRow("Format", self.formatBox)
+        form.addRow("Export to", destWidget)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Ok|QDialogButtonBox.Cancel)
+        self.buttons.accepted.connect(self.accept)
+        self.buttons.rejected.connect(self.reject)
+
+        self.layout = QVBoxLayout()
+        self.layout.addLayout(form)
+        self.layout.addWidget(self.buttons)
+        self.setLayout(self.layout)
+
+        self.title = ""
+        self._setDefaultDest()
+
+    @property
+    def library(self):
+        """ True if the whole library should be exported. """
+        return self.libraryButton.isChecked()
+
+    @property
+    def fmt(self):
+        return self.formats[self.formatBox.currentIndex()][1]
+
+    @property
+    def archive(self):
+        return self.formats[self.formatBox.currentIndex()][2]
+
+    @property
+    def dest(self):
+        return self.destEdit.text()
+
+    def setTitle(self, title):
+        """ Set title of the current story, for the default file name. """
+        self.title = title
+        self._setDefaultDest()
+
+    @pyqtSlot()
+    def _setDefaultDest(self):
+        exportPath = os.path.join(self.path, 'export')
+        if self.library and self.archive:
+            dest = exportPath + '.zip'
+        elif self.library:
+            dest = exportPath
+        else:
+            name = self.title if self.title else "story"
+            dest = os.path.join(os.path.expanduser('~'), f"{name}.{self.fmt}")
+            if self.archive:
+                dest += '.zip'
+        self.destEdit.setText(dest)
+
+    @pyqtSlot()
+    def browse(self):
+        if self.library and not self.archive:
+            dest = QFileDialog.getExistingDirectory(self, "Export to", self.dest)
+        else:
+            dest, _ = QFileDialog.getSaveFileName(self, "Export to", self.dest)
+        if dest:
+            self.destEdit.setText(dest)
+
+    def execDialog(self):
+        """ Wrap `exec_()` call to return True if result is QDialog.Accepted
+            and False otherwise.
+        """
+        return self.exec_() == QDialog.Accepted
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:31:09 2026
+
+@author: keziah
+"""
+
+import time
+from array import array
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+
+class FilterEngine(QObject):
+    """ Incremental substring filter over rows of strings.
+
+        Each row is stored as its fields joined into one string, along with
+        a casefolded copy, so a row matches if any field contains the query.
+
+        When a query extends the previous one (e.g. the user typed another
+        character), only the rows which matched the previous query are
+        checked. Rows are checked for up to `timeSlice` seconds at a time,
+        then control returns to the event loop; if a new query arrives in
+        the meantime, the old one is dropped. The matching rows are emitted
+        in one go, with `filtered`, once the scan is finished.
+
+        Parameters
+        ----------
+        timeSlice : float
+            Maximum time in seconds to spend scanning before returning to the
+            event loop. Default is 0.008.
+        parent : QObject, optional
+            Parent object
+    """
+
+    filtered = pyqtSignal(object)
+    """ **signal** filtered(object `rows`)
+
+        Emitted with array of the indices of the rows that match the query,
+        in order, or None if there is no query and all rows should be shown.
+    """
+
+    costMeasured = pyqtSignal(float)
+    """ **signal** costMeasured(float `seconds`)
+
+        Emitted with the time spent scanning, when a query is finished.
+    """
+
+    # rows checked between looking at the clock
+    _step = 2000
+    # separates fields, so that a query can't match across two of them
+    _separator = '\x00'
+
+    def __init__(self, timeSlice=0.008, parent=None):
+        super().__init__(parent)
+        self.timeSlice = timeSlice
+        self._texts = []
+        self._folded = []
+        self._query = None
+        self._caseSensitive = False
+        self._candidates = None
+        self._position = 0
+        self._matches = array('l')
+        self._cost = 0
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self._scan)
+
+    def __len__(self):
+        return len(self._texts)
+
+    @property
+    def scanning(self):
+        """ True if the current query has not been finished yet. """
+        return self._candidates is not None
+
+    def addRows(self, rows):
+        """ Add list of `rows`, each of which is a sequence of strings.
+
+            If there is a query, the new rows are filtered too.
+        """
+        start = len(self._texts)
+        texts = [self._separator.join(row) for row in rows]
+        self._texts += texts
+        self._folded += [text.casefold() for text in texts]
+        if self._query is None:
+            return
+        newRows = range(start, len(self._texts))
+        if self.scanning:
+            self._candidates.extend(newRows)
+        else:
+            # check the new rows now and send the updated results
+            before = len(self._matches)
+            self._matches.extend(self._match(newRows))
+            if len(self._matches) != before:
+                self.filtered.emit(self._matches)
+
+    def updateRows(self, rows):
+        """ Replace rows, from dict of row index:sequence of strings.
+
+            If there is a query, the query is run again.
+        """
+        for n, row in rows.items():
+            text = self._separator.join(row)
+            self._texts[n] = text
+            self._folded[n] = text.casefold()
+        if rows and self._query is not None:
+            query = self._query
+            # the rows matched so far may no longer match
+            self._query = None
+            self.setQuery(query, self._caseSensitive)
+
+    def dropRows(self, rows):
+        """ Stop matching `rows`. They keep their place, so that the other
+            rows keep their indices.
+        """
+        self.updateRows({n:[] for n in rows})
+
+    def clear(self):
+        """ Remove all rows and the current query. """
+        self._texts = []
+        self._folded = []
+        self.cancel()
+
+    def cancel(self):
+        """ Drop the current query, without changing the filter. """
+        self._stop()
+        self._query = None
+
+    def _stop(self):
+        self.timer.stop()
+        self._candidates = None
+
+    def _match(self, rows):
+        if self._caseSensitive:
+            query, haystack = self._query, self._texts
+        else:
+            query, haystack = self._query.casefold(), self._folded
+        return [n for n in rows if query in haystack[n]]
+
+    @pyqtSlot(str, bool)
+    def setQuery(self, text, caseSensitive):
+        """ Filter rows with `text`, dropping any query still in progress. """
+        if not text:
+            self._stop()
+            self._query = None
+            self.filtered.emit(None)
+            return
+
+        narrow = (self._query is not None and caseSensitive == self._caseSensitive
+                  and text.startswith(self._query))
+        if narrow and self.scanning:
+            # rows already matched, followed by those not checked yet
+            candidates = self._matches
+            candidates.extend(self._candidates[self._position:])
+        elif narrow:
+            candidates = self._matches
+        else:
+            candidates = array('l', range(len(self._texts)))
+
+        self._stop()
+        self._query = text
+        self._caseSensitive = caseSensitive
+        self._candidates = candidates
+        self._position = 0
+        self._matches = array('l')
+        self._cost = 0
+        self._scan()
+
+    @pyqtSlot()
+    def _scan(self):
+        if self._candidates is None:
+            return
+        start = time.perf_counter()
+        end = start + self.timeSlice
+        while self._position < len(self._candidates):
+            stop = self._position + self._step
+            self._matches.extend(self._match(self._candidates[self._position:stop]))
+            self._position = stop
+            if time.perf_counter() > end:
+                break
+        self._cost += time.perf_counter() - start
+
+        if self._position < len(self._candidates):
+            self.timer.start()
+        else:
+            self._candidates = None
+            self.filtered.emit(self._matches)
+            self.costMeasured.emit(self._cost)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:02:33 2026
+
+@author: keziah
+"""
+
+from PyQt5.QtGui import QFontDatabase
+from PyQt5.QtWidgets import QComboBox
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+
+class FontFamilyModel(QAbstractListModel):
+    """ List model of font families, which only asks the font database for
+        the installed families when `populate` is called.
+
+        Until then, it only holds the given `family`, so that it can be shown
+        without enumerating every font on the system.
+
+        Parameters
+        ----------
+        family : str
+            Font family to show before the model is populated.
+        parent : QObject, optional
+            Parent object
+    """
+
+    def __init__(self, family, parent=None):
+        super().__init__(parent)
+        self.families = [family]
+        self.populated = False
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.families)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in [Qt.DisplayRole, Qt.EditRole]:
+            return None
+        return self.families[index.row()]
+
+    def populate(self):
+        """ Fill the model with all installed font families. """
+        if self.populated:
+            return
+        families = QFontDatabase().families()
+        if self.families[0] not in families:
+            families.insert(0, self.families[0])
+        self.beginResetModel()
+        self.families = families
+        self.populated = True
+        self.endResetModel()
+
+
+class FontComboBox(QComboBox):
+    """ QComboBox of font families, which are only listed when the popup is
+        first shown.
+
+        Parameters
+        ----------
+        family : str
+            Font family to select initially.
+    """
+
+    def __init__(self, family):
+        super().__init__()
+        self.fontModel = FontFamilyModel(family)
+        self.setModel(self.fontModel)
+        # size the box without measuring every family name
+        self.setSizeAdjustPolicy(QComboBox.AdjustToMinimumContentsLengthWithIcon)
+        self.setMinimumContentsLength(20)
+
+    def showPopup(self):
+        if not self.fontModel.populated:
+            family = self.currentText()
+            # current family hasn't changed, so don't emit currentIndexChanged
+            self.blockSignals(True)
+            self.fontModel.populate()
+            self.setCurrentIndex(self.fontModel.families.index(family))
+            self.blockSignals(False)
+        super().showPopup()
+
+    def setCurrentFamily(self, family):
+        """ Select `family`, adding it to the list if necessary. """
+        idx = self.findText(family)
+        if idx < 0:
+            self.fontModel.populate()
+            idx = self.findText(family)
+        if idx >= 0:
+            self.setCurrentIndex(idx)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:02:18 2026
+
+@author: keziah
+"""
+
+import html
+from datetime import datetime
+from PyQt5.QtWidgets import (QDialog, QDialogButtonBox, QHBoxLayout, QLabel,
+                             QListWidget, QListWidgetItem, QPushButton,
+                             QTextBrowser, QVBoxLayout)
+from PyQt5.QtCore import Qt, pyqtSlot
+
+_styles = {' ':"", '-':"color:#a00; text-decoration:line-through;",
+           '+':"color:#070;"}
+
+
+def diffHtml(diff):
+    """ Return html of list of (tag, text) paragraphs from `RevisionStore.diff`. """
+    parts = []
+    for tag, text in diff:
+        if tag is None:
+            parts.append(f"<p style='color:gray;'>[{text} unchanged paragraphs]</p>")
+        else:
+            parts.append(f"<p style='{_styles[tag]}'>{html.escape(text)}</p>")
+    return "".join(parts)
+
+
+class HistoryDialog(QDialog):
+    """ Dialog to browse the revisions of a story, show what changed in each
+        and choose one to restore.
+
+        Parameters
+        ----------
+        store : RevisionStore
+            Store of story revisions.
+        story : str
+            Title of the story.
+    """
+
+    def __init__(self, store, story):
+        super().__init__()
+        self.setWindowTitle(f"History of {story}" if story else "History")
+        self.store = store
+        self.story = story
+        self.value = None
+
+        self.revisionList = QListWidget()
+        self.revisionList.currentRowChanged.connect(self.showRevision)
+        self.diffView = QTextBrowser()
+        self.status = QLabel()
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        self.restoreButton = self.buttons.addButton("Restore",
+                                                    QDialogButtonBox.AcceptRole)
+        self.cleanButton = QPushButton("Clean up")
+        self.cleanButton.setToolTip("Remove old revisions: one per day is kept "
+                                    "after a week and one per week after "
+                                    "three months")
+        self.buttons.addButton(self.cleanButton, QDialogButtonBox.ActionRole)
+        self.buttons.accepted.connect(self.accept)
+        self.buttons.rejected.connect(self.reject)
+        self.cleanButton.clicked.connect(self.cleanUp)
+
+        viewLayout = QHBoxLayout()
+        viewLayout.addWidget(self.revisionList, 1)
+        viewLayout.addWidget(self.diffView, 3)
+
+        self.layout = QVBoxLayout()
+        self.layout.addLayout(viewLayout)
+        self.layout.addWidget(self.status)
+        self.layout.addWidget(self.buttons)
+        self.setLayout(self.layout)
+        self.resize(800, 500)
+
+        self.populate()
+
+    def populate(self):
+        """ List the story's revisions, newest first. """
+        self.revisions = list(reversed(self.store.revisions(self.story)))
+        self.revisionList.clear()
+        for revision in self.revisions:
+            when = datetime.fromtimestamp(revision['time']).strftime("%Y-%m-%d %H:%M")
+            item = QListWidgetItem(f"{when}  ({revision['words']} words)")
+            item.setData(Qt.UserRole, revision['id'])
+            self.revisionList.addItem(item)
+        self.restoreButton.setEnabled(bool(self.revisions))
+        if self.revisions:
+            self.revisionList.setCurrentRow(0)
+        else:
+            self.diffView.setHtml("")
+            self.status.setText("This story has no saved revisions")
+
+    @pyqtSlot(int)
+    def showRevision(self, row):
+        """ Show changes in revision `row` since the one before it. """
+        if row < 0 or row >= len(self.revisions):
+            return
+        revision = self.revisions[row]
+        previous = self.revisions[row+1] if row + 1 < len(self.revisions) else None
+        try:
+            diff = self.store.diff(previous, revision)
+        except (OSError, ValueError, KeyError) as err:
+            self.diffView.setPlainText(f"Could not read revision: {err}")
+            return
+        self.diffView.setHtml(diffHtml(diff))
+        if previous is None:
+            self.status.setText("First revision")
+        else:
+            change = revision['words'] - previous['words']
+            self.status.setText(f"{change:+d} words since the previous revision")
+
+    @pyqtSlot()
+    def cleanUp(self):
+        removed = self.store.prune()
+        freed = self.store.collectGarbage()
+        self.populate()
+        self.status.setText(f"Removed {removed} old revisions, "
+                            f"freed {freed // 1024} KB")
+
+    def accept(self):
+        row = self.revisionList.currentRow()
+        if 0 <= row < len(self.revisions):
+            self.value = self.revisions[row]
+        super().accept()
+
+    def execDialog(self):
+        """ Wrap `exec_()` call to return True if result is QDialog.Accepted
+            and False otherwise.
+        """
+        return self.exec_() == QDialog.Accepted
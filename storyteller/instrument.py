@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:40:18 2026
+
+@author: keziah
+
+Opt-in timing instrumentation for the app's hot paths.
+
+Set the STORYTELLER_INSTRUMENT environment variable (or pass `--instrument`
+to main.py) to turn it on. Its value is the file the histograms are written
+to on exit: Prometheus textfile format if it ends in '.prom', JSON
+otherwise. If the value is '1', 'storyteller-metrics.json' is used.
+
+When instrumentation is off, `timed` returns the function unchanged and
+`measure` returns a shared do-nothing context manager, so the cost is
+negligible.
+"""
+
+import os
+import time
+import json
+import atexit
+import functools
+from bisect import bisect_left
+from contextlib import nullcontext
+
+_envValue = os.environ.get('STORYTELLER_INSTRUMENT', '')
+enabled = _envValue not in ['', '0']
+
+# bucket upper bounds in seconds
+defaultBuckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.016,
+                  0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """ Histogram of durations, with fixed buckets. """
+
+    def __init__(self, buckets=defaultBuckets):
+        self.buckets = buckets
+        # last count is for values larger than the largest bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0
+
+    def quantile(self, q):
+        """ Return estimate of the `q` quantile, as the upper bound of the
+            bucket it falls in.
+        """
+        if self.count == 0:
+            return 0
+        target = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def toDict(self):
+        return {'count':self.count, 'sum':self.sum, 'min':self.min,
+                'max':self.max, 'mean':self.mean,
+                'p50':self.quantile(0.5), 'p95':self.quantile(0.95),
+                'buckets':dict(zip([str(b) for b in self.buckets] + ['+Inf'],
+                                   self.counts))}
+
+
+class Instrumentation:
+    """ Collection of named `Histogram`s. """
+
+    def __init__(self):
+        self.histograms = {}
+        self._marks = {}
+
+    def record(self, name, seconds):
+        """ Add duration `seconds` to histogram `name`. """
+        histogram = self.histograms.get(name, None)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.record(seconds)
+
+    def mark(self, name):
+        """ Note the start time of an operation which finishes elsewhere. """
+        self._marks[name] = time.perf_counter()
+
+    def elapsed(self, mark, name=None):
+        """ Record time since `mark` in histogram `name` (default is the same
+            as `mark`) and clear the mark. Does nothing if there is no mark.
+        """
+        start = self._marks.pop(mark, None)
+        if start is not None:
+            self.record(mark if name is None else name, time.perf_counter() - start)
+
+    def toJson(self):
+        data = {name:hist.toDict() for name, hist in sorted(self.histograms.items())}
+        return json.dumps(data, indent=2)
+
+    def toPrometheus(self):
+        lines = ["# TYPE storyteller_duration_seconds histogram"]
+        for name, hist in sorted(self.histograms.items()):
+            label = f'operation="{name}"'
+            total = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                total += count
+                lines.append(f'storyteller_duration_seconds_bucket{{{label},le="{bound}"}} {total}')
+            lines.append(f'storyteller_duration_seconds_bucket{{{label},le="+Inf"}} {hist.count}')
+            lines.append(f'storyteller_duration_seconds_sum{{{label}}} {hist.sum}')
+            lines.append(f'storyteller_duration_seconds_count{{{label}}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """ Write histograms to `path`, as a Prometheus textfile if it ends in
+            '.prom', or JSON otherwise.
+        """
+        text = self.toPrometheus() if path.endswith('.prom') else self.toJson()
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as fileobj:
+            fileobj.write(text)
+        os.replace(tmp, path)
+
+
+instruments = Instrumentation()
+
+
+def timed(name):
+    """ Decorator to record the duration of each call in histogram `name`.
+
+        When instrumentation is disabled, the function is returned unchanged.
+        Apply it below `pyqtSlot`, so that the slot wraps the timed function.
+    """
+    def decorator(func):
+        if not enabled:
+            return func
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                instruments.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class _Measure:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        instruments.record(self.name, time.perf_counter() - self.start)
+
+
+_null = nullcontext()
+
+
+def measure(name):
+    """ Context manager to record the duration of a block in histogram `name`. """
+    if not enabled:
+        return _null
+    return _Measure(name)
+
+
+def _dumpOnExit():
+    path = 'storyteller-metrics.json' if _envValue == '1' else _envValue
+    if instruments.histograms:
+        instruments.dump(path)
+
+
+if enabled:
+    atexit.register(_dumpOnExit)
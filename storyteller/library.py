@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:14:36 2026
+
+@author: keziah
+"""
+
+import os
+import sqlite3
+from PyQt5.QtCore import (QObject, QFileSystemWatcher, QRunnable, QThreadPool,
+                          QTimer, pyqtSignal, pyqtSlot)
+from .scanner import StoryScanner
+
+
+class StoryLibrary(QObject):
+    """ Catalogue of the stories in a `StoryStorage`, kept up to date as
+        they are created, changed, renamed or removed, e.g. by another
+        instance or a sync tool.
+
+        A directory of story files is scanned once, with a `StoryScanner`,
+        then the directory and each story file in it are watched with a
+        QFileSystemWatcher (watching the directory alone misses files which
+        are written in place). Changes are collected for `delay` ms (however
+        many events there are) and then the directory is compared with the
+        catalogue on a worker thread, so only the files whose size or
+        modification time differ are read. A file which has been renamed
+        keeps its record, rather than being read again.
+
+        Other storage can't be watched, so it is listed on a worker thread
+        each time `start` is called.
+
+        Parameters
+        ----------
+        storage : StoryStorage
+            Where the stories are.
+        delay : int
+            Time in ms to collect changes for before updating the catalogue.
+            Default is 500.
+    """
+
+    storiesAdded = pyqtSignal(list)
+    """ **signal** storiesAdded(list `records`)
+
+        Emitted with list of `StoryRecord`s which are new to the catalogue.
+    """
+
+    storiesChanged = pyqtSignal(list)
+    """ **signal** storiesChanged(list `records`)
+
+        Emitted with list of `StoryRecord`s which have changed.
+    """
+
+    storiesRemoved = pyqtSignal(list)
+    """ **signal** storiesRemoved(list `filenames`)
+
+        Emitted with list of filenames which have been removed.
+    """
+
+    progress = pyqtSignal(int, int)
+    """ **signal** progress(int `done`, int `total`)
+
+        Emitted with the number of stories found so far by the first scan
+        and the total.
+    """
+
+    ready = pyqtSignal()
+    """ **signal** ready
+
+        Emitted when the first scan is complete.
+    """
+
+    _updated = pyqtSignal(list, list)
+
+    def __init__(self, storage, delay=500):
+        super().__init__()
+        self.storage = storage
+        self.path = storage.directory
+        # StoryRecord for each filename
+        self.records = {}
+        self.isReady = False
+        self._started = False
+        self._task = None
+        self._updating = False
+        self._pending = False
+
+        self.scanner = None
+        self.watcher = None
+        if self.path is not None:
+            self.scanner = StoryScanner(self.path)
+            self.scanner.storiesFound.connect(self._storiesFound)
+            self.scanner.progress.connect(self.progress)
+            self.scanner.finished.connect(self._scanFinished)
+
+            self.watcher = QFileSystemWatcher([self.path])
+            self.watcher.directoryChanged.connect(self._pathChanged)
+            self.watcher.fileChanged.connect(self._pathChanged)
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.update)
+
+        self._updated.connect(self._applyUpdate)
+
+    def start(self):
+        """ Start the first scan, unless it has been started already, in
+            which case storage which can't be watched is listed again.
+        """
+        if self._started:
+            if self.watcher is None:
+                self.update()
+            return
+        self._started = True
+        if self.scanner is not None:
+            self.scanner.start()
+        else:
+            self._startUpdate()
+
+    def stop(self):
+        """ Stop scanning and watching the directory. """
+        self.timer.stop()
+        if self.scanner is not None:
+            self.scanner.cancel()
+            self.watcher.removePaths(self.watcher.directories() + self.watcher.files())
+
+    def _watch(self, filenames):
+        if self.watcher is not None and filenames:
+            # files replaced by renaming one over them are no longer watched,
+            # so this is done again whenever they change
+            self.watcher.addPaths([os.path.join(self.path, filename)
+                                   for filename in filenames])
+
+    def _unwatch(self, filenames):
+        if self.watcher is not None and filenames:
+            self.watcher.removePaths([os.path.join(self.path, filename)
+                                      for filename in filenames])
+
+    @pyqtSlot(list)
+    def _storiesFound(self, records):
+        for record in records:
+            self.records[record.filename] = record
+        self._watch([record.filename for record in records])
+        self.storiesAdded.emit(records)
+
+    @pyqtSlot()
+    def _scanFinished(self):
+        self.isReady = True
+        self.ready.emit()
+        if self._pending:
+            self.update()
+
+    @pyqtSlot(str)
+    def _pathChanged(self, path):
+        # don't restart the timer if it's already running, so that a steady
+        # stream of changes is still picked up every `delay` ms
+        if not self.timer.isActive():
+            self.timer.start()
+
+    @pyqtSlot()
+    def update(self):
+        """ Bring the catalogue up to date with the storage, on the global
+            thread pool.
+        """
+        if not self.isReady or self._updating:
+            # changes are picked up when the scan or update has finished
+            self._pending = True
+            return
+        self._pending = False
+        self._startUpdate()
+
+    def _startUpdate(self):
+        self._updating = True
+        self._task = _UpdateTask(self, dict(self.records))
+        QThreadPool.globalInstance().start(self._task)
+
+    def readChanges(self, records):
+        """ Compare the storage with dict of filename:`StoryRecord`, with
+            `StoryStorage.changes`. This is called on a worker thread by
+            `update`.
+        """
+        try:
+            newRecords, removed = self.storage.changes(records)
+        except (OSError, sqlite3.Error):
+            newRecords, removed = [], []
+        self._updated.emit(newRecords, removed)
+
+    @pyqtSlot(list, list)
+    def _applyUpdate(self, records, removed):
+        self._updating = False
+        added = [record for record in records if record.filename not in self.records]
+        changed = [record for record in records if record.filename in self.records]
+        for filename in removed:
+            self.records.pop(filename, None)
+        for record in records:
+            self.records[record.filename] = record
+        self._unwatch(removed)
+        self._watch([record.filename for record in records])
+
+        if removed:
+            self.storiesRemoved.emit(removed)
+        if changed:
+            self.storiesChanged.emit(changed)
+        if added:
+            self.storiesAdded.emit(added)
+        if not self.isReady:
+            # first listing of storage which isn't scanned
+            self._scanFinished()
+        elif self._pending:
+            self.update()
+
+
+class _UpdateTask(QRunnable):
+    """ Runnable to call `StoryLibrary.readChanges` on the thread pool. """
+
+    def __init__(self, library, records):
+        super().__init__()
+        self.library = library
+        self.records = records
+        self.setAutoDelete(False)
+
+    def run(self):
+        self.library.readChanges(self.records)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:10:27 2026
+
+@author: keziah
+"""
+
+from PyQt5.QtGui import QFont, QTextCharFormat, QTextCursor
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+from .storyparser import StoryHtmlParser
+
+
+def makeCharFormat(fmt):
+    """ Return QTextCharFormat from dict of formatting, as returned by
+        `parseStyle`.
+    """
+    charFormat = QTextCharFormat()
+    if 'bold' in fmt:
+        charFormat.setFontWeight(QFont.Bold if fmt['bold'] else QFont.Normal)
+    if 'italic' in fmt:
+        charFormat.setFontItalic(fmt['italic'])
+    if 'underline' in fmt:
+        charFormat.setFontUnderline(fmt['underline'])
+    if 'strike' in fmt:
+        charFormat.setFontStrikeOut(fmt['strike'])
+    if 'family' in fmt:
+        charFormat.setFontFamily(fmt['family'])
+    if 'size' in fmt:
+        charFormat.setFontPointSize(fmt['size'])
+    return charFormat
+
+
+def formatDict(charFormat):
+    """ Return dict of formatting from QTextCharFormat, the inverse of
+        `makeCharFormat`. Only properties which are set are included.
+    """
+    fmt = {}
+    if charFormat.fontWeight() > QFont.Normal:
+        fmt['bold'] = True
+    if charFormat.fontItalic():
+        fmt['italic'] = True
+    if charFormat.fontUnderline():
+        fmt['underline'] = True
+    if charFormat.fontStrikeOut():
+        fmt['strike'] = True
+    if charFormat.hasProperty(QTextCharFormat.FontFamily):
+        fmt['family'] = charFormat.fontFamily()
+    if charFormat.fontPointSize() > 0:
+        fmt['size'] = charFormat.fontPointSize()
+    return fmt
+
+
+def documentParagraphs(document):
+    """ Return list of paragraphs in `document`, each of which is a list of
+        (text, format) runs.
+    """
+    paragraphs = []
+    block = document.firstBlock()
+    while block.isValid():
+        runs = []
+        it = block.begin()
+        while not it.atEnd():
+            fragment = it.fragment()
+            if fragment.isValid():
+                runs.append((fragment.text(), formatDict(fragment.charFormat())))
+            it += 1
+        paragraphs.append(runs)
+        block = block.next()
+    return paragraphs
+
+
+class ParagraphInserter:
+    """ Append paragraphs of (text, format) runs to a QTextDocument. """
+
+    def __init__(self, document):
+        self.cursor = QTextCursor(document)
+        self.cursor.movePosition(QTextCursor.End)
+        # document always has one block, so use that for the first paragraph
+        self._firstBlock = document.isEmpty()
+        self._formats = {}
+
+    def _charFormat(self, fmt):
+        key = tuple(sorted(fmt.items()))
+        charFormat = self._formats.get(key, None)
+        if charFormat is None:
+            charFormat = makeCharFormat(fmt)
+            self._formats[key] = charFormat
+        return charFormat
+
+    def insert(self, paragraphs):
+        if not paragraphs:
+            return
+        self.cursor.beginEditBlock()
+        for runs in paragraphs:
+            if self._firstBlock:
+                self._firstBlock = False
+            else:
+                self.cursor.insertBlock()
+            for text, fmt in runs:
+                self.cursor.insertText(text, self._charFormat(fmt))
+        self.cursor.endEditBlock()
+
+
+def setDocumentParagraphs(document, paragraphs):
+    """ Replace the contents of `document` with `paragraphs`. """
+    document.clear()
+    ParagraphInserter(document).insert(paragraphs)
+
+
+class StoryLoader(QObject):
+    """ Load a story into a QTextDocument a piece at a time, so that the UI
+        stays responsive while large stories are opened.
+
+        Paragraphs given to `loadParagraphs` (e.g. one chapter of a story)
+        are inserted `paragraphsPerChunk` at a time. Html files given to
+        `readHtml` are read in chunks of `chunkSize` characters and parsed
+        with `StoryHtmlParser`. Control returns to the event loop after each
+        chunk.
+
+        Parameters
+        ----------
+        chunkSize : int
+            Number of characters of html to read and parse at a time.
+            Default is 65536.
+        paragraphsPerChunk : int
+            Number of paragraphs to insert at a time. Default is 200.
+    """
+
+    finished = pyqtSignal()
+    """ **signal** finished
+
+        Emitted when all the paragraphs have been loaded.
+    """
+
+    storyRead = pyqtSignal(str, str, list)
+    """ **signal** storyRead(str `path`, str `title`, list `paragraphs`)
+
+        Emitted when the html story at `path` has been read.
+    """
+
+    failed = pyqtSignal(str)
+    """ **signal** failed(str `path`)
+
+        Emitted if the html story at `path` could not be parsed.
+    """
+
+    def __init__(self, chunkSize=65536, paragraphsPerChunk=200):
+        super().__init__()
+        self.chunkSize = chunkSize
+        self.paragraphsPerChunk = paragraphsPerChunk
+        self._fileobj = None
+        self._paragraphs = None
+        self.document = None
+        self.header = {}
+
+    @property
+    def loading(self):
+        return self._fileobj is not None or self._paragraphs is not None
+
+    def readHtml(self, path):
+        """ Start reading html story at `path`. `storyRead` is emitted with
+            its title and paragraphs once it has all been parsed.
+
+            Raises OSError if the file can't be opened.
+        """
+        self.cancel()
+        self.path = path
+        self.document = None
+        self.parser = StoryHtmlParser()
+        self._fileobj = open(path)
+        self._loadChunk()
+
+    def loadParagraphs(self, paragraphs, document, header=None):
+        """ Clear `document` and start inserting list of `paragraphs` into
+            it, e.g. for one chapter of a story.
+        """
+        self.cancel()
+        self.path = None
+        self.document = document
+        self.header = {} if header is None else header
+        # loading the story shouldn't be undoable
+        self.document.setUndoRedoEnabled(False)
+        self.document.clear()
+        self.inserter = ParagraphInserter(self.document)
+        self._paragraphs = paragraphs
+        self._position = 0
+        self._insertChunk()
+
+    @pyqtSlot()
+    def cancel(self):
+        """ Stop loading. """
+        if self.loading:
+            if self._fileobj is not None:
+                self._fileobj.close()
+                self._fileobj = None
+            self._paragraphs = None
+            if self.document is not None:
+                self.document.setUndoRedoEnabled(True)
+
+    @pyqtSlot()
+    def _insertChunk(self):
+        if self._paragraphs is None:
+            return
+        end = self._position + self.paragraphsPerChunk
+        self.inserter.insert(self._paragraphs[self._position:end])
+        self._position = end
+        if self._position < len(self._paragraphs):
+            QTimer.singleShot(0, self._insertChunk)
+        else:
+            self.cancel()
+            self.finished.emit()
+
+    @pyqtSlot()
+    def _loadChunk(self):
+        if self._fileobj is None:
+            return
+        try:
+            text = self._fileobj.read(self.chunkSize)
+            if text:
+                self.parser.feed(text)
+            else:
+                self.parser.close()
+        except (OSError, ValueError, AssertionError):
+            # can't read, decode or parse the file
+            self.cancel()
+            self.failed.emit(self.path)
+            return
+
+        if text:
+            QTimer.singleShot(0, self._loadChunk)
+        else:
+            self.cancel()
+            self.storyRead.emit(self.path, self.parser.title, self.parser.paragraphs)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:02:47 2026
+
+@author: keziah
+
+Convert html stories to the native `.story` format.
+
+    python -m storyteller.migrate [path] [--remove] [--no-compress]
+"""
+
+import os
+import argparse
+from .storyindex import StoryIndex, parseStoryFilename
+from .storyparser import parseStory
+from . import storyformat
+
+
+def migrateStory(path, goal=None, compress=True):
+    """ Write html story at `path` in the native format, alongside the
+        original, and return the new path.
+    """
+    with open(path) as fileobj:
+        title, paragraphs = parseStory(fileobj.read())
+    filename = os.path.basename(path)
+    date, fileTitle = parseStoryFilename(filename)
+    if not title:
+        title = fileTitle
+    newPath = os.path.splitext(path)[0] + storyformat.extension
+    storyformat.writeStory(newPath, title, paragraphs, date=date, goal=goal,
+                           compress=compress)
+    return newPath
+
+
+def migrateLibrary(path, remove=False, compress=True, verbose=False):
+    """ Convert all html stories in directory `path` to the native format and
+        update the story index.
+
+        Stories which already have a `.story` file are skipped.
+
+        Parameters
+        ----------
+        path : str
+            Path to directory where stories are stored.
+        remove : bool
+            If True, delete the html files once they have been converted.
+            Default is False.
+        compress : bool
+            If True (default), compress the stories.
+        verbose : bool
+            If True, print the name of each converted story. Default is False.
+
+        Returns
+        -------
+        list of filenames of the converted stories
+    """
+    index = StoryIndex(path)
+    goals = {record.filename:record.goal for record in index.records()}
+    converted = []
+    removed = []
+    for filename in sorted(os.listdir(path)):
+        name, ext = os.path.splitext(filename)
+        if ext != '.html' or parseStoryFilename(filename) is None:
+            continue
+        newFilename = name + storyformat.extension
+        if os.path.exists(os.path.join(path, newFilename)):
+            continue
+        try:
+            migrateStory(os.path.join(path, filename), goal=goals.get(filename, None),
+                         compress=compress)
+        except (OSError, ValueError, AssertionError) as err:
+            print(f"Could not convert {filename}: {err}")
+            continue
+        converted.append(newFilename)
+        if verbose:
+            print(f"{filename} -> {newFilename}")
+        if remove:
+            os.remove(os.path.join(path, filename))
+            removed.append(filename)
+    for filename in converted:
+        index.update(filename)
+    index.store(removed=removed)
+    return converted
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Convert html stories to the native .story format")
+    parser.add_argument('path', nargs='?',
+                        default=os.path.join(os.path.expanduser('~'), 'Documents', 'stories'),
+                        help="Stories directory. Default is ~/Documents/stories")
+    parser.add_argument('--remove', action='store_true',
+                        help="Delete the html files once they have been converted")
+    parser.add_argument('--no-compress', action='store_true',
+                        help="Don't compress the converted stories")
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="Don't list the converted stories")
+    args = parser.parse_args()
+
+    converted = migrateLibrary(args.path, remove=args.remove,
+                               compress=not args.no_compress,
+                               verbose=not args.quiet)
+    print(f"Converted {len(converted)} stories")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 16:02:44 2026
+
+@author: keziah
+"""
+
+import re
+import functools
+import threading
+from bson.errors import BSONError
+from pymongo import ASCENDING, DESCENDING, InsertOne, MongoClient
+from pymongo.errors import PyMongoError
+from pymongo.write_concern import WriteConcern
+from .storage import BlockStorage, StorageError, savedRecord
+from .storyindex import StoryRecord
+
+# one client, and so one connection pool, for each server, shared by all the
+# storages and threads which use it
+_clients = {}
+_clientsLock = threading.Lock()
+
+# write concern for each fsync policy: 'always' waits for the journal on a
+# majority of the replica set, 'file' for the journal on the primary
+_writeConcerns = {'always':WriteConcern(w='majority', j=True),
+                  'file':WriteConcern(w=1, j=True),
+                  'never':WriteConcern(w=1)}
+
+# only the metadata is fetched when stories are listed
+_recordFields = {'title':1, 'date':1, 'wordcount':1, 'goal':1, 'size':1,
+                 'mtime':1}
+
+
+def mongoClient(uri, maxPoolSize=10):
+    """ Return the shared MongoClient for `uri`, making it if needed, with a
+        pool of up to `maxPoolSize` connections.
+    """
+    with _clientsLock:
+        client = _clients.get(uri, None)
+        if client is None:
+            client = MongoClient(uri, maxPoolSize=maxPoolSize,
+                                 serverSelectionTimeoutMS=5000)
+            _clients[uri] = client
+        return client
+
+
+def _storageErrors(func):
+    """ Decorator to raise PyMongoErrors and BSONErrors (e.g. a document
+        which can't be encoded) as `StorageError`s, so they're handled like
+        any other failure to read or write a story.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except (PyMongoError, BSONError) as err:
+            raise StorageError(str(err)) from err
+    return wrapper
+
+
+def _record(doc):
+    return StoryRecord(doc['_id'], doc['title'], doc['date'], doc['wordcount'],
+                       doc.get('goal', None), doc['size'], doc['mtime'])
+
+
+class MongoStorage(BlockStorage):
+    """ Stories kept in a MongoDB database.
+
+        Story metadata and chapter tables are in the 'stories' collection,
+        keyed by filename, and the encoded chapter blocks are in 'blocks'.
+        Listing and querying stories only fetch the metadata. The blocks of
+        a save are inserted in one bulk write.
+
+        Parameters
+        ----------
+        uri : str
+            MongoDB connection string. Default is a server on localhost.
+        database : str
+            Name of the database. Default is 'storyteller'.
+        maxPoolSize : int
+            Maximum number of pooled connections to the server. Default is 10.
+        client : MongoClient, optional
+            Client to use instead of the shared one for `uri`, e.g. a
+            mongomock client for tests.
+    """
+
+    @_storageErrors
+    def __init__(self, uri='mongodb://localhost:27017', database='storyteller',
+                 maxPoolSize=10, client=None):
+        if client is None:
+            client = mongoClient(uri, maxPoolSize)
+        self.db = client[database]
+        self.stories = self.db['stories']
+        self.blocks = self.db['blocks']
+        self.stories.create_index([('date', DESCENDING), ('title', ASCENDING)])
+        self.blocks.create_index('story')
+
+    @_storageErrors
+    def records(self):
+        return [_record(doc) for doc in self.stories.find({}, projection=_recordFields)]
+
+    @_storageErrors
+    def record(self, filename):
+        doc = self.stories.find_one({'_id':filename}, projection=_recordFields)
+        if doc is None:
+            msg = f"There is no story '{filename}'"
+            raise StorageError(msg)
+        return _record(doc)
+
+    @_storageErrors
+    def exists(self, filename):
+        return self.stories.count_documents({'_id':filename}, limit=1) > 0
+
+    @_storageErrors
+    def query(self, title=None, since=None, until=None, limit=None):
+        spec = {}
+        if title:
+            spec['title'] = {'$regex':re.escape(title), '$options':'i'}
+        dates = {}
+        if since is not None:
+            dates['$gte'] = since
+        if until is not None:
+            dates['$lte'] = until
+        if dates:
+            spec['date'] = dates
+        cursor = self.stories.find(spec, projection=_recordFields,
+                                   sort=[('date', DESCENDING), ('title', DESCENDING)])
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return [_record(doc) for doc in cursor]
+
+    @_storageErrors
+    def delete(self, filename):
+        self.stories.delete_one({'_id':filename})
+        self.blocks.delete_many({'story':filename})
+
+    @_storageErrors
+    def _readHeader(self, filename):
+        return self.stories.find_one({'_id':filename},
+                                     projection={'_id':0, 'size':0, 'mtime':0})
+
+    @_storageErrors
+    def _readBlocks(self, filename, ids):
+        cursor = self.blocks.find({'_id':{'$in':list(ids)}, 'story':filename},
+                                  projection={'data':1, 'compression':1})
+        return {doc['_id']:(bytes(doc['data']), doc.get('compression', None))
+                for doc in cursor}
+
+    @_storageErrors
+    def _writeStory(self, filename, header, blocks, fsync):
+        concern = _writeConcerns[fsync]
+        storyColl = self.stories.with_options(write_concern=concern)
+        blockColl = self.blocks.with_options(write_concern=concern)
+        sizes = {entry['offset']:entry['length'] for entry in header['chapters']}
+        if blocks:
+            blockColl.bulk_write([InsertOne({'_id':blockId, 'story':filename,
+                                             'compression':compression,
+                                             'data':data})
+                                  for blockId, (data, compression) in blocks.items()],
+                                 ordered=False)
+        record = savedRecord(filename, header, sum(sizes.values()))
+        doc = dict(header, _id=filename, size=record.size, mtime=record.mtime)
+        storyColl.replace_one({'_id':filename}, doc, upsert=True)
+        blockColl.delete_many({'story':filename, '_id':{'$nin':list(sizes)}})
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 10:12:36 2026
+
+@author: keziah
+
+Prose statistics of a document: sentence lengths, repeated words and
+phrases, readability and adverb and filler density.
+
+Each paragraph is analysed once, into arrays of sentence lengths and word
+and phrase ids, and cached by its text. The totals for the document are
+aggregated from the cached arrays with NumPy, so only edited paragraphs are
+analysed again.
+"""
+
+import re
+from collections import namedtuple
+import numpy as np
+
+wordPattern = re.compile(r"\w+(?:['’]\w+)*")
+# end of a sentence, with any closing quotes or brackets
+_sentenceEndPattern = re.compile(r"[.!?…]+[\"'”’)\]]*(?=\s|$)")
+_vowelsPattern = re.compile(r"[aeiouy]+")
+
+fillerWords = frozenset(['just', 'really', 'very', 'actually', 'basically',
+                         'literally', 'quite', 'rather', 'somewhat', 'simply',
+                         'totally', 'definitely', 'certainly', 'honestly',
+                         'seriously', 'truly', 'pretty'])
+# filler phrases are found among the phrases counted by `ProseCache`, so
+# they are two or three words long
+fillerPhrases = frozenset(['kind of', 'sort of', 'a bit', 'a little',
+                           'in order to', 'all of a'])
+# words ending in -ly which aren't adverbs
+_notAdverbs = frozenset(['only', 'family', 'early', 'reply', 'apply', 'supply',
+                         'holy', 'ugly', 'silly', 'lovely', 'friendly', 'lonely',
+                         'belly', 'fly', 'ally', 'rely', 'jelly', 'bully',
+                         'lily', 'italy', 'july', 'daily', 'likely', 'lively',
+                         'elderly', 'costly', 'deadly', 'curly', 'chilly',
+                         'smelly', 'woolly', 'hilly', 'oily', 'jolly', 'sly',
+                         'comply', 'assembly', 'anomaly', 'monopoly', 'melancholy'])
+# words which aren't counted as repeated, and which phrases don't start or
+# end with
+stopWords = frozenset("""
+a about above after again against all am an and any are as at be because been
+before being below between both but by can could did do does doing down during
+each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just me more most my myself no
+nor not now of off on once only or other our ours ourselves out over own said
+same she should so some such than that the their theirs them themselves then
+there these they this those through to too under until up very was we were
+what when where which while who whom why will with would you your yours
+yourself yourselves don't didn't i'm it's he's she's that's there's can't
+won't wasn't isn't i'd i'll you're they're we're
+""".split())
+
+# sentence lengths are counted in bins of this many words, with the last bin
+# for all longer sentences
+lengthBinSize = 5
+lengthBins = 8
+
+ProseSummary = namedtuple('ProseSummary',
+                          ['words', 'sentences', 'meanLength', 'lengthCounts',
+                           'readability', 'adverbDensity', 'fillerDensity',
+                           'topWords', 'topPhrases'])
+ProseSummary.__doc__ = """ Prose statistics of a document, from `ProseCache.analyse`.
+
+    `lengthCounts` is an array of the number of sentences in each bin of
+    `lengthBinSize` words, `readability` is the Flesch reading ease, and the
+    densities are per 100 words. `topWords` and `topPhrases` are lists of
+    (text, count) tuples, most repeated first.
+"""
+
+_emptyIds = np.empty(0, dtype=np.int32)
+
+
+def syllables(word):
+    """ Return estimated number of syllables in lower case `word`. """
+    count = len(_vowelsPattern.findall(word))
+    if word.endswith('e') and not word.endswith(('le', 'ee')) and count > 1:
+        # silent e
+        count -= 1
+    return max(count, 1)
+
+
+def splitSentences(text):
+    """ Return list of sentences in `text`. """
+    sentences = []
+    start = 0
+    for match in _sentenceEndPattern.finditer(text):
+        sentences.append(text[start:match.end()])
+        start = match.end()
+    sentences.append(text[start:])
+    return [sentence for sentence in sentences if not sentence.isspace() and sentence]
+
+
+def isAdverb(word):
+    """ Return True if lower case `word` looks like an adverb. """
+    return len(word) > 4 and word.endswith('ly') and word not in _notAdverbs
+
+
+class BlockStats:
+    """ Analysis of one paragraph, which is aggregated by `ProseCache`.
+
+        Word and phrase ids are indices into the cache's vocabulary.
+    """
+
+    __slots__ = ['lengths', 'syllables', 'adverbs', 'fillers', 'wordIds', 'phraseIds']
+
+    def __init__(self, lengths, syllables, adverbs, fillers, wordIds, phraseIds):
+        self.lengths = lengths
+        self.syllables = syllables
+        self.adverbs = adverbs
+        self.fillers = fillers
+        self.wordIds = wordIds
+        self.phraseIds = phraseIds
+
+
+class ProseCache:
+    """ Prose statistics of a document, cached per paragraph.
+
+        `analyse` is given the text of every paragraph, and only analyses
+        those it hasn't seen before; the rest are looked up by their text,
+        so paragraphs which have moved aren't analysed again either. It isn't
+        thread safe, but can be used from any one thread at a time.
+
+        Parameters
+        ----------
+        phraseLengths : tuple
+            Numbers of words in the phrases to count. Default is (2, 3).
+        top : int
+            Number of repeated words and phrases to return. Default is 10.
+        maxVocabulary : int
+            Number of words and phrases, including those which have been
+            edited away, to keep ids for before those which aren't in use
+            are dropped. Default is 200000.
+    """
+
+    def __init__(self, phraseLengths=(2, 3), top=10, maxVocabulary=200000):
+        self.phraseLengths = phraseLengths
+        self.top = top
+        self.maxVocabulary = maxVocabulary
+        # id of each word and phrase, and the text of each id
+        self.vocabulary = {}
+        self.texts = []
+        self._blocks = {}
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def _id(self, text):
+        n = self.vocabulary.get(text, None)
+        if n is None:
+            n = len(self.texts)
+            self.vocabulary[text] = n
+            self.texts.append(text)
+        return n
+
+    def analyseBlock(self, text):
+        """ Return `BlockStats` of paragraph `text`, without caching it. """
+        lengths = []
+        syllableCount = adverbs = fillers = 0
+        wordIds = []
+        phraseIds = []
+        for sentence in splitSentences(text):
+            words = [word.lower().replace('’', "'") for word in wordPattern.findall(sentence)]
+            if not words:
+                continue
+            lengths.append(len(words))
+            for word in words:
+                syllableCount += syllables(word)
+                if isAdverb(word):
+                    adverbs += 1
+                if word in fillerWords:
+                    fillers += 1
+                elif word not in stopWords and not word.isdigit():
+                    wordIds.append(self._id(word))
+            for size in self.phraseLengths:
+                for n in range(len(words) - size + 1):
+                    phrase = " ".join(words[n:n+size])
+                    if phrase in fillerPhrases:
+                        fillers += 1
+                    if words[n] in stopWords or words[n+size-1] in stopWords:
+                        continue
+                    phraseIds.append(self._id(phrase))
+        return BlockStats(np.array(lengths, dtype=np.int32), syllableCount,
+                          adverbs, fillers,
+                          np.array(wordIds, dtype=np.int32) if wordIds else _emptyIds,
+                          np.array(phraseIds, dtype=np.int32) if phraseIds else _emptyIds)
+
+    def analyse(self, texts):
+        """ Return `ProseSummary` of the paragraphs in list of `texts`.
+
+            Paragraphs which are no longer in the document are dropped from
+            the cache.
+        """
+        blocks = {}
+        for text in texts:
+            if text in blocks:
+                continue
+            stats = self._blocks.get(text, None)
+            if stats is None:
+                stats = self.analyseBlock(text)
+            blocks[text] = stats
+        self._blocks = blocks
+        if len(self.texts) > self.maxVocabulary:
+            self._compact()
+        return self.summarise([blocks[text] for text in texts])
+
+    def _compact(self):
+        """ Drop the words and phrases which aren't in any cached paragraph,
+            and renumber the rest.
+        """
+        blocks = list(self._blocks.values())
+        ids = [block.wordIds for block in blocks] + [block.phraseIds for block in blocks]
+        used = np.unique(np.concatenate(ids)) if ids else _emptyIds
+        mapping = np.full(len(self.texts), -1, dtype=np.int32)
+        mapping[used] = np.arange(len(used), dtype=np.int32)
+        for block in blocks:
+            block.wordIds = mapping[block.wordIds]
+            block.phraseIds = mapping[block.phraseIds]
+        self.texts = [self.texts[n] for n in used.tolist()]
+        self.vocabulary = {text:n for n, text in enumerate(self.texts)}
+
+    def summarise(self, blocks):
+        """ Return `ProseSummary` of list of `BlockStats`. """
+        if blocks:
+            lengths = np.concatenate([block.lengths for block in blocks])
+            counts = np.array([(block.syllables, block.adverbs, block.fillers)
+                               for block in blocks], dtype=np.int64).sum(axis=0)
+        else:
+            lengths = _emptyIds
+            counts = np.zeros(3, dtype=np.int64)
+        syllableCount, adverbs, fillers = (int(count) for count in counts)
+        words = int(lengths.sum())
+        sentences = len(lengths)
+        bins = np.minimum((lengths - 1) // lengthBinSize, lengthBins - 1)
+        lengthCounts = np.bincount(bins, minlength=lengthBins)
+        if words:
+            readability = (206.835 - 1.015 * words / sentences
+                           - 84.6 * syllableCount / words)
+            adverbDensity = 100 * adverbs / words
+            fillerDensity = 100 * fillers / words
+        else:
+            readability = adverbDensity = fillerDensity = 0.0
+        return ProseSummary(words, sentences, words / sentences if sentences else 0.0,
+                            lengthCounts, readability, adverbDensity, fillerDensity,
+                            self._repeated([block.wordIds for block in blocks]),
+                            self._repeated([block.phraseIds for block in blocks]))
+
+    def _repeated(self, ids):
+        """ Return list of (text, count) of the `top` ids which occur more
+            than once in list of arrays of `ids`, most frequent first.
+        """
+        ids = np.concatenate(ids) if ids else _emptyIds
+        if not len(ids):
+            return []
+        counts = np.bincount(ids)
+        top = min(self.top, len(counts))
+        candidates = np.argpartition(-counts, top - 1)[:top]
+        # most frequent first, then alphabetically
+        candidates = sorted(candidates.tolist(),
+                            key=lambda n: (-counts[n], self.texts[n]))
+        return [(self.texts[n], int(counts[n])) for n in candidates if counts[n] > 1]
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 14:37:52 2026
+
+@author: keziah
+"""
+
+from PyQt5.QtWidgets import QFormLayout, QLabel, QVBoxLayout, QWidget
+from PyQt5.QtCore import (QObject, QRunnable, QThreadPool, QTimer, Qt,
+                          pyqtSignal, pyqtSlot)
+from .prose import ProseCache, lengthBinSize, lengthBins
+from .statsdialog import BarChart
+
+
+class ProseAnalyser(QObject):
+    """ Prose statistics of the document in a `StoryEditor`, kept up to date
+        as it is edited.
+
+        The text of each block is kept from the editor's `blocksChanged`
+        signal, so the document isn't read again. Once there have been no
+        edits for `delay` ms, the texts are analysed by a `ProseCache` on the
+        global thread pool; only blocks which have changed since the last
+        analysis are analysed again. Edits made while an analysis is running
+        are analysed when it has finished.
+
+        Parameters
+        ----------
+        delay : int
+            Time in ms to wait after an edit before analysing. Default is 750.
+    """
+
+    finished = pyqtSignal(object)
+    """ **signal** finished(ProseSummary `summary`)
+
+        Emitted with the statistics of the document when it has been analysed.
+    """
+
+    _done = pyqtSignal(object)
+
+    def __init__(self, delay=750):
+        super().__init__()
+        self.texts = []
+        self.cache = ProseCache()
+        self.enabled = True
+        self._task = None
+        self._running = False
+        self._again = False
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.analyse)
+
+        self._done.connect(self._finish)
+
+    def setEnabled(self, enabled):
+        """ Start or stop analysing, e.g. while the panel is hidden. Edits
+            are still followed, so the analysis is up to date when it is
+            enabled again.
+        """
+        self.enabled = enabled
+        if enabled:
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    @pyqtSlot(int, list, int)
+    def blocksChanged(self, first, texts, blockCount):
+        """ Update the text of the blocks touched by an edit, from
+            `StoryEditor.blocksChanged`.
+        """
+        if first < 0:
+            self.texts = list(texts)
+        else:
+            delta = blockCount - len(self.texts)
+            lastOld = first + len(texts) - 1 - delta
+            if lastOld < first or lastOld >= len(self.texts):
+                # the editor resets the counts, and so the texts, next
+                return
+            self.texts[first:lastOld+1] = texts
+        if self.enabled:
+            self.timer.start()
+
+    @pyqtSlot()
+    def analyse(self):
+        """ Analyse the document on the global thread pool, or once the
+            analysis which is running has finished.
+        """
+        if self._running:
+            self._again = True
+            return
+        self._again = False
+        self._running = True
+        self._task = _AnalyseTask(self, list(self.texts))
+        QThreadPool.globalInstance().start(self._task)
+
+    def run(self, texts):
+        """ Analyse list of block `texts`. This is called on a worker thread
+            by `analyse`.
+        """
+        self._done.emit(self.cache.analyse(texts))
+
+    @pyqtSlot(object)
+    def _finish(self, summary):
+        self._running = False
+        self.finished.emit(summary)
+        if self._again and self.enabled:
+            self.analyse()
+
+
+class _AnalyseTask(QRunnable):
+    """ Runnable to call `ProseAnalyser.run` on the thread pool. """
+
+    def __init__(self, analyser, texts):
+        super().__init__()
+        self.analyser = analyser
+        self.texts = texts
+        self.setAutoDelete(False)
+
+    def run(self):
+        self.analyser.run(self.texts)
+
+
+def readabilityLevel(score):
+    """ Return description of Flesch reading ease `score`. """
+    levels = [(90, "very easy"), (80, "easy"), (70, "fairly easy"),
+              (60, "plain English"), (50, "fairly difficult"), (30, "difficult")]
+    for minimum, level in levels:
+        if score >= minimum:
+            return level
+    return "very difficult"
+
+
+class ProsePanel(QWidget):
+    """ Panel of prose statistics of the document in the editor, from a
+        `ProseAnalyser`: sentence lengths, readability, adverb and filler
+        density, and the most repeated words and phrases.
+
+        Parameters
+        ----------
+        analyser : ProseAnalyser, optional
+            Analyser to show the statistics from. A new one is made if not
+            given.
+    """
+
+    def __init__(self, analyser=None):
+        super().__init__()
+        self.analyser = ProseAnalyser() if analyser is None else analyser
+        self.analyser.finished.connect(self.setSummary)
+
+        self.labels = {}
+        form = QFormLayout()
+        rows = [('words', "Words"),
+                ('sentences', "Sentences"),
+                ('meanLength', "Words per sentence"),
+                ('readability', "Reading ease"),
+                ('adverbDensity', "Adverbs per 100 words"),
+                ('fillerDensity', "Fillers per 100 words")]
+        for key, name in rows:
+            self.labels[key] = QLabel()
+            form.addRow(name, self.labels[key])
+
+        self.chart = BarChart()
+        self.chart.setMinimumSize(200, 100)
+        self.wordsLabel = QLabel()
+        self.phrasesLabel = QLabel()
+        for label in [self.wordsLabel, self.phrasesLabel]:
+            label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+            label.setWordWrap(True)
+
+        self.layout = QVBoxLayout()
+        self.layout.addLayout(form)
+        self.layout.addWidget(QLabel(f"Sentence lengths ({lengthBinSize} word steps)"))
+        self.layout.addWidget(self.chart)
+        self.layout.addWidget(QLabel("Most repeated words"))
+        self.layout.addWidget(self.wordsLabel)
+        self.layout.addWidget(QLabel("Most repeated phrases"))
+        self.layout.addWidget(self.phrasesLabel)
+        self.layout.addStretch()
+        self.setLayout(self.layout)
+
+    def showEvent(self, event):
+        self.analyser.setEnabled(True)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.analyser.setEnabled(False)
+        super().hideEvent(event)
+
+    @pyqtSlot(object)
+    def setSummary(self, summary):
+        """ Show `ProseSummary` `summary`. """
+        for key, label in self.labels.items():
+            value = getattr(summary, key)
+            if key == 'readability':
+                text = f"{value:.0f} ({readabilityLevel(value)})" if summary.words else "-"
+            elif isinstance(value, float):
+                text = f"{value:.1f}"
+            else:
+                text = str(value)
+            label.setText(text)
+        labels = [f"{n*lengthBinSize + 1}-{(n + 1)*lengthBinSize}" for n in range(lengthBins)]
+        labels[-1] = f"{(lengthBins - 1)*lengthBinSize + 1}+"
+        self.chart.setValues(summary.lengthCounts.tolist(), labels)
+        self.wordsLabel.setText(self._repeated(summary.topWords))
+        self.phrasesLabel.setText(self._repeated(summary.topPhrases))
+
+    @staticmethod
+    def _repeated(items):
+        if not items:
+            return "None"
+        return "\n".join(f"{text} ({count})" for text, count in items)
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:08:31 2026
+
+@author: keziah
+
+Content-addressed store of story revisions.
+
+Each paragraph of a revision is stored once, as a chunk named by the SHA-1
+hash of its JSON encoding. Paragraph hashes are collected into groups, which
+end after any paragraph whose hash ends in `groupBits` zero bits, so the
+boundaries depend only on the paragraphs around them and an edit changes one
+group, however many paragraphs are inserted or removed before it. A revision's
+root chunk lists its group hashes. Saving a story with one paragraph changed
+stores that paragraph, its group and a root, a few kilobytes at most.
+
+Chunks are appended, compressed, to a single pack file, with a fixed-size
+index record for each; revisions are appended as JSON lines. `prune` removes
+old revisions according to a retention policy and `collectGarbage` rewrites
+the pack without the chunks that are no longer used.
+"""
+
+import os
+import json
+import time
+import zlib
+import struct
+import hashlib
+from difflib import SequenceMatcher
+from .storyparser import paragraphText
+from .wordcount import countWordsInText
+
+hashSize = 20
+# hash, length of compressed data
+_recordHeader = struct.Struct('<20sI')
+# hash, offset of data, length of compressed data
+_indexRecord = struct.Struct('<20sQI')
+
+
+def paragraphBytes(runs):
+    """ Return bytes of paragraph `runs`, as stored in a chunk. """
+    return json.dumps(runs, ensure_ascii=False, sort_keys=True,
+                      separators=(',', ':')).encode()
+
+
+def chunkHash(data):
+    return hashlib.sha1(data).digest()
+
+
+def paragraphChunks(paragraphs):
+    """ Return (keys, chunks) of list of `paragraphs`: the list of their
+        hashes, and dict of hash: data of their chunks.
+    """
+    chunks = {}
+    keys = []
+    for runs in paragraphs:
+        data = paragraphBytes(runs)
+        key = chunkHash(data)
+        chunks[key] = data
+        keys.append(key)
+    return keys, chunks
+
+
+class RevisionStore:
+    """ Store of every saved revision of every story.
+
+        Revisions are identified by story title, as in `StatsStore`. The pack
+        index and revision list are only read when first needed.
+
+        Parameters
+        ----------
+        path : str
+            Path to directory where stories are stored. Revisions are kept
+            in a '.revisions' directory inside it.
+        groupBits : int
+            Paragraph groups end after paragraphs whose hash ends with this
+            many zero bits, so the mean group size is 2**groupBits. Default
+            is 4.
+        maxGroupSize : int
+            Maximum number of paragraphs in a group. Default is 256.
+    """
+
+    dirName = '.revisions'
+
+    def __init__(self, path, groupBits=4, maxGroupSize=256):
+        self.path = os.path.join(path, self.dirName)
+        self.groupMask = (1 << groupBits) - 1
+        self.maxGroupSize = maxGroupSize
+        self.packPath = os.path.join(self.path, 'chunks')
+        self.indexPath = os.path.join(self.path, 'chunks.idx')
+        self.revisionsPath = os.path.join(self.path, 'revisions.jsonl')
+        self._index = None
+        self._revisions = None
+
+    def _load(self):
+        if self._index is not None:
+            return
+        self._index = self._readIndex()
+        self._revisions = []
+        try:
+            with open(self.revisionsPath) as fileobj:
+                for line in fileobj:
+                    try:
+                        self._revisions.append(json.loads(line))
+                    except ValueError:
+                        # partly written line
+                        continue
+        except OSError:
+            pass
+
+    def _readIndex(self):
+        """ Return dict of chunk hash: (offset, length) from the index file,
+            rebuilding the index from the pack if they don't match.
+        """
+        index = {}
+        end = 0
+        try:
+            with open(self.indexPath, 'rb') as fileobj:
+                data = fileobj.read()
+        except OSError:
+            data = b""
+        size = _indexRecord.size
+        for n in range(0, len(data) - size + 1, size):
+            key, offset, length = _indexRecord.unpack_from(data, n)
+            index[key] = (offset, length)
+            end = max(end, offset + length)
+        packSize = os.path.getsize(self.packPath) if os.path.exists(self.packPath) else 0
+        if end != packSize:
+            index = self._scanPack()
+            self._writeIndex(index)
+        return index
+
+    def _scanPack(self):
+        """ Return index of chunks in the pack, by reading it all. """
+        index = {}
+        if not os.path.exists(self.packPath):
+            return index
+        with open(self.packPath, 'rb') as fileobj:
+            while True:
+                header = fileobj.read(_recordHeader.size)
+                if len(header) < _recordHeader.size:
+                    break
+                key, length = _recordHeader.unpack(header)
+                offset = fileobj.tell()
+                if len(fileobj.read(length)) < length:
+                    # partly written chunk
+                    break
+                index[key] = (offset, length)
+        return index
+
+    def _writeIndex(self, index):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self.indexPath + '.tmp'
+        with open(tmp, 'wb') as fileobj:
+            for key, (offset, length) in index.items():
+                fileobj.write(_indexRecord.pack(key, offset, length))
+        os.replace(tmp, self.indexPath)
+
+    def _putChunks(self, chunks):
+        """ Add dict of hash: data `chunks` which aren't already stored. """
+        new = [(key, data) for key, data in chunks.items() if key not in self._index]
+        if not new:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        records = []
+        with open(self.packPath, 'ab') as fileobj:
+            for key, data in new:
+                data = zlib.compress(data)
+                fileobj.write(_recordHeader.pack(key, len(data)))
+                offset = fileobj.tell()
+                fileobj.write(data)
+                self._index[key] = (offset, len(data))
+                records.append(_indexRecord.pack(key, offset, len(data)))
+        # pack is written first, so the index never refers to missing data
+        with open(self.indexPath, 'ab') as fileobj:
+            fileobj.write(b"".join(records))
+
+    def _getChunks(self, keys):
+        """ Return list of data of chunks `keys`. """
+        chunks = []
+        with open(self.packPath, 'rb') as fileobj:
+            for key in keys:
+                offset, length = self._index[key]
+                fileobj.seek(offset)
+                data = zlib.decompress(fileobj.read(length))
+                if chunkHash(data) != key:
+                    msg = f"Revision store chunk {key.hex()} is corrupt"
+                    raise ValueError(msg)
+                chunks.append(data)
+        return chunks
+
+    @staticmethod
+    def _splitHashes(data):
+        return [data[n:n+hashSize] for n in range(0, len(data), hashSize)]
+
+    def _groups(self, keys):
+        """ Split list of paragraph hashes `keys` into groups. """
+        groups = [[]]
+        for key in keys:
+            groups[-1].append(key)
+            if key[-1] & self.groupMask == 0 or len(groups[-1]) >= self.maxGroupSize:
+                groups.append([])
+        if not groups[-1] and len(groups) > 1:
+            groups.pop()
+        return groups
+
+    def commit(self, story, paragraphs, goal=None, t=None):
+        """ Store `paragraphs` as a new revision of `story` (its title), at
+            time `t` (default now), and return the revision dict.
+
+            If the paragraphs are the same as the latest revision of the
+            story, no revision is added and the latest one is returned.
+        """
+        keys, chunks = paragraphChunks(paragraphs)
+        text = "\n".join(paragraphText(runs) for runs in paragraphs)
+        return self.commitKeys(story, keys, countWordsInText(text), chunks,
+                               goal=goal, t=t)
+
+    def commitKeys(self, story, keys, words, chunks=None, goal=None, t=None):
+        """ Store a new revision of `story` from list of paragraph hashes
+            `keys`, as `commit` does, e.g. when only some of the paragraphs
+            have been hashed again.
+
+            `words` is the word count of the revision, and `chunks` is dict
+            of hash: data of paragraphs which may not have been stored yet.
+            Raises ValueError if any others aren't in the store, e.g. because
+            they have been removed by `collectGarbage`.
+        """
+        self._load()
+        chunks = {} if chunks is None else dict(chunks)
+        missing = sum(1 for key in keys if key not in chunks and key not in self._index)
+        if missing:
+            msg = f"{missing} paragraphs of '{story}' aren't in the revision store"
+            raise ValueError(msg)
+        groupKeys = []
+        for group in self._groups(keys):
+            data = b"".join(group)
+            key = chunkHash(data)
+            chunks[key] = data
+            groupKeys.append(key)
+        root = b"".join(groupKeys)
+        rootKey = chunkHash(root)
+        chunks[rootKey] = root
+
+        latest = self.latest(story)
+        if latest is not None and latest['root'] == rootKey.hex():
+            return latest
+
+        self._putChunks(chunks)
+        revision = {'id':self._revisions[-1]['id'] + 1 if self._revisions else 0,
+                    'story':story, 'time':time.time() if t is None else t,
+                    'root':rootKey.hex(), 'paragraphs':len(keys),
+                    'words':words, 'goal':goal}
+        with open(self.revisionsPath, 'a') as fileobj:
+            fileobj.write(json.dumps(revision) + "\n")
+        self._revisions.append(revision)
+        return revision
+
+    def stories(self):
+        """ Return sorted list of titles of stories with revisions. """
+        self._load()
+        return sorted({revision['story'] for revision in self._revisions})
+
+    def revisions(self, story):
+        """ Return list of revisions of `story`, oldest first. """
+        self._load()
+        return [revision for revision in self._revisions
+                if revision['story'] == story]
+
+    def latest(self, story):
+        """ Return latest revision of `story`, or None. """
+        self._load()
+        for revision in reversed(self._revisions):
+            if revision['story'] == story:
+                return revision
+        return None
+
+    def paragraphHashes(self, revision):
+        """ Return list of hashes of the paragraphs in `revision`. """
+        self._load()
+        root, = self._getChunks([bytes.fromhex(revision['root'])])
+        keys = []
+        for group in self._getChunks(self._splitHashes(root)):
+            keys += self._splitHashes(group)
+        return keys
+
+    def paragraphs(self, revision):
+        """ Return list of paragraphs of `revision`, each of which is a list
+            of (text, format) runs.
+        """
+        keys = self.paragraphHashes(revision)
+        # a paragraph may appear more than once
+        unique = list(dict.fromkeys(keys))
+        data = dict(zip(unique, self._getChunks(unique)))
+        return [[tuple(run) for run in json.loads(data[key])] for key in keys]
+
+    def diff(self, old, new, context=1):
+        """ Return list of (tag, text) paragraphs showing the changes from
+            revision `old` to `new`.
+
+            Tag is ' ' for an unchanged paragraph, '-' for a removed one and
+            '+' for an added one. Only `context` unchanged paragraphs are kept
+            around each change; a gap of skipped paragraphs is (None, count).
+            If `old` is None, every paragraph of `new` is added.
+        """
+        oldKeys = self.paragraphHashes(old) if old is not None else []
+        newKeys = self.paragraphHashes(new)
+        # paragraphs are compared by hash, so only those shown are read
+        opcodes = SequenceMatcher(None, oldKeys, newKeys, autojunk=False).get_opcodes()
+        items = []
+        for n, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+            if tag != 'equal':
+                items += [('-', oldKeys[i1:i2]), ('+', newKeys[j1:j2])]
+                continue
+            keys = oldKeys[i1:i2]
+            head = keys[:context] if n > 0 else []
+            tail = keys[max(len(keys) - context, 0):] if n < len(opcodes) - 1 else []
+            if len(head) + len(tail) >= len(keys):
+                items.append((' ', keys))
+            else:
+                items += [(' ', head), (None, len(keys) - len(head) - len(tail)),
+                          (' ', tail)]
+        needed = list({key for tag, keys in items if tag is not None for key in keys})
+        texts = {key:paragraphText(json.loads(data))
+                 for key, data in zip(needed, self._getChunks(needed))}
+        result = []
+        for tag, keys in items:
+            if tag is None:
+                result.append((None, keys))
+            else:
+                result += [(tag, texts[key]) for key in keys]
+        return result
+
+    def prune(self, keepAll=7, keepDaily=90, now=None):
+        """ Remove old revisions and return the number removed.
+
+            All revisions from the last `keepAll` days are kept, then the
+            last revision of each day for `keepDaily` days, then the last
+            revision of each week. The latest revision of each story is
+            always kept. Call `collectGarbage` afterwards to free the space.
+        """
+        self._load()
+        if now is None:
+            now = time.time()
+        day = 86400
+        latest = {revision['story']:revision['id'] for revision in self._revisions}
+        latest = set(latest.values())
+        kept = []
+        buckets = set()
+        # newest first, so the latest revision in each bucket is kept
+        for revision in reversed(self._revisions):
+            age = now - revision['time']
+            story = revision['story']
+            if age < keepAll * day:
+                bucket = None
+            elif age < keepDaily * day:
+                bucket = (story, 'day', int(revision['time'] // day))
+            else:
+                bucket = (story, 'week', int(revision['time'] // (7 * day)))
+            if bucket is None or revision['id'] in latest or bucket not in buckets:
+                kept.append(revision)
+                if bucket is not None:
+                    buckets.add(bucket)
+        kept.reverse()
+        removed = len(self._revisions) - len(kept)
+        if removed:
+            os.makedirs(self.path, exist_ok=True)
+            tmp = self.revisionsPath + '.tmp'
+            with open(tmp, 'w') as fileobj:
+                for revision in kept:
+                    fileobj.write(json.dumps(revision) + "\n")
+            os.replace(tmp, self.revisionsPath)
+            self._revisions = kept
+        return removed
+
+    def collectGarbage(self):
+        """ Rewrite the pack without chunks which aren't used by any revision,
+            and return the number of bytes freed.
+        """
+        self._load()
+        used = set()
+        for revision in self._revisions:
+            root = bytes.fromhex(revision['root'])
+            if root in used:
+                continue
+            used.add(root)
+            rootData, = self._getChunks([root])
+            groups = [key for key in self._splitHashes(rootData) if key not in used]
+            used.update(groups)
+            for group in self._getChunks(groups):
+                used.update(self._splitHashes(group))
+        if len(used) == len(self._index):
+            return 0
+
+        before = os.path.getsize(self.packPath)
+        tmp = self.packPath + '.tmp'
+        index = {}
+        with open(self.packPath, 'rb') as src, open(tmp, 'wb') as dest:
+            for key, (offset, length) in sorted(self._index.items(),
+                                                key=lambda item: item[1][0]):
+                if key not in used:
+                    continue
+                src.seek(offset)
+                data = src.read(length)
+                dest.write(_recordHeader.pack(key, length))
+                index[key] = (dest.tell(), length)
+                dest.write(data)
+        # if interrupted between these, the index won't match the pack and
+        # is rebuilt by `_readIndex`
+        os.replace(tmp, self.packPath)
+        self._writeIndex(index)
+        self._index = index
+        return before - os.path.getsize(self.packPath)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 10:02:51 2026
+
+@author: keziah
+"""
+
+import time
+import zlib
+import sqlite3
+import threading
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+from .chapters import writeChapters
+from .instrument import measure
+
+
+class SaveJob:
+    """ A story to save: a snapshot of its chapters, taken on the GUI thread,
+        which `run` writes on a worker thread.
+
+        Parameters
+        ----------
+        story : ChapteredStory
+            Story the snapshot was taken of. It is only used on the GUI
+            thread, to update its chapters once they have been written.
+        path : str
+            File to save to, or name of the story in `storage`.
+        title : str
+            Story title
+        chapters : list
+            Chapters from `ChapteredStory.snapshot`.
+        date : str, optional
+            Date in ISO format
+        goal : int, optional
+            Word count goal
+        compress : bool
+            If True (default), compress the story.
+        fsync : {'always', 'file', 'never'}
+            When to flush the file to disk; see `chapters.fsyncPolicies`.
+            Default is 'file'.
+        storage : StoryStorage, optional
+            Storage to save the story in. The story should have been opened
+            from it, if it was opened.
+    """
+
+    def __init__(self, story, path, title, chapters, date=None, goal=None,
+                 compress=True, fsync='file', storage=None):
+        self.story = story
+        self.path = path
+        self.title = title
+        self.chapters = chapters
+        self.date = date
+        self.goal = goal
+        self.compress = compress
+        self.fsync = fsync
+        self.storage = storage
+        # story the unchanged chapters are in
+        self.source = story.path
+        # set once the story has been written
+        self.header = None
+        self.elapsed = None
+        # message if anything after writing the story failed, e.g. indexing
+        self.error = None
+
+    def run(self):
+        """ Write the story, and return the header. """
+        write = writeChapters if self.storage is None else self.storage.writeChapters
+        self.header = write(self.path, self.title, self.chapters, date=self.date,
+                            goal=self.goal, compress=self.compress,
+                            source=self.source, fsync=self.fsync)
+        return self.header
+
+
+class StorySaver(QObject):
+    """ Save stories without blocking the GUI thread.
+
+        `save` takes a snapshot of the story on the GUI thread, which only
+        copies the chapters which have changed. They are encoded and written
+        (to a temporary file which is renamed over the story, or appended to
+        it) on the global thread pool. A save requested while another is
+        being written is put off until it has finished, and any number of
+        those are merged into one.
+
+        Parameters
+        ----------
+        snapshot : callable
+            Called with no arguments on the GUI thread when a save starts.
+            Returns a `SaveJob`, or None if there is nothing to save.
+        afterWrite : callable, optional
+            Called with the `SaveJob` on the worker thread once the story has
+            been written, e.g. to index it.
+    """
+
+    saving = pyqtSignal(object)
+    """ **signal** saving(SaveJob `job`)
+
+        Emitted when a snapshot has been taken and is about to be written.
+    """
+
+    saved = pyqtSignal(object)
+    """ **signal** saved(SaveJob `job`)
+
+        Emitted when the story has been written. `job.elapsed` is the time
+        taken in seconds, and `job.error` is set if `afterWrite` failed.
+    """
+
+    failed = pyqtSignal(object, str)
+    """ **signal** failed(SaveJob `job`, str `message`)
+
+        Emitted if the story could not be written.
+    """
+
+    _done = pyqtSignal(object)
+
+    def __init__(self, snapshot, afterWrite=None):
+        super().__init__()
+        self.snapshot = snapshot
+        self.afterWrite = afterWrite
+        self._job = None
+        self._task = None
+        self._again = False
+        self._error = None
+        self._idle = threading.Event()
+        self._idle.set()
+        self._done.connect(self._finish)
+
+    @property
+    def busy(self):
+        """ True while a save is being written. """
+        return self._job is not None
+
+    @pyqtSlot()
+    def save(self):
+        """ Save the story, or save it again once the save being written
+            has finished.
+        """
+        if self._job is not None:
+            self._again = True
+            return
+        self._again = False
+        job = self.snapshot()
+        if job is None:
+            return
+        self._job = job
+        self._error = None
+        self._idle.clear()
+        self.saving.emit(job)
+        self._task = _SaveTask(self, job)
+        QThreadPool.globalInstance().start(self._task)
+
+    def wait(self):
+        """ Block until the saves which have been requested have been
+            written, and handle them now rather than when the event loop
+            gets to them, e.g. before reading the story file on the GUI
+            thread or quitting.
+        """
+        while self._job is not None:
+            self._idle.wait()
+            self._finish(self._job)
+
+    def run(self, job):
+        """ Write `job`. This is called on a worker thread by `save`. """
+        t0 = time.perf_counter()
+        try:
+            with measure('StorySaver.run'):
+                job.run()
+            if self.afterWrite is not None:
+                try:
+                    self.afterWrite(job)
+                except (OSError, ValueError, sqlite3.Error) as err:
+                    job.error = str(err)
+                except Exception as err:
+                    # an exception escaping the thread pool would abort
+                    job.error = f"{type(err).__name__}: {err}"
+        except (OSError, ValueError, zlib.error) as err:
+            self._error = str(err)
+        except Exception as err:
+            # e.g. from a storage backend; reported with `failed` rather
+            # than escaping the thread pool, which would abort
+            self._error = f"{type(err).__name__}: {err}"
+        finally:
+            job.elapsed = time.perf_counter() - t0
+            # set before emitting, so `wait` never misses the end of a save
+            self._idle.set()
+            self._done.emit(job)
+
+    @pyqtSlot(object)
+    def _finish(self, job):
+        if job is not self._job:
+            # already handled by `wait`
+            return
+        self._job = None
+        if job.header is None:
+            message = self._error or f"{job.path} could not be written"
+            self.failed.emit(job, message)
+        else:
+            self.saved.emit(job)
+        if self._again:
+            self.save()
+
+
+class _SaveTask(QRunnable):
+    """ Runnable to call `StorySaver.run` on the thread pool. """
+
+    def __init__(self, saver, job):
+        super().__init__()
+        self.saver = saver
+        self.job = job
+        self.setAutoDelete(False)
+
+    def run(self):
+        self.saver.run(self.job)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:21:50 2026
+
+@author: keziah
+"""
+
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+from .storyindex import StoryIndex, readStoryRecords
+
+
+class StoryScanner(QObject):
+    """ Bring the `StoryIndex` up to date on a worker thread, emitting the
+        stories in batches as they become available.
+
+        Stories which haven't changed since they were indexed are emitted
+        first. New or changed stories are then read, in a process pool if
+        there are many of them, and emitted as they are finished.
+
+        Parameters
+        ----------
+        path : str
+            Path to directory where stories are stored.
+        batchSize : int
+            Maximum number of stories in each `storiesFound` signal.
+            Default is 500.
+        processThreshold : int
+            If more than this many stories need to be read, read them in a
+            process pool. Default is 50.
+    """
+
+    storiesFound = pyqtSignal(list)
+    """ **signal** storiesFound(list `records`)
+
+        Emitted with list of `StoryRecord`s as they are found.
+    """
+
+    progress = pyqtSignal(int, int)
+    """ **signal** progress(int `done`, int `total`)
+
+        Emitted with the number of stories found so far and the total.
+    """
+
+    finished = pyqtSignal()
+    """ **signal** finished
+
+        Emitted when the scan is complete, unless it was cancelled.
+    """
+
+    def __init__(self, path, batchSize=500, processThreshold=50):
+        super().__init__()
+        self.path = path
+        self.batchSize = batchSize
+        self.processThreshold = processThreshold
+        self._cancelled = threading.Event()
+        self._task = None
+
+    def start(self):
+        """ Start scanning on the global thread pool. """
+        self._cancelled.clear()
+        self._task = _ScanTask(self)
+        QThreadPool.globalInstance().start(self._task)
+
+    @pyqtSlot()
+    def cancel(self):
+        """ Stop scanning as soon as possible. """
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def scan(self):
+        """ Scan the directory, emitting signals as stories are found.
+
+            This is called on a worker thread by `start`.
+        """
+        index = StoryIndex(self.path)
+        unchanged, changed, removed = index.changes()
+        total = len(unchanged) + len(changed)
+        done = 0
+
+        for n in range(0, len(unchanged), self.batchSize):
+            if self.cancelled:
+                return
+            batch = unchanged[n:n+self.batchSize]
+            done += len(batch)
+            self.storiesFound.emit(batch)
+            self.progress.emit(done, total)
+
+        if removed:
+            index.store(removed=removed)
+
+        for batch in self._readChanged(changed):
+            if self.cancelled:
+                return
+            # store each batch as it's read, so that the work isn't lost if
+            # the scan is cancelled
+            index.store(batch)
+            done += len(batch)
+            self.storiesFound.emit(batch)
+            self.progress.emit(done, total)
+
+        self.finished.emit()
+
+    def _readChanged(self, changed):
+        """ Yield batches of `StoryRecord`s for the `changed` stories. """
+        if len(changed) <= self.processThreshold:
+            for n in range(0, len(changed), self.batchSize):
+                if self.cancelled:
+                    return
+                yield readStoryRecords(self.path, changed[n:n+self.batchSize])
+            return
+
+        # send work to the processes in smaller chunks, so that rows appear
+        # steadily and cancelling doesn't have to wait long
+        chunkSize = min(self.batchSize, self.processThreshold)
+        executor = ProcessPoolExecutor()
+        try:
+            futures = [executor.submit(readStoryRecords, self.path,
+                                       changed[n:n+chunkSize])
+                       for n in range(0, len(changed), chunkSize)]
+            for future in as_completed(futures):
+                if self.cancelled:
+                    return
+                yield future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _ScanTask(QRunnable):
+    """ Runnable to call `StoryScanner.scan` on the thread pool. """
+
+    def __init__(self, scanner):
+        super().__init__()
+        self.scanner = scanner
+        self.setAutoDelete(False)
+
+    def run(self):
+        self.scanner.scan()
@@ -10,26 +10,45 @@ from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import (QHBoxLayout, QLabel, QLineEdit, QPushButton, 
                              QWidget, QCheckBox)
 from PyQt5.QtCore import pyqtSignal, pyqtSlot, QTimer
+from . import instrument
+from .instrument import instruments
 
 class SearchBar(QWidget):
     """ QWidget providing a serach bar, with case sensitive check box.
     
+        The `search` signal is emitted once typing has paused. The pause 
+        adapts to how long searches take, as given to `setFilterCost`, so 
+        that quick searches update as the user types and slow ones don't 
+        hold up typing.
+    
         Parameters
         ----------
         timeout : int
             Signal with search parameters will be emitted `timeout` ms after
-            text is typed in the search bar. Default is 100ms.
+            text is typed in the search bar, until the cost of a search has
+            been measured. Default is 100ms.
+        minTimeout : int
+            Shortest timeout in ms. Default is 20ms.
+        maxTimeout : int
+            Longest timeout in ms. Default is 500ms.
     """
     
+    # timeout is this many times the average search time
+    costFactor = 2
+    
     search = pyqtSignal(str, bool)
     """ **signal** search(str `text`, bool `caseSensitive`)
     
         Request search for given string.
     """
     
-    def __init__(self, timeout=100):
+    def __init__(self, timeout=100, minTimeout=20, maxTimeout=500):
         super().__init__()
         
+        self.minTimeout = minTimeout
+        self.maxTimeout = maxTimeout
+        self._cost = None
+        
         self.label = QLabel("Search")
         self.edit = QLineEdit()
         self.clear = QPushButton(QIcon.fromTheme('edit-clear'), "")
@@ -56,6 +75,20 @@ class SearchBar(QWidget):
     @pyqtSlot()
     def requestSearch(self):
         """ Get search string and case sensitive status and emit `search` signal. """
+        if instrument.enabled:
+            # recorded by the receiver once the search has been shown
+            instruments.mark('search')
         text = self.edit.text()
         caseSensitive = self.case.isChecked()
-        self.search.emit(text, caseSensitive)
\ No newline at end of file
+        self.search.emit(text, caseSensitive)
+        
+    @pyqtSlot(float)
+    def setFilterCost(self, seconds):
+        """ Set the time in `seconds` that the last search took, and adjust 
+            the timeout to match.
+        """
+        cost = seconds * 1000
+        # smooth over the last few searches
+        self._cost = cost if self._cost is None else (self._cost + cost) / 2
+        timeout = min(self.maxTimeout, max(self.minTimeout, self.costFactor * self._cost))
+        self.timer.setInterval(int(timeout))
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:40:12 2026
+
+@author: keziah
+"""
+
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from PyQt5.QtGui import QSyntaxHighlighter, QTextCharFormat
+from PyQt5.QtCore import (QObject, QRunnable, QThreadPool, QTimer, Qt,
+                          pyqtSignal, pyqtSlot)
+from .dictionary import (Dictionary, DeleteIndex, isCurrent, magic, indexMagic,
+                         normaliseWord, prepareDictionary)
+
+wordPattern = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*")
+
+defaultWordLists = ['/usr/share/dict/words', '/usr/dict/words']
+
+
+def wordAt(text, position):
+    """ Return (start, end) of the word in `text` at `position`, or None. """
+    for match in wordPattern.finditer(text):
+        if match.start() <= position <= match.end():
+            return match.start(), match.end()
+        if match.start() > position:
+            break
+    return None
+
+
+class SpellChecker(QObject):
+    """ Check words against a memory-mapped `Dictionary`, and suggest
+        corrections from its `DeleteIndex`.
+
+        The dictionary is compiled from the word lists the first time (and
+        whenever they change) in another process, then mapped on a worker
+        thread, so `load` returns immediately. Until `loaded` is emitted,
+        every word is considered correct.
+
+        Parameters
+        ----------
+        path : str
+            Directory for the compiled dictionary and the user's own words.
+        wordLists : list, optional
+            Word list files, with one word per line. By default, the first
+            of `defaultWordLists` which exists is used.
+        cacheSize : int
+            Maximum number of words to remember the result of `check` for.
+            Default is 100000.
+    """
+
+    loaded = pyqtSignal()
+    """ **signal** loaded
+
+        Emitted when the dictionary has been loaded.
+    """
+
+    failed = pyqtSignal(str)
+    """ **signal** failed(str `message`)
+
+        Emitted if the dictionary could not be loaded.
+    """
+
+    dictName = '.dictionary'
+    indexName = '.dictionary.deletes'
+    userWordsName = '.userwords'
+
+    def __init__(self, path, wordLists=None, cacheSize=100000):
+        super().__init__()
+        self.path = path
+        if wordLists is None:
+            wordLists = [p for p in defaultWordLists if os.path.exists(p)][:1]
+        self.wordLists = wordLists
+        self.cacheSize = cacheSize
+        self.dictPath = os.path.join(self.path, self.dictName)
+        self.indexPath = os.path.join(self.path, self.indexName)
+        self.userWordsPath = os.path.join(self.path, self.userWordsName)
+        self.dictionary = None
+        self.index = None
+        self._cache = {}
+        self._task = None
+        self.userWords = set()
+        try:
+            with open(self.userWordsPath) as fileobj:
+                self.userWords = {normaliseWord(line.strip()) for line in fileobj
+                                  if line.strip()}
+        except OSError:
+            pass
+
+    @property
+    def ready(self):
+        """ True if the dictionary has been loaded. """
+        return self.dictionary is not None
+
+    def load(self):
+        """ Start loading the dictionary on the global thread pool, unless
+            it has been started already.
+        """
+        if self._task is not None:
+            return
+        self._task = _LoadTask(self)
+        QThreadPool.globalInstance().start(self._task)
+
+    def run(self):
+        """ Load the dictionary. This is called on a worker thread by `load`. """
+        if not self.wordLists:
+            self.failed.emit("No word list found for spellchecking")
+            return
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            if not (isCurrent(self.dictPath, magic, 'sources', self.wordLists)
+                    and isCurrent(self.indexPath, indexMagic, 'dictionary',
+                                  [self.dictPath])):
+                # compiling is CPU bound, so keep it away from the GIL
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    executor.submit(prepareDictionary, self.wordLists,
+                                    self.dictPath, self.indexPath).result()
+            dictionary = Dictionary(self.dictPath)
+            self.index = DeleteIndex(self.indexPath, dictionary)
+        except (OSError, ValueError, KeyError) as err:
+            self.failed.emit(f"Could not load dictionary: {err}")
+            return
+        self._cache = {}
+        self.dictionary = dictionary
+        self.loaded.emit()
+
+    def check(self, word):
+        """ Return True if `word` is spelled correctly, or the dictionary
+            hasn't been loaded.
+        """
+        if self.dictionary is None:
+            return True
+        result = self._cache.get(word, None)
+        if result is None:
+            result = self._check(word)
+            if len(self._cache) >= self.cacheSize:
+                self._cache = {}
+            self._cache[word] = result
+        return result
+
+    def _check(self, word):
+        key = normaliseWord(word)
+        if len(key) <= 1 or key in self.userWords or key in self.dictionary:
+            return True
+        if key.endswith("'s"):
+            # possessive
+            return self._check(key[:-2])
+        return False
+
+    def suggest(self, word, limit=8):
+        """ Return list of up to `limit` suggested corrections for `word`. """
+        if self.index is None:
+            return []
+        return self.index.suggest(word, limit=limit)
+
+    def addWord(self, word):
+        """ Add `word` to the user's own words. """
+        key = normaliseWord(word)
+        self.userWords.add(key)
+        # the cache holds each spelling of the word separately
+        self._cache = {}
+        with open(self.userWordsPath, 'a') as fileobj:
+            fileobj.write(key + "\n")
+
+
+class _LoadTask(QRunnable):
+    """ Runnable to call `SpellChecker.run` on the thread pool. """
+
+    def __init__(self, checker):
+        super().__init__()
+        self.checker = checker
+        self.setAutoDelete(False)
+
+    def run(self):
+        self.checker.run()
+
+
+class SpellHighlighter(QSyntaxHighlighter):
+    """ Underline misspelled words in a document.
+
+        Qt only calls `highlightBlock` for blocks which have been edited, so
+        typing only checks the paragraph being typed in. Checking the whole
+        document, when the highlighter is created or the dictionary is
+        loaded, is done a few blocks at a time in the event loop, so that
+        long stories don't block the editor.
+
+        Parameters
+        ----------
+        document : QTextDocument
+            Document to check.
+        checker : SpellChecker
+            Spellchecker to check words with.
+        timeSlice : float
+            Seconds to spend checking blocks before returning to the event
+            loop. Default is 0.008.
+    """
+
+    def __init__(self, document, checker, timeSlice=0.008):
+        super().__init__(document)
+        self.checker = checker
+        self.timeSlice = timeSlice
+
+        self.misspelledFormat = QTextCharFormat()
+        self.misspelledFormat.setUnderlineStyle(QTextCharFormat.SpellCheckUnderline)
+        self.misspelledFormat.setUnderlineColor(Qt.red)
+
+        # Qt highlights the whole document after it is set; skip that pass
+        # and check in time slices instead
+        self._active = False
+        self._nextBlock = 0
+        self.timer = QTimer()
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self._recheckSome)
+
+        self.checker.loaded.connect(self.recheck)
+        if self.checker.ready:
+            QTimer.singleShot(0, self.recheck)
+
+    def highlightBlock(self, text):
+        if not self._active:
+            return
+        for match in wordPattern.finditer(text):
+            if not self.checker.check(match.group()):
+                self.setFormat(match.start(), match.end() - match.start(),
+                               self.misspelledFormat)
+
+    @pyqtSlot()
+    def recheck(self):
+        """ Check the whole document, a few blocks at a time. """
+        self._active = True
+        self._nextBlock = 0
+        self.timer.start()
+
+    def stop(self):
+        """ Stop checking the document. """
+        self.timer.stop()
+        self._active = False
+
+    @pyqtSlot()
+    def _recheckSome(self):
+        document = self.document()
+        if document is None:
+            self.timer.stop()
+            return
+        block = document.findBlockByNumber(self._nextBlock)
+        end = time.perf_counter() + self.timeSlice
+        while block.isValid() and time.perf_counter() < end:
+            self.rehighlightBlock(block)
+            block = block.next()
+        if block.isValid():
+            self._nextBlock = block.blockNumber()
+        else:
+            self.timer.stop()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:14:50 2026
+
+@author: keziah
+
+Startup profiling, turned on with `--startup-profile` in main.py.
+
+Call `start` as early as possible, then `mark` after each step. When
+profiling is off, `mark` does nothing.
+"""
+
+import sys
+import time
+from PyQt5.QtCore import QEvent, QObject, QTimer
+
+enabled = False
+_marks = []
+
+
+def start(t=None):
+    """ Turn on startup profiling and take the first mark, at time `t` from
+        `time.perf_counter` if given, or now.
+    """
+    global enabled
+    enabled = True
+    _marks.clear()
+    _marks.append(('start', time.perf_counter() if t is None else t))
+
+
+def mark(name, t=None):
+    """ Note that the step `name` finished at time `t`, or now. """
+    if enabled:
+        _marks.append((name, time.perf_counter() if t is None else t))
+
+
+def report(file=sys.stderr):
+    """ Print the time taken by each step, and the total since `start`. """
+    if not _marks:
+        return
+    first = _marks[0][1]
+    prev = first
+    print(f"{'step':<32} {'ms':>9} {'total ms':>9}", file=file)
+    for name, t in _marks[1:]:
+        print(f"{name:<32} {(t-prev)*1000:9.1f} {(t-first)*1000:9.1f}", file=file)
+        prev = t
+
+
+class _FirstPaintFilter(QObject):
+    """ Event filter which marks the first paint event, then the return to
+        the event loop once that paint has finished, and calls `callback`.
+    """
+
+    def __init__(self, app, callback):
+        super().__init__()
+        self.app = app
+        self.callback = callback
+        self.painted = False
+
+    def eventFilter(self, obj, event):
+        if not self.painted and event.type() == QEvent.Paint:
+            self.painted = True
+            mark('first paint event')
+            QTimer.singleShot(0, self._finished)
+        return False
+
+    def _finished(self):
+        mark('first paint finished')
+        self.app.removeEventFilter(self)
+        self.callback()
+
+
+def watchFirstPaint(app, callback=report):
+    """ Install event filter on QApplication `app` to mark the first paint
+        and call `callback` (which prints the report by default) when it is
+        finished.
+    """
+    global _filter
+    _filter = _FirstPaintFilter(app, callback)
+    app.installEventFilter(_filter)
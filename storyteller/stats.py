@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:40:18 2026
+
+@author: keziah
+
+Writing statistics, from the samples in a `StatsStore`.
+
+All the aggregations are done on whole NumPy arrays, so they take a few
+milliseconds even for years of samples.
+"""
+
+import os
+import time
+import numpy as np
+from .statsstore import sampleFormat
+
+sampleDtype = np.dtype([('time', '<f8'), ('story', '<i4'), ('count', '<i4'),
+                        ('delta', '<i4')])
+assert sampleDtype.itemsize == sampleFormat.size
+
+secondsPerDay = 86400
+
+
+def loadSamples(store):
+    """ Return structured array of all samples in `StatsStore` `store`,
+        including those that haven't been written yet, in time order.
+    """
+    samples = np.empty(0, dtype=sampleDtype)
+    if os.path.exists(store.samplesPath):
+        size = os.path.getsize(store.samplesPath)
+        # ignore a partly written sample at the end
+        count = size // sampleDtype.itemsize
+        samples = np.fromfile(store.samplesPath, dtype=sampleDtype, count=count)
+    pending = store.pendingSamples()
+    if pending:
+        samples = np.concatenate([samples, np.array(pending, dtype=sampleDtype)])
+    if len(samples) > 1 and np.any(np.diff(samples['time']) < 0):
+        samples = samples[np.argsort(samples['time'], kind='stable')]
+    return samples
+
+
+def localOffset(t=None):
+    """ Return offset of local time from UTC, in seconds, at time `t`. """
+    if t is None:
+        t = time.time()
+    return time.localtime(t).tm_gmtoff
+
+
+def dayNumbers(times, utcOffset=0):
+    """ Return array of day numbers (days since the epoch, in local time) of
+        array of `times`.
+    """
+    return np.floor_divide(times + utcOffset, secondsPerDay).astype(np.int64)
+
+
+def wordsPerDay(samples, firstDay=None, lastDay=None, utcOffset=0):
+    """ Return (firstDay, words), where words is an array of the number of
+        words written on each day from `firstDay` to `lastDay`.
+
+        If not given, `firstDay` and `lastDay` are the days of the first and
+        last samples.
+    """
+    days = dayNumbers(samples['time'], utcOffset)
+    if firstDay is None:
+        firstDay = int(days[0]) if len(days) else 0
+    if lastDay is None:
+        lastDay = int(days[-1]) if len(days) else firstDay
+    length = max(lastDay - firstDay + 1, 0)
+    inRange = (days >= firstDay) & (days <= lastDay)
+    words = np.bincount(days[inRange] - firstDay,
+                        weights=samples['delta'][inRange], minlength=length)
+    return firstDay, words[:length].astype(np.int64)
+
+
+def streaks(words):
+    """ Return (current, longest) streaks of consecutive days with words
+        written, from array of `words` per day, ending today.
+
+        The current streak isn't broken until a whole day is missed, so it
+        includes yesterday's streak if nothing has been written yet today.
+    """
+    active = np.asarray(words) > 0
+    if not np.any(active):
+        return 0, 0
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    lengths = ends - starts
+    longest = int(lengths.max())
+    # the last run is current if it ends today or yesterday
+    current = int(lengths[-1]) if ends[-1] >= len(active) - 1 else 0
+    return current, longest
+
+
+def sessions(samples, gap=1800):
+    """ Split samples into writing sessions, where there is no more than
+        `gap` seconds between samples.
+
+        Returns
+        -------
+        starts : array
+            Time of the first sample in each session
+        ends : array
+            Time of the last sample in each session
+        words : array
+            Words written in each session
+    """
+    times = samples['time']
+    if len(times) == 0:
+        empty = np.empty(0)
+        return empty, empty, np.empty(0, dtype=np.int64)
+    breaks = np.diff(times) > gap
+    firsts = np.flatnonzero(np.concatenate(([True], breaks)))
+    lasts = np.concatenate((firsts[1:] - 1, [len(times) - 1]))
+    words = np.add.reduceat(samples['delta'].astype(np.int64), firsts)
+    return times[firsts], times[lasts], words
+
+
+def sessionVelocity(samples, gap=1800, minDuration=60):
+    """ Return array of words per minute in each writing session.
+
+        Sessions shorter than `minDuration` seconds are treated as lasting
+        that long, as they are only one or two samples.
+    """
+    starts, ends, words = sessions(samples, gap)
+    minutes = np.maximum(ends - starts, minDuration) / 60
+    return words / minutes
+
+
+def goalHitRate(stories):
+    """ Return fraction of stories with a goal which have reached it, from
+        dict of story info in a `StatsStore`.
+    """
+    info = [(story['count'], story['goal']) for story in stories.values()
+            if story.get('goal', None)]
+    if not info:
+        return 0.0
+    counts, goals = np.array(info).T
+    return float(np.mean(counts >= goals))
+
+
+def summarise(store, days=30, now=None):
+    """ Return dict of statistics for `StatsStore` `store`.
+
+        Parameters
+        ----------
+        store : StatsStore
+            Store to read samples from
+        days : int
+            Number of days of words per day to return. Default is 30.
+        now : float, optional
+            Time to calculate statistics at. Default is now.
+
+        'recentWords' is the array of words written on each of the last
+        `days` days, starting with day number 'recentFirstDay'.
+    """
+    if now is None:
+        now = time.time()
+    utcOffset = localOffset(now)
+    samples = loadSamples(store)
+    today = int(dayNumbers(np.array([now]), utcOffset)[0])
+
+    if len(samples):
+        firstDay = int(dayNumbers(samples['time'][:1], utcOffset)[0])
+    else:
+        firstDay = today
+    firstDay, words = wordsPerDay(samples, firstDay, today, utcOffset)
+    current, longest = streaks(words)
+    velocity = sessionVelocity(samples)
+
+    return {'today':int(words[-1]) if len(words) else 0,
+            'total':int(words.sum()),
+            'dailyMean':float(words[-7:].mean()) if len(words) else 0.0,
+            'currentStreak':current,
+            'longestStreak':longest,
+            'goalHitRate':goalHitRate(store.stories),
+            'sessions':len(velocity),
+            'velocity':float(np.median(velocity)) if len(velocity) else 0.0,
+            'recentFirstDay':today - min(days, len(words)) + 1,
+            'recentWords':words[-days:]}
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:21:05 2026
+
+@author: keziah
+"""
+
+from datetime import date, timedelta
+from PyQt5.QtGui import QPainter, QPalette
+from PyQt5.QtWidgets import (QDialog, QDialogButtonBox, QFormLayout, QLabel,
+                             QVBoxLayout, QWidget)
+from PyQt5.QtCore import QRectF, QSize, Qt
+from .stats import summarise
+
+_epoch = date(1970, 1, 1)
+
+
+class BarChart(QWidget):
+    """ Simple bar chart of words written per day. """
+
+    def __init__(self):
+        super().__init__()
+        self.values = []
+        self.labels = []
+        self.setMinimumSize(QSize(300, 150))
+
+    def setValues(self, values, labels):
+        """ Set list of `values` to plot, with a `label` for each bar. """
+        self.values = list(values)
+        self.labels = list(labels)
+        if self.labels:
+            self.setToolTip(f"{self.labels[0]} to {self.labels[-1]}")
+        self.update()
+
+    def paintEvent(self, event):
+        if not self.values:
+            return
+        painter = QPainter(self)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.palette().color(QPalette.Highlight))
+        top = max(max(self.values), 1)
+        width = self.width() / len(self.values)
+        height = self.height() - 1
+        for n, value in enumerate(self.values):
+            if value <= 0:
+                continue
+            barHeight = height * value / top
+            painter.drawRect(QRectF(n*width + 1, height - barHeight,
+                                    max(width - 2, 1), barHeight))
+        painter.end()
+
+
+class StatsDialog(QDialog):
+    """ Dashboard of writing statistics from a `StatsStore`.
+
+        Parameters
+        ----------
+        store : StatsStore
+            Store of word count samples.
+        days : int
+            Number of days to show in the chart. Default is 30.
+    """
+
+    def __init__(self, store, days=30):
+        super().__init__()
+        self.setWindowTitle("Writing statistics")
+        self.store = store
+        self.days = days
+
+        self.labels = {}
+        form = QFormLayout()
+        rows = [('today', "Words today"),
+                ('dailyMean', "Words per day (last 7 days)"),
+                ('total', "Words written"),
+                ('currentStreak', "Current streak (days)"),
+                ('longestStreak', "Longest streak (days)"),
+                ('goalHitRate', "Stories reaching their goal"),
+                ('sessions', "Writing sessions"),
+                ('velocity', "Words per minute (median session)")]
+        for key, name in rows:
+            self.labels[key] = QLabel()
+            form.addRow(name, self.labels[key])
+
+        self.chart = BarChart()
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        self.buttons.rejected.connect(self.reject)
+
+        self.layout = QVBoxLayout()
+        self.layout.addLayout(form)
+        self.layout.addWidget(QLabel(f"Words per day, last {self.days} days"))
+        self.layout.addWidget(self.chart)
+        self.layout.addWidget(self.buttons)
+        self.setLayout(self.layout)
+
+        self.refresh()
+
+    def refresh(self):
+        """ Recalculate the statistics and show them. """
+        summary = summarise(self.store, days=self.days)
+        for key, label in self.labels.items():
+            value = summary[key]
+            if key == 'goalHitRate':
+                text = f"{value:.0%}"
+            elif isinstance(value, float):
+                text = f"{value:.1f}"
+            else:
+                text = str(value)
+            label.setText(text)
+        first = _epoch + timedelta(days=summary['recentFirstDay'])
+        words = summary['recentWords']
+        labels = [(first + timedelta(days=n)).isoformat() for n in range(len(words))]
+        self.chart.setValues(words.tolist(), labels)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:40 2026
+
+@author: keziah
+"""
+
+import os
+import json
+import time
+import struct
+
+# time, story id, word count, change in word count since the last sample
+sampleFormat = struct.Struct('<diii')
+
+
+class StatsStore:
+    """ Append-only store of word count samples, for writing statistics.
+
+        Each sample is (time, story id, count, delta), where delta is the
+        change in the story's word count since its previous sample. Samples
+        are packed into a binary file of fixed size records, which `stats`
+        reads as a NumPy array.
+
+        `record` only updates a list in memory, so it can be called on every
+        change to the word count. Samples for the same story less than
+        `resolution` seconds apart are merged. `flush` appends the new
+        samples to the file.
+
+        Each story's id, latest count and goal are kept in a JSON file.
+
+        Parameters
+        ----------
+        path : str
+            Path to directory where stories are stored.
+        resolution : float
+            Minimum time in seconds between samples of the same story.
+            Default is 60.
+    """
+
+    samplesName = '.stats'
+    storiesName = '.stats-stories.json'
+
+    def __init__(self, path, resolution=60):
+        self.path = path
+        self.resolution = resolution
+        self.samplesPath = os.path.join(self.path, self.samplesName)
+        self.storiesPath = os.path.join(self.path, self.storiesName)
+        self._pending = []
+        self._changed = False
+        try:
+            with open(self.storiesPath) as fileobj:
+                self.stories = json.load(fileobj)
+        except (OSError, ValueError):
+            # story name: {'id', 'count', 'goal'}
+            self.stories = {}
+
+    def record(self, story, count, goal=None, t=None):
+        """ Record word `count` of `story` (its title) at time `t` (default
+            now).
+
+            The first sample of a story only sets its baseline count, so that
+            opening an existing story doesn't count as writing it.
+        """
+        info = self.stories.get(story, None)
+        if info is None:
+            info = {'id':len(self.stories), 'count':count, 'goal':goal}
+            self.stories[story] = info
+            self._changed = True
+            return
+        if goal is not None and goal != info['goal']:
+            info['goal'] = goal
+            self._changed = True
+        delta = count - info['count']
+        if delta == 0:
+            return
+        info['count'] = count
+        self._changed = True
+        if t is None:
+            t = time.time()
+        if self._pending:
+            last = self._pending[-1]
+            if last[1] == info['id'] and t - last[0] < self.resolution:
+                # merge with the previous sample
+                self._pending[-1] = (t, last[1], count, last[3] + delta)
+                return
+        self._pending.append((t, info['id'], count, delta))
+
+    def setBaseline(self, story, count):
+        """ Set word `count` of `story` without recording a sample, for
+            changes which aren't writing.
+        """
+        info = self.stories.get(story, None)
+        if info is None:
+            self.record(story, count)
+        elif info['count'] != count:
+            info['count'] = count
+            self._changed = True
+
+    def flush(self):
+        """ Write new samples and story info to disk. """
+        if self._pending:
+            data = b"".join(sampleFormat.pack(*sample) for sample in self._pending)
+            with open(self.samplesPath, 'ab') as fileobj:
+                fileobj.write(data)
+            self._pending = []
+        if self._changed:
+            tmp = self.storiesPath + '.tmp'
+            with open(tmp, 'w') as fileobj:
+                json.dump(self.stories, fileobj)
+            os.replace(tmp, self.storiesPath)
+            self._changed = False
+
+    def pendingSamples(self):
+        """ Return list of samples which haven't been written yet. """
+        return list(self._pending)
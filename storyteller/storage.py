@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 14:37:09 2026
+
+@author: keziah
+
+Where stories are kept.
+
+Whatever the storage, a story is named by its filename, 'YYYY-MM-DD
+title.story', so that the indexes, revisions and autosave don't need to know
+where it is, and is saved in chapters (see chapters.py). `FileStorage` keeps
+each story in a file in a directory. `SqliteStorage` and `MongoStorage` (in
+mongostorage.py) keep the story metadata and chapter table in one table or
+collection and the encoded chapter blocks in another, so listing stories
+never reads their text.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from . import chapters as _chapters
+from .chapters import buildChapterTable, checkFsyncPolicy, encodeChapters
+from .storyformat import decodeBody, readStoryText
+from .storyindex import (StoryIndex, StoryRecord, parseStoryFilename, readStoryRecords,
+                         storyEntries)
+from .storyparser import paragraphText
+
+storageKinds = ('files', 'sqlite', 'mongodb')
+
+
+class StorageError(OSError):
+    """ A story could not be read from or written to its storage. """
+
+
+class StoryStorage(ABC):
+    """ Base class for places stories are kept.
+
+        Subclasses implement `records`, `record`, `exists`,
+        `readChapterTable`, `readChapter`, `writeChapters` and `delete`;
+        loading, saving, querying and finding changes are built on those,
+        and can be overridden where the storage can do better.
+
+        Methods raise OSError (or `StorageError`) if the storage can't be
+        read or written.
+    """
+
+    # directory to watch for changes, if the stories are files in one
+    directory = None
+
+    @abstractmethod
+    def records(self):
+        """ Return list of `StoryRecord`s of all stories, without their text. """
+
+    @abstractmethod
+    def record(self, filename):
+        """ Return `StoryRecord` of story `filename`. """
+
+    @abstractmethod
+    def exists(self, filename):
+        """ Return True if there is a story `filename`. """
+
+    @abstractmethod
+    def readChapterTable(self, filename):
+        """ Return (header, list of chapters) of story `filename`, as from
+            `chapters.readChapterTable`.
+        """
+
+    @abstractmethod
+    def readChapter(self, filename, entries, header=None):
+        """ Return list of paragraphs of chapter table `entries` of story
+            `filename`.
+        """
+
+    @abstractmethod
+    def writeChapters(self, filename, title, chapters, date=None, goal=None,
+                      compress=True, source=None, fsync='file'):
+        """ Write story in `chapters` as `filename` and return the header, as
+            `chapters.writeChapters` does. `source` is the name of the story
+            unchanged chapters are in, if it isn't `filename`.
+        """
+
+    @abstractmethod
+    def delete(self, filename):
+        """ Remove story `filename`. """
+
+    def query(self, title=None, since=None, until=None, limit=None):
+        """ Return list of `StoryRecord`s, newest first, whose title contains
+            `title` (case insensitive) and whose date is from `since` to
+            `until` (ISO format strings), if given. At most `limit` are
+            returned.
+        """
+        records = [record for record in self.records()
+                   if _matches(record, title, since, until)]
+        records.sort(key=lambda record: (record.date, record.title), reverse=True)
+        return records if limit is None else records[:limit]
+
+    def changes(self, records):
+        """ Compare dict of filename:`StoryRecord` with the storage.
+
+            Returns
+            -------
+            changed : list
+                `StoryRecord`s for stories which are new or have changed
+            removed : list
+                Filenames in `records` which are no longer in the storage
+        """
+        current = self.records()
+        changed = [record for record in current
+                   if records.get(record.filename, None) != record]
+        names = {record.filename for record in current}
+        return changed, [filename for filename in records if filename not in names]
+
+    def load(self, filename):
+        """ Return (header, paragraphs) of story `filename`. """
+        header, table = self.readChapterTable(filename)
+        paragraphs = []
+        for chapter in table:
+            if 'paragraphs' in chapter:
+                paragraphs += chapter['paragraphs']
+            else:
+                paragraphs += self.readChapter(filename, chapter['entries'], header)
+        return header, paragraphs
+
+    def save(self, filename, title, paragraphs, date=None, goal=None,
+             compress=True, fsync='file'):
+        """ Save list of `paragraphs` as story `filename`, and return the
+            header.
+        """
+        return self.writeChapters(filename, title, [{'paragraphs':paragraphs}],
+                                  date=date, goal=goal, compress=compress,
+                                  fsync=fsync)
+
+    def text(self, filename):
+        """ Return plain text of story `filename`. """
+        _, paragraphs = self.load(filename)
+        return "\n".join(paragraphText(runs) for runs in paragraphs)
+
+
+def directoryChanges(path, known):
+    """ Compare directory `path` with dict of `known` filename:(size, mtime).
+
+        Returns
+        -------
+        changed : list
+            (filename, size, mtime) tuples for files which are new or have
+            changed
+        removed : list
+            Filenames in `known` which are no longer in the directory
+    """
+    known = dict(known)
+    changed = []
+    for entry in storyEntries(path):
+        stat = entry.stat()
+        if known.pop(entry.name, None) != (stat.st_size, stat.st_mtime):
+            changed.append((entry.name, stat.st_size, stat.st_mtime))
+    return changed, list(known.keys())
+
+
+def _matches(record, title, since, until):
+    if title and title.lower() not in record.title.lower():
+        return False
+    if since is not None and record.date < since:
+        return False
+    if until is not None and record.date > until:
+        return False
+    return True
+
+
+class FileStorage(StoryStorage):
+    """ Stories kept as files in a directory, with their metadata cached in
+        a `StoryIndex`.
+
+        Parameters
+        ----------
+        path : str
+            Path to directory where stories are stored.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.directory = path
+        os.makedirs(self.path, exist_ok=True)
+
+    def _path(self, filename):
+        return os.path.join(self.path, filename)
+
+    def records(self):
+        return StoryIndex(self.path).refresh()
+
+    def record(self, filename):
+        return StoryIndex(self.path).update(filename)
+
+    def exists(self, filename):
+        return os.path.isfile(self._path(filename))
+
+    def readChapterTable(self, filename):
+        return _chapters.readChapterTable(self._path(filename))
+
+    def readChapter(self, filename, entries, header=None):
+        return _chapters.readChapter(self._path(filename), entries, header)
+
+    def writeChapters(self, filename, title, chapters, date=None, goal=None,
+                      compress=True, source=None, fsync='file'):
+        if source is not None:
+            source = self._path(source)
+        return _chapters.writeChapters(self._path(filename), title, chapters,
+                                       date=date, goal=goal, compress=compress,
+                                       source=source, fsync=fsync)
+
+    def delete(self, filename):
+        os.remove(self._path(filename))
+        StoryIndex(self.path).remove(filename)
+
+    def changes(self, records):
+        """ Compare dict of filename:`StoryRecord` with the directory, read
+            the stories which have changed and store them in the
+            `StoryIndex`.
+
+            Only the files whose size or modification time differ are read,
+            and a file which has been renamed keeps its record.
+        """
+        known = {filename:(record.size, record.mtime)
+                 for filename, record in records.items()}
+        changed, removed = directoryChanges(self.path, known)
+        # a renamed file keeps its size and modification time, so its record
+        # can be kept
+        removedStats = {known[filename]:filename for filename in removed}
+        newRecords = []
+        toRead = []
+        for filename, size, mtime in changed:
+            oldName = removedStats.pop((size, mtime), None)
+            if oldName is not None:
+                date, title = parseStoryFilename(filename)
+                newRecords.append(records[oldName]._replace(
+                    filename=filename, date=date, title=title))
+            else:
+                record = records.get(filename, None)
+                goal = record.goal if record is not None else None
+                toRead.append((filename, size, mtime, goal))
+        newRecords += readStoryRecords(self.path, toRead)
+        StoryIndex(self.path).store(newRecords, removed)
+        return newRecords, removed
+
+    def text(self, filename):
+        return readStoryText(self._path(filename))
+
+
+class BlockStorage(StoryStorage):
+    """ Base class for storage which keeps each story's metadata and chapter
+        table in one record, and its encoded chapter blocks in others.
+
+        A chapter table entry's 'offset' is the id of its block. Each block
+        belongs to one story, so saving a story under a new name copies the
+        blocks it keeps. Blocks are written before the story record which
+        refers to them, and removed once it no longer does.
+
+        Subclasses implement `_readBlocks`, `_writeStory`, `_readHeader`,
+        `records`, `record`, `exists` and `delete`.
+    """
+
+    @abstractmethod
+    def _readBlocks(self, filename, ids):
+        """ Return dict of id:(data, compression) of the blocks of story
+            `filename` in `ids`.
+        """
+
+    @abstractmethod
+    def _writeStory(self, filename, header, blocks, fsync):
+        """ Store dict of id:(data, compression) new `blocks`, then story
+            `filename`'s `header`, then remove its blocks which `header`
+            doesn't use.
+        """
+
+    @abstractmethod
+    def _readHeader(self, filename):
+        """ Return header of story `filename`, or None if there isn't one. """
+
+    def readChapterTable(self, filename):
+        header = self._readHeader(filename)
+        if header is None:
+            msg = f"There is no story '{filename}'"
+            raise StorageError(msg)
+        table = [{'title':entry['title'], 'words':entry['words'],
+                  'entries':[entry]} for entry in header['chapters']]
+        return header, table
+
+    def readChapter(self, filename, entries, header=None):
+        ids = {entry['offset'] for entry in entries}
+        blocks = self._readBlocks(filename, ids)
+        if len(blocks) < len(ids):
+            msg = f"Chapters of '{filename}' are missing"
+            raise StorageError(msg)
+        decoded = {}
+        paragraphs = []
+        for entry in entries:
+            offset = entry['offset']
+            if offset not in decoded:
+                data, compression = blocks[offset]
+                decoded[offset] = decodeBody(data, compression)
+            paragraphs += decoded[offset][entry['start']:entry['stop']]
+        return paragraphs
+
+    def writeChapters(self, filename, title, chapters, date=None, goal=None,
+                      compress=True, source=None, fsync='file'):
+        checkFsyncPolicy(fsync)
+        if source is None:
+            source = filename
+        compression = 'zlib' if compress else None
+        encoded = encodeChapters(chapters, compress)
+        newBlocks = {}
+        offsets = {}
+        for chapter, data, _ in encoded:
+            blockId = uuid.uuid4().hex
+            newBlocks[blockId] = (data, compression)
+            offsets[id(chapter)] = blockId
+        moved = {}
+        if source != filename:
+            used = {entry['offset'] for chapter in chapters
+                    if 'paragraphs' not in chapter for entry in chapter['entries']}
+            for oldId, block in self._readBlocks(source, used).items():
+                moved[oldId] = uuid.uuid4().hex
+                newBlocks[moved[oldId]] = block
+        header = {'title':title, 'date':date, 'goal':goal, 'wordcount':0,
+                  'compression':compression, 'chapters':[]}
+        buildChapterTable(header, chapters, encoded, offsets, moved)
+        self._writeStory(filename, header, newBlocks, fsync)
+        return header
+
+
+def savedRecord(filename, header, size):
+    """ Return `StoryRecord` of story `filename` with `header`, saved now. """
+    date, title = parseStoryFilename(filename)
+    return StoryRecord(filename, title, date, header['wordcount'],
+                       header.get('goal', None), size, time.time())
+
+
+class SqliteStorage(BlockStorage):
+    """ Stories kept in an SQLite database, e.g. for tests or to keep a
+        library in one file.
+
+        Parameters
+        ----------
+        dbPath : str
+            Path to database file. It is made if it doesn't exist.
+    """
+
+    # PRAGMA synchronous for each fsync policy
+    _synchronous = {'always':'FULL', 'file':'NORMAL', 'never':'OFF'}
+
+    def __init__(self, dbPath):
+        self.dbPath = dbPath
+        directory = os.path.dirname(os.path.abspath(dbPath))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS stories (
+                                filename TEXT PRIMARY KEY,
+                                title TEXT,
+                                date TEXT,
+                                wordcount INTEGER,
+                                goal INTEGER,
+                                size INTEGER,
+                                mtime REAL,
+                                header TEXT)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS blocks (
+                                id TEXT PRIMARY KEY,
+                                story TEXT,
+                                compression TEXT,
+                                data BLOB)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS blockStory ON blocks (story)")
+
+    @contextmanager
+    def _connect(self):
+        # sqlite connections can't be shared between threads, so make a new
+        # one whenever the database is accessed
+        try:
+            conn = sqlite3.connect(self.dbPath)
+        except sqlite3.Error as err:
+            raise StorageError(str(err)) from err
+        try:
+            with conn:
+                yield conn
+        except sqlite3.Error as err:
+            raise StorageError(str(err)) from err
+        finally:
+            conn.close()
+
+    _recordColumns = "filename, title, date, wordcount, goal, size, mtime"
+
+    def records(self):
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT {self._recordColumns} FROM stories").fetchall()
+        return [StoryRecord(*row) for row in rows]
+
+    def record(self, filename):
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {self._recordColumns} FROM stories "
+                               "WHERE filename=?", (filename,)).fetchone()
+        if row is None:
+            msg = f"There is no story '{filename}'"
+            raise StorageError(msg)
+        return StoryRecord(*row)
+
+    def exists(self, filename):
+        with self._connect() as conn:
+            row = conn.execute("SELECT 1 FROM stories WHERE filename=?",
+                               (filename,)).fetchone()
+        return row is not None
+
+    def query(self, title=None, since=None, until=None, limit=None):
+        conditions = []
+        params = []
+        if title:
+            conditions.append("title LIKE ? ESCAPE '\\'")
+            escaped = title.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f"%{escaped}%")
+        if since is not None:
+            conditions.append("date >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("date <= ?")
+            params.append(until)
+        sql = f"SELECT {self._recordColumns} FROM stories"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY date DESC, title DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [StoryRecord(*row) for row in rows]
+
+    def delete(self, filename):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM stories WHERE filename=?", (filename,))
+            conn.execute("DELETE FROM blocks WHERE story=?", (filename,))
+
+    def _readHeader(self, filename):
+        with self._connect() as conn:
+            row = conn.execute("SELECT header FROM stories WHERE filename=?",
+                               (filename,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _readBlocks(self, filename, ids):
+        ids = list(ids)
+        blocks = {}
+        with self._connect() as conn:
+            # stay well under sqlite's limit on the number of parameters
+            for n in range(0, len(ids), 500):
+                batch = ids[n:n+500]
+                marks = ",".join("?" * len(batch))
+                rows = conn.execute(f"SELECT id, data, compression FROM blocks "
+                                    f"WHERE story=? AND id IN ({marks})",
+                                    [filename] + batch)
+                for blockId, data, compression in rows:
+                    blocks[blockId] = (data, compression)
+        return blocks
+
+    def _writeStory(self, filename, header, blocks, fsync):
+        sizes = {entry['offset']:entry['length'] for entry in header['chapters']}
+        record = savedRecord(filename, header, sum(sizes.values()))
+        # one transaction, so the story and its blocks change together
+        with self._connect() as conn:
+            conn.execute(f"PRAGMA synchronous={self._synchronous[fsync]}")
+            conn.executemany("INSERT INTO blocks VALUES (?,?,?,?)",
+                             [(blockId, filename, compression, data)
+                              for blockId, (data, compression) in blocks.items()])
+            conn.execute("INSERT OR REPLACE INTO stories VALUES (?,?,?,?,?,?,?,?)",
+                         tuple(record) + (json.dumps(header),))
+            unused = [(blockId,) for blockId, in
+                      conn.execute("SELECT id FROM blocks WHERE story=?", (filename,))
+                      if blockId not in sizes]
+            conn.executemany("DELETE FROM blocks WHERE id=?", unused)
+
+
+def openStorage(kind, path, uri=None):
+    """ Return storage of `kind`, one of `storageKinds`.
+
+        Stories are files in directory `path`, or in an SQLite database in
+        it, or in the MongoDB database at `uri`. MongoDB needs pymongo to be
+        installed; ImportError is raised if it isn't.
+    """
+    if kind == 'files':
+        return FileStorage(path)
+    if kind == 'sqlite':
+        return SqliteStorage(os.path.join(path, 'stories.sqlite'))
+    if kind == 'mongodb':
+        from .mongostorage import MongoStorage
+        if uri is None:
+            return MongoStorage()
+        return MongoStorage(uri)
+    msg = f"Storage should be one of {', '.join(storageKinds)}, not '{kind}'"
+    raise ValueError(msg)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:31:12 2026
+
+@author: keziah
+
+Compact native story format.
+
+A `.story` file is made of three parts:
+
+    STORY1
+    {"title": ..., "date": ..., "goal": ..., "wordcount": ..., "compression": ...}
+    <body>
+
+The first two lines are the magic string and a JSON header, so the title,
+date, goal and word count can be read without reading the body. The body is
+JSON, compressed with zlib if the header's "compression" is "zlib":
+
+    {"text": ..., "formats": [...], "spans": [length, format, length, format, ...]}
+
+"text" is the plain text of the story, with paragraphs separated by '\\n'.
+"formats" is a list of the distinct formats in the story, as dicts (see
+`storyparser.parseStyle`) and "spans" gives the length of each run of text
+and the index of its format, covering the whole of "text".
+
+Stories saved in chapters (see `chapters.py`) have a "chapters" table in the
+header instead, and the body is a series of blocks, each encoded like the
+body above. Each chapter is a range of paragraphs in one block:
+
+    {"title": ..., "words": ..., "offset": ..., "length": ..., "start": ..., "stop": ...}
+
+where "offset" and "length" locate the block in the body.
+
+Blocks are appended to the file and the header is rewritten in place, so a
+chaptered story has two header slots after a different magic string:
+
+    STORY2
+    <seq> <crc> {"title": ..., "chapters": [...], ...}      <padding>
+    <seq> <crc> {"title": ..., "chapters": [...], ...}      <padding>
+    <body>
+
+Both slots are lines of the same length. The header is the valid slot (its
+CRC-32 matches) with the highest sequence number, and a new header is
+written over the other one, so if writing it is interrupted, the previous
+header, and the blocks it refers to, are still there.
+"""
+
+import io
+import os
+import json
+import zlib
+from .wordcount import countWordsInText
+from .storyparser import StoryHtmlParser, paragraphText, storyText
+
+magic = b"STORY1\n"
+slottedMagic = b"STORY2\n"
+extension = '.story'
+
+
+def encodeStory(title, paragraphs, date=None, goal=None, compress=True):
+    """ Return bytes of story in native format.
+
+        Parameters
+        ----------
+        title : str
+            Story title
+        paragraphs : list
+            List of paragraphs, each of which is a list of (text, format)
+            runs, as returned by `storyparser.parseStory`.
+        date : str, optional
+            Date in ISO format
+        goal : int, optional
+            Word count goal
+        compress : bool
+            If True (default), compress the body with zlib.
+    """
+    body, text = encodeBody(paragraphs, compress)
+    header = {'title':title, 'date':date, 'goal':goal,
+              'wordcount':countWordsInText(text),
+              'compression':'zlib' if compress else None}
+    return magic + json.dumps(header).encode() + b"\n" + body
+
+
+def encodeBody(paragraphs, compress=True):
+    """ Return (body bytes, plain text) of list of `paragraphs`. """
+    formats = []
+    formatIds = {}
+    spans = []
+    texts = []
+    for n, runs in enumerate(paragraphs):
+        if n > 0:
+            # paragraph separator has no format
+            _addSpan(spans, formats, formatIds, 1, {})
+        for text, fmt in runs:
+            if text:
+                _addSpan(spans, formats, formatIds, len(text), fmt)
+        texts.append(paragraphText(runs))
+    text = "\n".join(texts)
+    body = json.dumps({'text':text, 'formats':formats, 'spans':spans},
+                      ensure_ascii=False, separators=(',', ':')).encode()
+    if compress:
+        body = zlib.compress(body)
+    return body, text
+
+
+def _addSpan(spans, formats, formatIds, length, fmt):
+    key = tuple(sorted((k, v) for k, v in fmt.items() if v))
+    formatId = formatIds.get(key, None)
+    if formatId is None:
+        formatId = formatIds[key] = len(formats)
+        formats.append(dict(key))
+    if spans and spans[-1] == formatId:
+        # merge with previous span
+        spans[-2] += length
+    else:
+        spans += [length, formatId]
+
+
+def encodeHeaderSlot(header, seq, size=None):
+    """ Return header slot line of `header` with sequence number `seq`,
+        padded with spaces to `size` bytes (including the newline), if
+        given, or None if it doesn't fit.
+    """
+    data = json.dumps(header).encode()
+    line = b"%d %d %s" % (seq, zlib.crc32(data), data)
+    if size is None:
+        return line + b"\n"
+    if len(line) + 1 > size:
+        return None
+    return line + b" " * (size - len(line) - 1) + b"\n"
+
+
+def _decodeHeaderSlot(line):
+    """ Return (seq, header) from header slot `line`, or None if it is
+        invalid, e.g. because writing it was interrupted.
+    """
+    try:
+        seq, crc, data = line.rstrip(b" \n").split(b" ", 2)
+        if zlib.crc32(data) != int(crc):
+            return None
+        return int(seq), json.loads(data)
+    except ValueError:
+        return None
+
+
+def readHeaderSlots(fileobj):
+    """ Read the header of the story in binary file object `fileobj`, from
+        its start.
+
+        Returns (header, bodyStart, slots). `slots` is None if the story
+        has a single header line, or a list of (offset, size, seq) of its
+        two header slots, where `seq` is None if the slot is invalid.
+    """
+    first = fileobj.readline()
+    if first == magic:
+        header = json.loads(fileobj.readline())
+        return header, fileobj.tell(), None
+    if first != slottedMagic:
+        raise ValueError("Not a story file")
+    slots = []
+    current = None
+    for _ in range(2):
+        offset = fileobj.tell()
+        line = fileobj.readline()
+        slot = _decodeHeaderSlot(line)
+        slots.append((offset, len(line), None if slot is None else slot[0]))
+        if slot is not None and (current is None or slot[0] > current[0]):
+            current = slot
+    if current is None:
+        raise ValueError("Story header is corrupt")
+    return current[1], fileobj.tell(), slots
+
+
+def _splitHeader(data):
+    header, start, _ = readHeaderSlots(io.BytesIO(data))
+    return header, data[start:]
+
+
+def decodeStory(data):
+    """ Return (header, paragraphs) from bytes of story in native format.
+
+        Paragraphs are lists of (text, format) runs, as taken by
+        `encodeStory`.
+    """
+    header, body = _splitHeader(data)
+    if 'chapters' in header:
+        paragraphs = []
+        blocks = {}
+        for chapter in header['chapters']:
+            offset = chapter['offset']
+            if offset not in blocks:
+                block = body[offset:offset+chapter['length']]
+                blocks[offset] = decodeBody(block, header.get('compression', None))
+            paragraphs += blocks[offset][chapter['start']:chapter['stop']]
+        return header, paragraphs
+    return header, decodeBody(body, header.get('compression', None))
+
+
+def decodeBody(body, compression=None):
+    """ Return list of paragraphs from `body` bytes. """
+    if compression == 'zlib':
+        body = zlib.decompress(body)
+    body = json.loads(body)
+
+    text = body['text']
+    formats = body['formats']
+    spans = body['spans']
+    paragraphs = [[]]
+    pos = 0
+    for n in range(0, len(spans), 2):
+        length, fmt = spans[n], formats[spans[n+1]]
+        parts = text[pos:pos+length].split("\n")
+        pos += length
+        for m, part in enumerate(parts):
+            if m > 0:
+                paragraphs.append([])
+            if part:
+                paragraphs[-1].append((part, fmt))
+    return paragraphs
+
+
+def writeStory(path, title, paragraphs, date=None, goal=None, compress=True):
+    """ Write story to `path` in native format and return the header.
+
+        See `encodeStory` for parameters.
+    """
+    data = encodeStory(title, paragraphs, date=date, goal=goal, compress=compress)
+    with open(path, 'wb') as fileobj:
+        fileobj.write(data)
+    header, _ = _splitHeader(data)
+    return header
+
+
+def readHeader(path):
+    """ Return header dict of native story at `path`, without reading the
+        body.
+    """
+    with open(path, 'rb') as fileobj:
+        try:
+            header, _, _ = readHeaderSlots(fileobj)
+        except ValueError as err:
+            raise ValueError(f"{path}: {err}") from err
+        return header
+
+
+def readStory(path):
+    """ Return (header, paragraphs) of native story at `path`. """
+    with open(path, 'rb') as fileobj:
+        return decodeStory(fileobj.read())
+
+
+def readStoryParagraphs(path, chunkSize=65536):
+    """ Return (title, paragraphs) of the story at `path`, in native format or
+        html. Html is parsed as it is read, a chunk at a time.
+    """
+    if os.path.splitext(path)[1] == extension:
+        header, paragraphs = readStory(path)
+        return header.get('title', ""), paragraphs
+    parser = StoryHtmlParser()
+    with open(path) as fileobj:
+        while True:
+            text = fileobj.read(chunkSize)
+            if not text:
+                break
+            parser.feed(text)
+    parser.close()
+    return parser.title, parser.paragraphs
+
+
+def readStoryText(path):
+    """ Return plain text of the story at `path`, in native format or html. """
+    if os.path.splitext(path)[1] == extension:
+        _, paragraphs = readStory(path)
+        return "\n".join(paragraphText(runs) for runs in paragraphs)
+    with open(path) as fileobj:
+        return storyText(fileobj.read())
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:12:31 2026
+
+@author: keziah
+"""
+
+import os
+import re
+import sqlite3
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from .wordcount import countWordsInFile
+from . import storyformat
+
+StoryRecord = namedtuple('StoryRecord',
+                         ['filename', 'title', 'date', 'wordcount', 'goal',
+                          'size', 'mtime'])
+
+storyExtensions = ['.html', storyformat.extension]
+
+
+def parseStoryFilename(filename):
+    """ Return (date, title) tuple from a story `filename`, or None if the
+        name is not of the form 'YYYY-MM-DD title.ext'.
+    """
+    name, ext = os.path.splitext(filename)
+    if ext not in storyExtensions:
+        return None
+    srch = re.search(r"(\d{4}-\d{2}-\d{2} )(.+)", name)
+    if srch is None:
+        return None
+    date = srch.group(1).strip()
+    title = srch.group(2).strip()
+    return date, title
+
+
+def storyEntries(path):
+    """ Return list of `os.DirEntry`s for the story files in directory `path`.
+
+        If a story has been saved in both html and the native format, e.g.
+        when an old story is saved again or migrated, only the native file
+        is included.
+    """
+    entries = {}
+    with os.scandir(path) as it:
+        for entry in it:
+            if not entry.is_file() or parseStoryFilename(entry.name) is None:
+                continue
+            name, ext = os.path.splitext(entry.name)
+            if name in entries and ext != storyformat.extension:
+                continue
+            entries[name] = entry
+    return list(entries.values())
+
+
+def readStoryRecord(path, filename, size, mtime, goal=None):
+    """ Read story `filename` in directory `path` and return `StoryRecord`.
+
+        This is a module level function so that it can be used in a
+        process pool.
+
+        For native `.story` files, only the header is read, and the goal
+        stored in it takes precedence over `goal`.
+    """
+    date, title = parseStoryFilename(filename)
+    filepath = os.path.join(path, filename)
+    if os.path.splitext(filename)[1] == storyformat.extension:
+        header = storyformat.readHeader(filepath)
+        if header.get('goal', None) is not None:
+            goal = header['goal']
+        return StoryRecord(filename, title, date, header['wordcount'], goal,
+                           size, mtime)
+    wordcount = StoryIndex.parseStory(filepath)
+    return StoryRecord(filename, title, date, wordcount, goal, size, mtime)
+
+
+def readStoryRecords(path, changed, errors=None):
+    """ Return list of `StoryRecord`s for list of (filename, size, mtime, goal)
+        tuples in directory `path`, skipping any that can't be read.
+
+        If list `errors` is given, (filename, message) of each story which
+        couldn't be read is appended to it. Files which have been removed
+        since the directory was listed aren't errors.
+    """
+    records = []
+    for args in changed:
+        try:
+            records.append(readStoryRecord(path, *args))
+        except FileNotFoundError:
+            continue
+        except (OSError, ValueError, KeyError) as err:
+            # unreadable or malformed
+            if errors is not None:
+                errors.append((args[0], str(err)))
+    return records
+
+
+def _readStoryRecordsAndErrors(path, changed):
+    """ Return list of `StoryRecord`s and list of (filename, message) errors
+        from `readStoryRecords`, for the process pool in `StoryIndex.refresh`.
+    """
+    errors = []
+    records = readStoryRecords(path, changed, errors)
+    return records, errors
+
+
+class StoryIndex:
+    """ Persistent index of story metadata, kept in an SQLite database in the
+        stories directory.
+
+        Each story's title, date, word count, goal, file size and
+        modification time are stored, so that the stories only need to be
+        read again when they have changed on disk.
+
+        Parameters
+        ----------
+        path : str
+            Path to directory where stories are stored.
+    """
+
+    indexName = '.storyindex.sqlite'
+    version = 1
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        self.dbPath = os.path.join(self.path, self.indexName)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS stories (
+                                filename TEXT PRIMARY KEY,
+                                title TEXT,
+                                date TEXT,
+                                wordcount INTEGER,
+                                goal INTEGER,
+                                size INTEGER,
+                                mtime REAL)""")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < self.version:
+                # word counts of html stories used to include their markup;
+                # mark them as changed so that they are counted again
+                conn.execute("UPDATE stories SET mtime=-1 WHERE filename LIKE '%.html'")
+                conn.execute(f"PRAGMA user_version = {self.version}")
+
+    @contextmanager
+    def _connect(self):
+        # sqlite connections can't be shared between threads, so make a new
+        # one whenever the index is accessed
+        conn = sqlite3.connect(self.dbPath)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def parseStory(path):
+        """ Return word count of story html file at `path`, as shown in the
+            editor.
+        """
+        return countWordsInFile(path)
+
+    def _makeRecord(self, filename, stat, goal=None):
+        return readStoryRecord(self.path, filename, stat.st_size,
+                               stat.st_mtime, goal)
+
+    def records(self):
+        """ Return list of all `StoryRecord`s in the index, without checking
+            the files on disk.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM stories").fetchall()
+        return [StoryRecord(*row) for row in rows]
+
+    def changes(self):
+        """ Compare the index with the stories directory.
+
+            Returns
+            -------
+            unchanged : list
+                `StoryRecord`s for files which match the index
+            changed : list
+                (filename, size, mtime, goal) tuples for files which are new
+                or have changed since they were indexed
+            removed : list
+                Filenames in the index which are no longer in the directory
+        """
+        indexed = {record.filename:record for record in self.records()}
+
+        unchanged = []
+        changed = []
+        for entry in storyEntries(self.path):
+            stat = entry.stat()
+            record = indexed.pop(entry.name, None)
+            if (record is None or record.mtime != stat.st_mtime
+                    or record.size != stat.st_size):
+                goal = record.goal if record is not None else None
+                changed.append((entry.name, stat.st_size, stat.st_mtime, goal))
+            else:
+                unchanged.append(record)
+
+        removed = list(indexed.keys())
+        return unchanged, changed, removed
+
+    def store(self, records=None, removed=None):
+        """ Write list of `StoryRecord`s to the index and remove list of
+            `removed` filenames.
+        """
+        with self._connect() as conn:
+            if records:
+                conn.executemany("INSERT OR REPLACE INTO stories VALUES (?,?,?,?,?,?,?)",
+                                 records)
+            if removed:
+                conn.executemany("DELETE FROM stories WHERE filename=?",
+                                 [(name,) for name in removed])
+
+    def refresh(self, jobs=1, chunkSize=50, errors=None):
+        """ Bring the index up to date with the stories directory and return
+            list of `StoryRecord`s.
+
+            Only files that are new, or whose size or modification time
+            differ from the index, are read; any that can't be read are
+            skipped, and their (filename, message) appended to list `errors`
+            if it is given. If `jobs` is more than 1, they are read in a pool
+            of that many processes, `chunkSize` stories at a time.
+        """
+        unchanged, changed, removed = self.changes()
+        if jobs > 1 and len(changed) > chunkSize:
+            chunks = [changed[n:n+chunkSize] for n in range(0, len(changed), chunkSize)]
+            records = []
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                for batch, batchErrors in executor.map(_readStoryRecordsAndErrors,
+                                                       [self.path] * len(chunks),
+                                                       chunks):
+                    records += batch
+                    if errors is not None:
+                        errors += batchErrors
+        else:
+            records = readStoryRecords(self.path, changed, errors)
+        if records or removed:
+            self.store(records, removed)
+        return unchanged + records
+
+    def update(self, filename, goal=None):
+        """ Re-read story `filename` and store its data in the index.
+
+            If `goal` is not given, any goal already in the index is kept.
+        """
+        if goal is None:
+            with self._connect() as conn:
+                row = conn.execute("SELECT goal FROM stories WHERE filename=?",
+                                   (filename,)).fetchone()
+            if row is not None:
+                goal = row[0]
+        stat = os.stat(os.path.join(self.path, filename))
+        record = self._makeRecord(filename, stat, goal)
+        self.store([record])
+        return record
+
+    def remove(self, filename):
+        """ Remove story `filename` from the index. """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM stories WHERE filename=?", (filename,))
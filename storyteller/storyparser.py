@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:40:03 2026
+
+@author: keziah
+"""
+
+from html.parser import HTMLParser
+
+# elements which start a new paragraph in the text
+blockTags = {'p', 'div', 'li', 'ul', 'ol', 'table', 'tr', 'td', 'th',
+             'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre', 'hr'}
+# elements whose content isn't part of the story
+skipTags = {'head', 'style', 'script', 'title'}
+# elements with no content or end tag
+voidTags = {'br', 'hr', 'img', 'meta', 'link', 'input', 'col', 'area', 'base',
+            'wbr', 'source', 'embed', 'param', 'track'}
+# formatting implied by inline elements
+tagFormats = {'b':{'bold':True}, 'strong':{'bold':True},
+              'i':{'italic':True}, 'em':{'italic':True},
+              'u':{'underline':True},
+              's':{'strike':True}, 'strike':{'strike':True}, 'del':{'strike':True}}
+
+# Qt uses the unicode line separator for line breaks within a paragraph
+lineSeparator = '\u2028'
+
+
+def parseStyle(style):
+    """ Return dict of text formatting from css `style` attribute string.
+
+        Keys are 'bold', 'italic', 'underline', 'strike', 'family' and
+        'size' (in points); only those given in the style are included.
+    """
+    fmt = {}
+    for declaration in style.split(';'):
+        if ':' not in declaration:
+            continue
+        name, value = declaration.split(':', 1)
+        name = name.strip().lower()
+        value = value.strip()
+        if name == 'font-weight':
+            if value.isdigit():
+                fmt['bold'] = int(value) >= 600
+            else:
+                fmt['bold'] = value in ['bold', 'bolder']
+        elif name == 'font-style':
+            fmt['italic'] = value in ['italic', 'oblique']
+        elif name == 'text-decoration':
+            fmt['underline'] = 'underline' in value
+            fmt['strike'] = 'line-through' in value
+        elif name == 'font-family':
+            family = value.split(',')[0].strip().strip("'\"")
+            if family:
+                fmt['family'] = family
+        elif name == 'font-size' and value.endswith('pt'):
+            try:
+                fmt['size'] = float(value[:-2])
+            except ValueError:
+                pass
+    return fmt
+
+
+class StoryHtmlParser(HTMLParser):
+    """ Get title and paragraphs of formatted text from story html, in one
+        pass and without building a tree.
+
+        Stories are saved as an `<h1>` title, followed by the html document
+        from the editor. The first `<h1>` outside the document is the
+        `title`, and `titleComplete` is set once it has been read. Text in 
+        the editor's document is split into `paragraphs`,
+        each of which is a list of (text, format) runs, where format is a
+        dict as returned by `parseStyle`.
+
+        Html can be given in pieces with `feed`; paragraphs that have been
+        completed so far can be removed with `takeParagraphs`.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.titleComplete = False
+        self.paragraphs = []
+        self._current = None
+        self._emptyParagraph = False
+        self._inTitle = False
+        self._inHtml = False
+        self._skip = 0
+        # stack of (tag, format) for the open inline elements
+        self._formats = [(None, {})]
+
+    @property
+    def _format(self):
+        return self._formats[-1][1]
+
+    def handle_starttag(self, tag, attrs):
+        if tag in skipTags:
+            self._skip += 1
+            return
+        if tag == 'html':
+            self._inHtml = True
+            return
+        if tag == 'h1' and not self._inHtml and not self.title:
+            self._inTitle = True
+            return
+        if not self._inHtml or self._skip:
+            return
+
+        style = dict(attrs).get('style', None) or ""
+        if tag in blockTags:
+            self._endParagraph()
+            self._current = []
+            # Qt marks empty paragraphs, which contain a placeholder <br />
+            self._emptyParagraph = '-qt-paragraph-type:empty' in style
+        elif tag == 'br':
+            if self._current is None:
+                self._current = []
+            if not self._emptyParagraph:
+                self._current.append((lineSeparator, self._format))
+        elif tag not in voidTags and tag != 'body':
+            fmt = dict(self._format)
+            fmt.update(tagFormats.get(tag, {}))
+            fmt.update(parseStyle(style))
+            self._formats.append((tag, fmt))
+
+    def handle_endtag(self, tag):
+        if tag in skipTags:
+            self._skip = max(0, self._skip - 1)
+        elif tag == 'h1' and self._inTitle:
+            self._inTitle = False
+            self.titleComplete = True
+        elif tag in blockTags and self._inHtml:
+            self._endParagraph()
+        else:
+            # close this element, and any unclosed elements inside it
+            for n in range(len(self._formats)-1, 0, -1):
+                if self._formats[n][0] == tag:
+                    del self._formats[n:]
+                    break
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in voidTags:
+            self.handle_endtag(tag)
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._inTitle:
+            self.title += data
+        elif self._inHtml:
+            if self._current is None:
+                # newlines between tags in the html aren't part of the text
+                if not data.strip():
+                    return
+                self._current = []
+            self._current.append((data, self._format))
+
+    def _endParagraph(self):
+        if self._current is None:
+            return
+        # merge adjacent runs with the same format
+        runs = []
+        for text, fmt in self._current:
+            if runs and runs[-1][1] == fmt:
+                runs[-1] = (runs[-1][0] + text, fmt)
+            else:
+                runs.append((text, fmt))
+        self.paragraphs.append(runs)
+        self._current = None
+        self._emptyParagraph = False
+
+    def takeParagraphs(self):
+        """ Return list of paragraphs completed so far and remove them from
+            the parser.
+        """
+        paragraphs = self.paragraphs
+        self.paragraphs = []
+        return paragraphs
+
+    def close(self):
+        super().close()
+        self._endParagraph()
+
+
+def paragraphText(runs):
+    """ Return plain text of a paragraph, from its list of `runs`. """
+    return "".join(text for text, _ in runs)
+
+
+def parseStory(html):
+    """ Return title and list of paragraphs from story `html` string.
+
+        Each paragraph is a list of (text, format) runs; see
+        `StoryHtmlParser`.
+    """
+    parser = StoryHtmlParser()
+    parser.feed(html)
+    parser.close()
+    return parser.title, parser.paragraphs
+
+
+def storyText(html):
+    """ Return the plain text of the body of story `html` string. """
+    _, paragraphs = parseStory(html)
+    return "\n".join(paragraphText(runs) for runs in paragraphs)
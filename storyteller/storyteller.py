@@ -7,27 +7,65 @@ Created on Tue Dec 22 16:45:48 2020
 """
 
 import os
+import zlib
 from datetime import date
-from bs4 import BeautifulSoup
 
-from PyQt5.QtGui import QFontDatabase, QIcon, QKeySequence
-from PyQt5.QtWidgets import (QAction, QComboBox, QDesktopWidget, 
-                             QLineEdit, QMainWindow, QWidget, QVBoxLayout) 
-from PyQt5.QtCore import pyqtSlot, Qt
+from PyQt5.QtGui import QIcon, QKeySequence
+from PyQt5.QtWidgets import (QAction, QComboBox, QDesktopWidget, QDockWidget, 
+                             QLineEdit, QMainWindow, QMessageBox, QTabBar, 
+                             QWidget, QVBoxLayout, QProgressDialog) 
+from PyQt5.QtCore import pyqtSlot, Qt, QSettings, QTimer
 
-from .dialogs import OpenStoryDialog, TitleListDialog
 from .editor import StoryEditor
+from .fontmenu import FontComboBox
 from .countlabel import WordCountLabel
+from .storage import FileStorage, openStorage
+from .storyindex import parseStoryFilename
+from .textindex import TextIndex
+from .autosave import AutosaveJournal
+from .statsstore import StatsStore
+from .revisions import RevisionStore, paragraphChunks
+from .spellcheck import SpellChecker
+from .loader import StoryLoader, setDocumentParagraphs
+from .chapterstory import Chapter, ChapteredStory
+from .doccache import DocumentCache
+from .chapters import fsyncPolicies
+from .saver import SaveJob, StorySaver
+from .storyformat import extension
+from .storyparser import paragraphText
+from .wordcount import countWordsInText
+from . import instrument, startup
+from .instrument import instruments, timed
 
 # TODO list
 # list of titles
 # new story
-# autosave to temp file
-# dictionary/spellchecker
+## spellchecking uses the system word list (see spellcheck.py)
 # make database of stories 
 ## title, date created, date(s) modified, word count, goal
+## every save is kept as a revision (see revisions.py)
+## stories are split into chapters at headings, and only the open chapters 
+## are loaded (see chapters.py)
 # text formatting (bold, italic, font, size)
-## write to plain text; generally use the database to access
+## stories are saved in the native format (see storyformat.py)
+
+
+class StoryTab:
+    """ A story open in a tab of the `StoryTeller`. 
+    
+        The state of the current tab is in the `StoryTeller` itself, and is 
+        copied here when another tab is shown. `story` is None until a story 
+        restored from the last session is first shown.
+    """
+    
+    def __init__(self, autosave, journal, filename=None, title=""):
+        self.autosave = autosave
+        self.journal = journal
+        self.story = None
+        self.chapter = 0
+        self.currentFile = filename
+        self.title = title
+        self.goal = 100
 
 
 class StoryTeller(QMainWindow):
@@ -36,9 +74,30 @@ class StoryTeller(QMainWindow):
         super().__init__()
         
         self.goal = 100
+        self.compressStories = True
+        # filename of the story in the editor, once it has been saved or opened
+        self.currentFile = None
+        self.settings = QSettings('StoryTeller', 'StoryTeller')
         
         user = os.path.expanduser('~')
         self.savePath = os.path.join(user, 'Documents', 'stories')
+        # stories are files in savePath, unless the 'storage' setting is 
+        # 'sqlite' or 'mongodb'; indexes, revisions etc. are always there
+        self._storageError = None
+        self.storage = self._openStorage()
+        self.textIndex = TextIndex(self.savePath)
+        self.revisions = RevisionStore(self.savePath)
+        # stories are written, and the indexes and revisions updated, on a 
+        # worker thread
+        self.saver = StorySaver(self._saveJob, self._indexSavedStory)
+        self.saver.saved.connect(self._storySaved)
+        self.saver.failed.connect(self._saveFailed)
+        # when to fsync stories as they're saved: 'always', 'file' or 'never'
+        self.fsyncPolicy = self.settings.value('fsync', 'file')
+        if self.fsyncPolicy not in fsyncPolicies:
+            self.fsyncPolicy = 'file'
+        # catalogue of the stories directory, made when it's first needed
+        self.library = None
         
         self.textEdit = StoryEditor()
         self.title = QLineEdit()
@@ -48,9 +107,58 @@ class StoryTeller(QMainWindow):
         self.title.setAlignment(Qt.AlignHCenter)
         self.wordCount = WordCountLabel(self.goal)
         
-        self.textEdit.wordCount.connect(self.wordCount.setCountLabel)
+        # the editor shows one chapter of the story at a time; the chapters 
+        # open in all the tabs share the memory in the document cache
+        cacheSize = self.settings.value('documentCacheMB', 64, type=int)
+        self.documents = DocumentCache(cacheSize*1024*1024)
+        self.story = ChapteredStory.fromDocument(self.textEdit.document())
+        self.story.cache = self.documents
+        self.documents.current = self.textEdit.document()
+        self.chapter = 0
+        self.textEdit.wordCount.connect(self._chapterWordCount)
+        
+        # word count history, for statistics
+        self.stats = StatsStore(self.savePath)
+        self._recordStats = True
+        self.statsTimer = QTimer()
+        self.statsTimer.setInterval(60000)
+        self.statsTimer.timeout.connect(self.stats.flush)
+        self.statsTimer.start()
+        
+        # each tab has its own journal
+        self.autosavePath = os.path.join(self.savePath, '.autosave')
+        self.autosave = AutosaveJournal(self.autosavePath)
+        self.autosave.setDocument(self.textEdit.document())
+        
+        self.tabs = [StoryTab(self.autosave, 'story')]
+        self.tabs[0].story = self.story
+        self.tabIndex = 0
+        self.tabBar = QTabBar()
+        self.tabBar.setTabsClosable(True)
+        self.tabBar.setMovable(True)
+        self.tabBar.setExpanding(False)
+        self.tabBar.setDocumentMode(True)
+        self.tabBar.addTab("Untitled")
+        self.tabBar.currentChanged.connect(self.showTab)
+        self.tabBar.tabCloseRequested.connect(self.closeTab)
+        self.tabBar.tabMoved.connect(self._tabMoved)
+        self.title.textChanged.connect(self._titleChanged)
+        
+        # the dictionary is loaded on a worker thread when spellchecking is 
+        # turned on
+        self.spellChecker = SpellChecker(self.savePath)
+        self.spellChecker.failed.connect(self._spellcheckFailed)
+        
+        self.loader = StoryLoader()
+        self.loader.finished.connect(self._chapterLoaded)
+        self.loader.storyRead.connect(self._htmlRead)
+        self.loader.failed.connect(self._htmlFailed)
+        # True while the first chapter of a story is being opened
+        self._opening = False
+        startup.mark('StoryTeller editor')
         
         self.layout = QVBoxLayout()
+        self.layout.addWidget(self.tabBar)
         self.layout.addWidget(self.title)
         self.layout.addWidget(self.textEdit)
         self.layout.addWidget(self.wordCount)
@@ -59,17 +167,31 @@ class StoryTeller(QMainWindow):
         self.centralWidget.setLayout(self.layout)
         self.setCentralWidget(self.centralWidget)
         
-        self.fontDB = QFontDatabase()
-        
         self.createActions()
         self.createMenus()
         self.createToolBars()
         self.connectActions()
+        startup.mark('StoryTeller actions')
         
         self.setWindowTitle("Story Teller")
-        self.resize(700,600)
-        self.centre()
+        self.restoreSession()
         self.show()
+        startup.mark('StoryTeller show')
+        
+        # wait until the window has been painted
+        QTimer.singleShot(0, self.restoreStory)
+        
+    def _openStorage(self):
+        """ Return storage chosen in the settings, or `FileStorage` if it 
+            can't be opened.
+        """
+        kind = self.settings.value('storage', 'files')
+        try:
+            return openStorage(kind, self.savePath, 
+                               self.settings.value('mongoUri', None))
+        except (ImportError, OSError, ValueError) as err:
+            self._storageError = f"Could not open {kind} storage: {err}"
+            return FileStorage(self.savePath)
         
     def centre(self):
         """ Centre window on screen. """
@@ -78,64 +200,839 @@ class StoryTeller(QMainWindow):
         qr.moveCenter(cp)
         self.move(qr.topLeft())
         
+    def closeEvent(self, event):
+        self.saver.wait()
+        self.saveSession()
+        for tab in self.tabs:
+            tab.autosave.close()
+        self.stats.flush()
+        super().closeEvent(event)
+        
+    def restoreSession(self):
+        """ Restore window geometry and font from the last session. """
+        geometry = self.settings.value('geometry', None)
+        if geometry is None:
+            self.resize(700,600)
+            self.centre()
+        else:
+            self.restoreGeometry(geometry)
+        self._setFont(family=self.fontMenu.currentText(), 
+                      size=self.sizes[self.sizeMenu.currentIndex()])
+        self.spellAct.setChecked(self.settings.value('spellcheck', True, type=bool))
+        self.analyticsAct.setChecked(self.settings.value('analytics', False, type=bool))
+            
+    def saveSession(self):
+        """ Save window geometry, font and open stories for next time. """
+        self.settings.setValue('geometry', self.saveGeometry())
+        self.settings.setValue('fontFamily', self.fontMenu.currentText())
+        self.settings.setValue('fontSize', self.sizes[self.sizeMenu.currentIndex()])
+        self._storeTab()
+        self.settings.setValue('openStories', [tab.currentFile for tab in self.tabs 
+                                               if tab.currentFile is not None])
+        self.settings.setValue('lastStory', self.currentFile)
+        self.settings.setValue('spellcheck', self.spellAct.isChecked())
+        self.settings.setValue('analytics', self.analyticsAct.isChecked())
+        
+    @pyqtSlot()
+    def restoreStory(self):
+        """ Recover autosaved changes or, if there are none, open the stories 
+            from the last session.
+        """
+        if self._storageError is not None:
+            QMessageBox.warning(self, "Storage", self._storageError)
+        names = AutosaveJournal.journalNames(self.autosavePath)
+        if names:
+            self.recoverAutosave(names)
+            return
+        lastStory = self.settings.value('lastStory', None)
+        filenames = self.settings.value('openStories', [], type=list)
+        if not filenames and lastStory:
+            filenames = [lastStory]
+        filenames = [filename for filename in filenames if self._storyExists(filename)]
+        if not filenames:
+            return
+        # only the story which was current is opened now; the others are 
+        # opened when their tabs are first shown
+        tab = self.tabs[0]
+        tab.story = None
+        tab.currentFile = filenames[0]
+        tab.title = self._fileTitle(filenames[0])
+        self.tabBar.setTabText(0, tab.title or "Untitled")
+        for filename in filenames[1:]:
+            self._addTab(filename)
+        index = filenames.index(lastStory) if lastStory in filenames else 0
+        self.showTab(index)
+        
+    def _storyExists(self, filename):
+        try:
+            return bool(filename) and self.storage.exists(filename)
+        except OSError:
+            return False
+        
+    @staticmethod
+    def _fileTitle(filename):
+        parsed = parseStoryFilename(filename)
+        return "" if parsed is None else parsed[1]
+        
+    def recoverAutosave(self, names=None):
+        """ If there are autosaved changes from a previous session, ask 
+            whether to restore them. Each journal in list `names` is 
+            recovered into its own tab.
+        """
+        if names is None:
+            names = AutosaveJournal.journalNames(self.autosavePath)
+        if not names:
+            return
+        msg = "There are unsaved changes from the last session. Recover them?"
+        result = QMessageBox.question(self, "Recover story", msg)
+        if result != QMessageBox.Yes:
+            for name in names:
+                journal = self._tabJournal(name)
+                if journal is None:
+                    journal = AutosaveJournal(self.autosavePath, name)
+                    journal.reset()
+                    journal.close()
+                else:
+                    journal.reset()
+            return
+        for name in names:
+            if name != self.tabs[self.tabIndex].journal:
+                self.showTab(self._addTab(journal=name))
+            self.autosave.setEnabled(False)
+            self._recordStats = False
+            self._recoverChapters()
+            self._recordStats = True
+            self.autosave.setEnabled(True)
+            
+    def _tabJournal(self, name):
+        """ Return the `AutosaveJournal` called `name` of an open tab, or None. """
+        for tab in self.tabs:
+            if tab.journal == name:
+                return tab.autosave
+        return None
+            
+    def _recoverChapters(self):
+        """ Rebuild the story from the file it was opened from, with the 
+            stashed chapters and the autosave snapshot in place of the 
+            chapters they were edited from. 
+        """
+        context = self.autosave.recoveryContext()
+        stashes = self.autosave.stashes()
+        contexts = [c for c, _ in stashes] + ([context] if context else [])
+        filename = next((c['file'] for c in contexts if c.get('file')), None)
+        story = None
+        if filename is not None:
+            try:
+                story = ChapteredStory.fromStorage(self.storage, filename)
+            except (OSError, ValueError, KeyError, IndexError, AssertionError, 
+                    zlib.error):
+                filename = None
+        if story is None:
+            # only the chapter in the snapshot can be recovered
+            story = ChapteredStory.fromDocument(ChapteredStory.newDocument())
+            stashes = []
+            
+        def replace(context, paragraphs):
+            if context.get('source'):
+                return story.replaceSource(context['source'], paragraphs)
+            n = context.get('chapter', 0)
+            if n >= len(story):
+                return None
+            # chapters of a story which isn't saved in chapters are split 
+            # the same way each time
+            story.chapters[n].paragraphs = paragraphs
+            story.chapters[n].entries = None
+            return n
+        
+        # the snapshot chapter is replaced last, so that its number stays 
+        # the same
+        n = 0
+        for stashContext, paragraphs in stashes:
+            if context is None or stashContext.get('chapter') != context.get('chapter'):
+                replace(stashContext, paragraphs)
+        document = ChapteredStory.newDocument()
+        if context is not None:
+            n = replace(context, []) if filename is not None else 0
+            if n is None:
+                # the chapter has gone from the file, so keep it at the end
+                story.chapters.append(Chapter("Recovered", 0, paragraphs=[]))
+                n = len(story) - 1
+            story.setDocument(n, document)
+            title = self.autosave.recover(document, self._savedSource(filename, context))
+        else:
+            setDocumentParagraphs(document, story.paragraphs(n))
+            story.setDocument(n, document)
+            title = story.header.get('title', "")
+        self.currentFile = filename
+        self.title.setText(title)
+        self._openChapter(story, n)
+        document.setModified(context is not None)
+        # the chapter numbers have changed, so stash the recovered chapters 
+        # again in place of the old stashes
+        self.autosave.reset()
+        for m, chapter in enumerate(story.chapters):
+            if m != n and chapter.dirty:
+                self.autosave.stash(m, story.paragraphs(m), self._autosaveContext(m))
+        self.autosave.flush()
+        
+    def _savedSource(self, filename, context):
+        """ Return paragraphs of the chapter in story `filename` which the 
+            autosave snapshot starts from, if it is of the saved chapter 
+            rather than the document, otherwise None. 
+        """
+        if (filename is None or not context.get('source') 
+                or not self.autosave.isSavedSnapshot()):
+            return None
+        try:
+            return self.storage.readChapter(filename, context['source'])
+        except (OSError, ValueError, KeyError, IndexError, zlib.error):
+            return None
+        
     @pyqtSlot(int)
     def setFontFamily(self, idx):
         # TODO set on highlighted text
-        family = self.fontFamilies[idx]
-        for widget in [self.title, self.textEdit]:
-            font = widget.font()
-            font.setFamily(family)
-            widget.setFont(font)
+        self._setFont(family=self.fontMenu.itemText(idx))
     
     @pyqtSlot(int)
     def setFontSize(self, idx):
         # TODO set on highlighted text
-        size = self.sizes[idx]
+        self._setFont(size=self.sizes[idx])
+        
+    def _setFont(self, family=None, size=None):
         for widget in [self.title, self.textEdit]:
             font = widget.font()
-            font.setPointSize(size)
+            if family is not None:
+                font.setFamily(family)
+            if size is not None:
+                font.setPointSize(size)
             widget.setFont(font)
     
+    @pyqtSlot(bool)
+    def setSpellcheck(self, enabled):
+        """ Turn spellchecking on or off. """
+        if enabled:
+            self.spellChecker.load()
+            self.textEdit.setSpellChecker(self.spellChecker)
+        else:
+            self.textEdit.setSpellChecker(None)
+            
+    @pyqtSlot(bool)
+    def setAnalytics(self, enabled):
+        """ Show or hide the prose analytics panel. """
+        if self.analyticsDock is None:
+            if not enabled:
+                return
+            try:
+                from .prosepanel import ProsePanel
+            except ImportError:
+                msg = "Prose analytics need NumPy to be installed."
+                QMessageBox.warning(self, "Prose analytics", msg)
+                self.analyticsAct.setChecked(False)
+                return
+            self.prosePanel = ProsePanel()
+            self.textEdit.blocksChanged.connect(self.prosePanel.analyser.blocksChanged)
+            self.analyticsDock = QDockWidget("Prose", self)
+            # shown and hidden with the action
+            self.analyticsDock.setFeatures(QDockWidget.DockWidgetMovable 
+                                           | QDockWidget.DockWidgetFloatable)
+            self.analyticsDock.setWidget(self.prosePanel)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.analyticsDock)
+            # the editor sends all the blocks when it counts the whole document
+            self.textEdit.countWords()
+        self.analyticsDock.setVisible(enabled)
+            
+    @pyqtSlot(str)
+    def _spellcheckFailed(self, message):
+        self.statusBar().showMessage(message, 5000)
+    
     @pyqtSlot()
+    @timed('StoryTeller.saveStory')
     def saveStory(self):
+        """ Save the story in the background. Only the snapshot of the 
+            changed chapters is taken here. 
+        """
+        self.saver.save()
+        
+    def _saveJob(self):
+        """ Return `SaveJob` of the story as it is now, or None if it can't 
+            be saved yet. 
+        """
+        if self.loader.loading:
+            # the chapter would be saved half loaded
+            self.statusBar().showMessage("The story is still loading", 5000)
+            return None
         today = date.today().strftime("%Y-%m-%d")
-        filename = f"{today} {self.title.text()}.html"
-        path = os.path.join(self.savePath, filename)
+        title = self.title.text()
+        filename = f"{today} {title}{extension}"
+        self.statusBar().showMessage(f"Saving {title}...")
+        # only the chapters which have changed are written
+        return SaveJob(self.story, filename, title, self.story.snapshot(), 
+                       date=today, goal=self.goal, 
+                       compress=self.compressStories, fsync=self.fsyncPolicy, 
+                       storage=self.storage)
+    
+    def _indexSavedStory(self, job):
+        """ Add revision of saved story to the revision store and update the 
+            story and text indexes. This is called on a worker thread by the 
+            `StorySaver`, so nothing else uses them while a save is running. 
+            
+            Only the chapters which were written are hashed; the paragraph 
+            hashes, text and word count of each chapter are kept as what it 
+            was 'indexed' as, for the next save. 
+        """
+        keys = []
+        chunks = {}
+        texts = []
+        words = 0
+        for saved in job.chapters:
+            indexed = saved.get('indexed', None)
+            if indexed is None:
+                paragraphs = saved.get('paragraphs', None)
+                if paragraphs is None:
+                    # not indexed since the story was opened
+                    paragraphs = self.storage.readChapter(job.path, saved['entries'], 
+                                                          job.header)
+                chapterKeys, chapterChunks = paragraphChunks(paragraphs)
+                chunks.update(chapterChunks)
+                text = "\n".join(paragraphText(runs) for runs in paragraphs)
+                indexed = saved['indexed'] = (chapterKeys, text, countWordsInText(text))
+            keys += indexed[0]
+            texts.append(indexed[1])
+            words += indexed[2]
+        try:
+            self.revisions.commitKeys(job.title, keys, words, chunks, goal=job.goal)
+        except ValueError:
+            # paragraphs of the last revision have gone, so store them all
+            _, paragraphs = self.storage.load(job.path)
+            self.revisions.commit(job.title, paragraphs, goal=job.goal)
+        record = self.storage.record(job.path)
+        self.textIndex.update(job.path, "\n".join(texts), record.mtime)
+        self.textIndex.save()
+        
+    @pyqtSlot(object)
+    def _storySaved(self, job):
+        job.story.applySave(job.path, job.header, job.chapters, job.storage)
+        if self.library is not None:
+            # show the new word count without waiting for the watcher
+            self.library.update()
+        if job.error is not None:
+            self.statusBar().showMessage(f"Saved {job.title}, but it could not "
+                                         f"be indexed: {job.error}", 5000)
+        else:
+            self.statusBar().showMessage(f"Saved {job.title} "
+                                         f"({job.elapsed*1000:.0f} ms)", 5000)
+        if job.story is not self.story:
+            tab = next((tab for tab in self.tabs if tab.story is job.story), None)
+            if tab is not None:
+                # saved, then another tab was shown
+                tab.currentFile = job.path
+                self._restash(tab.autosave, tab.story, job.path)
+            return
+        self.currentFile = job.path
+        # chapters edited since the snapshot are still unsaved, so they're 
+        # autosaved again; otherwise the chapter in the editor is the same 
+        # as the file, so the journal starts from that
+        self.autosave.setContext(self._autosaveContext(self.chapter))
+        modified = self.textEdit.document().isModified()
+        self._restash(self.autosave, self.story, job.path, skip=self.chapter, 
+                      saved=not modified)
+        if modified:
+            self.autosave.flush()
+        self._updateChapterMenu()
         
-        text = f"<h1>{self.title.text()}</h1>" + self.textEdit.toHtml()
+    def _restash(self, autosave, story, filename, skip=None, saved=False):
+        """ Reset `autosave` and stash the chapters of `story` which are 
+            still unsaved, apart from chapter `skip`. `saved` is given to 
+            `AutosaveJournal.reset`.
+        """
+        autosave.reset(saved)
+        for n, chapter in enumerate(story.chapters):
+            if n != skip and chapter.dirty:
+                autosave.stash(n, story.paragraphs(n), 
+                               self._autosaveContext(n, story, filename))
         
-        with open(path, 'w') as fileobj:
-            fileobj.write(text)
+    @pyqtSlot(object, str)
+    def _saveFailed(self, job, message):
+        self.statusBar().clearMessage()
+        QMessageBox.warning(self, "Save failed", 
+                            f"{job.title} could not be saved: {message}")
+    
+    @pyqtSlot(int)
+    def setGoal(self, goal):
+        """ Set word count goal for the story. """
+        self.goal = goal
+        self.wordCount.goal = goal
+        self.wordCount.setCountLabel(self.story.words)
     
     @pyqtSlot()
     def openStory(self):
-        diag = OpenStoryDialog(self.savePath)
+        """ Choose a story and open it in a new tab, or show it if it's 
+            open already. 
+        """
+        from .dialogs import OpenStoryDialog
+        if self.library is None:
+            # scanned when the dialog is first opened, then kept up to date
+            from .library import StoryLibrary
+            self.library = StoryLibrary(self.storage)
+        diag = OpenStoryDialog(self.savePath, self.library, self.textIndex)
         result = diag.execDialog()
-        if result:
-            self._openFile(diag.value)
+        if not result:
+            return
+        filename = diag.value
+        index = next((index for index, tab in enumerate(self.tabs) 
+                      if tab.currentFile == filename), None)
+        if index is not None:
+            self.showTab(index)
+            return
+        if self._tabInUse():
+            self.showTab(self._addTab())
+        if not self.loader.loading:
+            self._openFile(filename)
+            
+    def _tabInUse(self):
+        """ Return False if the current tab is an empty new story. """
+        return (self.currentFile is not None or bool(self.title.text()) 
+                or len(self.story) > 1 or self.story.words > 0)
         
     @pyqtSlot(str)
     def _openFile(self, filename):
-        # set text
-        path = os.path.join(self.savePath, filename)
+        """ Open story `filename` and start loading its first chapter into 
+            the editor. 
+        """
+        # it may be the story being saved
+        self.saver.wait()
+        if instrument.enabled:
+            instruments.mark('StoryTeller open')
+        if (self.storage.directory is not None 
+                and os.path.splitext(filename)[1] != extension):
+            # html is parsed a chunk at a time, so the window stays responsive
+            self.autosave.setEnabled(False)
+            self._recordStats = False
+            try:
+                self.loader.readHtml(os.path.join(self.storage.directory, filename))
+            except OSError as err:
+                self.autosave.setEnabled(True)
+                self._recordStats = True
+                QMessageBox.warning(self, "Open failed", str(err))
+            return
+        try:
+            story = ChapteredStory.fromStorage(self.storage, filename)
+        except (ValueError, KeyError, IndexError, AssertionError, zlib.error):
+            if self.storage.directory is None:
+                QMessageBox.warning(self, "Open failed", 
+                                    f"{filename} could not be read")
+                return
+            self.currentFile = filename
+            self._openFileFallback(os.path.join(self.storage.directory, filename))
+            return
+        except OSError as err:
+            QMessageBox.warning(self, "Open failed", str(err))
+            return
+        self.currentFile = filename
+        # don't autosave or record statistics while the story is being loaded
+        self.autosave.setEnabled(False)
+        self._recordStats = False
+        self._opening = True
+        self.title.setText(story.header.get('title', ""))
+        self._openChapter(story, 0)
+        
+    @pyqtSlot(str, str, list)
+    def _htmlRead(self, path, title, paragraphs):
+        """ Open html story at `path`, from its `title` and `paragraphs`. """
+        filename = os.path.basename(path)
+        story = ChapteredStory.fromParagraphs(paragraphs, path=filename, 
+                                              header={'title':title}, 
+                                              storage=self.storage)
+        self.currentFile = filename
+        self._opening = True
+        self.title.setText(title)
+        self._openChapter(story, 0)
+        
+    @pyqtSlot(str)
+    def _htmlFailed(self, path):
+        """ Open html story at `path` which `StoryHtmlParser` couldn't parse. """
+        self.currentFile = os.path.basename(path)
+        self._openFileFallback(path)
+        
+    @pyqtSlot(int)
+    def showChapter(self, n):
+        """ Show chapter `n` of the story in the editor. """
+        if n == self.chapter or not 0 <= n < len(self.story):
+            return
+        if self.loader.loading:
+            # the chapter being loaded would be left half loaded
+            self.chapterMenu.setCurrentIndex(self.chapter)
+            return
+        if self.textEdit.document().isModified():
+            # autosave only records the document in the editor
+            self.autosave.stash(self.chapter, self.story.paragraphs(self.chapter),
+                                self._autosaveContext(self.chapter))
+        self._openChapter(self.story, n)
+        
+    def _openChapter(self, story, n):
+        """ Make `story` the current story and show its chapter `n`, loading 
+            it if it isn't open. 
+        """
+        # keep the story and document being replaced until the editor has 
+        # let go of them
+        previous = self.story, self.textEdit.document()
+        document = story.document(n)
+        paragraphs = None
+        if document is None:
+            # a save may be moving the chapters in the file
+            self.saver.wait()
+            paragraphs = story.paragraphs(n)
+            document = story.newDocument()
+            story.setDocument(n, document)
+            # loading a chapter isn't writing it
+            self.autosave.setEnabled(False)
+            self._recordStats = False
+        self.loader.cancel()
+        self.story = story
+        self.chapter = n
+        self.tabs[self.tabIndex].story = story
+        story.cache = self.documents
+        self.documents.current = document
+        self.textEdit.setDocument(document)
+        self.autosave.setDocument(document)
+        self.autosave.setContext(self._autosaveContext(n))
+        self._updateChapterMenu()
+        if previous[0] is not story and all(tab.story is not previous[0] for tab in self.tabs):
+            # the story in this tab has been replaced
+            self.documents.discardStory(previous[0])
+        del previous
+        if paragraphs is not None:
+            self.loader.loadParagraphs(paragraphs, document, story.header)
+        elif self._opening:
+            self._chapterLoaded()
+            
+    def _autosaveContext(self, n, story=None, filename=None):
+        """ Return context to autosave chapter `n` of `story` (by default the 
+            current story) with, to find the chapter it replaces when it is 
+            recovered. 
+        """
+        if story is None:
+            story, filename = self.story, self.currentFile
+        return {'file':filename, 'chapter':n, 
+                'source':story.chapters[n].source}
+        
+    def _updateChapterMenu(self):
+        self.chapterMenu.blockSignals(True)
+        self.chapterMenu.clear()
+        self.chapterMenu.addItems([chapter.title for chapter in self.story.chapters])
+        self.chapterMenu.setCurrentIndex(self.chapter)
+        self.chapterMenu.blockSignals(False)
+        
+    @pyqtSlot()
+    def _chapterLoaded(self):
+        # an unsaved chapter is still saved, as it has no entries in the file
+        self.textEdit.document().setModified(False)
+        self.story.setWords(self.chapter, self.textEdit.count)
+        if self._opening:
+            self._opening = False
+            if instrument.enabled:
+                instruments.elapsed('StoryTeller open')
+            goal = self.story.header.get('goal', None)
+            if goal is not None:
+                self.setGoal(goal)
+            # story is the same as the file now
+            self.autosave.reset()
+        self.autosave.setEnabled(True)
+        self._recordStats = True
+        self.wordCount.setCountLabel(self.story.words)
+        self._recordWordCount(self.story.words)
+        
+    @pyqtSlot(int)
+    def _chapterWordCount(self, count):
+        if self.loader.loading:
+            # counted when the chapter has been loaded
+            return
+        self.story.setWords(self.chapter, count)
+        total = self.story.words
+        self.wordCount.setCountLabel(total)
+        self._recordWordCount(total)
+        
+    @pyqtSlot(int)
+    def _recordWordCount(self, count):
+        title = self.title.text()
+        if self._recordStats and title:
+            self.stats.record(title, count, self.goal)
+        
+    @pyqtSlot(str)
+    def _openFileFallback(self, path):
+        """ Load story at `path` with BeautifulSoup, if it is installed, or 
+            Qt's html parser otherwise.
+        """
         with open(path) as fileobj:
             text = fileobj.read()
-            
-        soup = BeautifulSoup(text, 'html.parser')
-        self.title.setText(soup.h1.text)
-        self.textEdit.setHtml(str(soup.html)) # TODO read paras properly here
+        self.autosave.setEnabled(False)
+        self._recordStats = False
+        document = ChapteredStory.newDocument()
+        try:
+            from bs4 import BeautifulSoup
+        except ImportError:
+            document.setHtml(text)
+        else:
+            soup = BeautifulSoup(text, 'html.parser')
+            if soup.h1 is not None:
+                self.title.setText(soup.h1.text)
+            document.setHtml(str(soup.html))
+        self._opening = True
+        self._openChapter(ChapteredStory.fromDocument(document), 0)
         
     @pyqtSlot()
     def showTitleList(self):
+        from .dialogs import TitleListDialog
         diag = TitleListDialog(self.savePath)
         result = diag.execDialog()
         if result:
             pass
         
+    @pyqtSlot()
+    def exportStory(self):
+        """ Export the current story or the whole library. """
+        from .exportdialog import ExportDialog, LibraryExporter
+        diag = ExportDialog(self.savePath)
+        diag.setTitle(self.title.text())
+        if not diag.execDialog():
+            return
+        # the story file is read, so it shouldn't be half written
+        self.saver.wait()
+        
+        if not diag.library:
+            # export what's in the editor, even if it hasn't been saved
+            from .export import formatStory, writeExport
+            paragraphs = self.story.allParagraphs()
+            text = formatStory(self.title.text(), paragraphs, diag.fmt)
+            try:
+                writeExport(diag.dest, text, diag.archive)
+            except OSError as err:
+                self._exportFailed(str(err))
+            return
+        
+        if self.storage.directory is None:
+            msg = "Only stories saved as files can be exported as a library."
+            QMessageBox.warning(self, "Export", msg)
+            return
+        self.exporter = LibraryExporter(self.savePath, diag.dest, diag.fmt, 
+                                        diag.archive)
+        self.exportProgress = QProgressDialog("Exporting stories", "Cancel", 
+                                              0, 0, self)
+        self.exportProgress.setWindowModality(Qt.WindowModal)
+        self.exportProgress.canceled.connect(self.exporter.cancel)
+        self.exporter.progress.connect(self._exportProgress)
+        self.exporter.finished.connect(self._exportFinished)
+        self.exporter.failed.connect(self._exportFailed)
+        self.exportProgress.show()
+        self.exporter.start()
+        
+    @pyqtSlot(int, int)
+    def _exportProgress(self, done, total):
+        self.exportProgress.setMaximum(total)
+        self.exportProgress.setValue(done)
+        
+    @pyqtSlot(int)
+    def _exportFinished(self, count):
+        self.exportProgress.reset()
+        msg = f"Exported {count} changed stories"
+        errors = self.exporter.export.errors
+        if errors:
+            msg += f"; {len(errors)} could not be read"
+        self.statusBar().showMessage(msg, 5000)
+        
+    @pyqtSlot(str)
+    def _exportFailed(self, message):
+        if getattr(self, 'exportProgress', None) is not None:
+            self.exportProgress.reset()
+        QMessageBox.warning(self, "Export failed", message)
+        
+    @pyqtSlot()
+    def showStats(self):
+        try:
+            from .statsdialog import StatsDialog
+        except ImportError:
+            msg = "Statistics need NumPy to be installed."
+            QMessageBox.warning(self, "Statistics", msg)
+            return
+        diag = StatsDialog(self.stats)
+        diag.exec_()
+        
+    @pyqtSlot()
+    def showHistory(self):
+        """ Show saved revisions of the current story, and restore one if 
+            chosen.
+        """
+        from .historydialog import HistoryDialog
+        # revisions are added on the saver's thread
+        self.saver.wait()
+        diag = HistoryDialog(self.revisions, self.title.text())
+        if not diag.execDialog() or diag.value is None:
+            return
+        try:
+            paragraphs = self.revisions.paragraphs(diag.value)
+        except (OSError, ValueError, KeyError) as err:
+            QMessageBox.warning(self, "Restore failed", str(err))
+            return
+        # restoring isn't writing, so don't count it in the statistics; the 
+        # restored text is unsaved, so it is autosaved
+        story = ChapteredStory.fromParagraphs(paragraphs)
+        document = story.newDocument()
+        setDocumentParagraphs(document, story.paragraphs(0))
+        story.setDocument(0, document)
+        self._recordStats = False
+        self.currentFile = None
+        self._openChapter(story, 0)
+        goal = diag.value.get('goal', None)
+        if goal is not None:
+            self.setGoal(goal)
+        self._recordStats = True
+        self.autosave.flush()
+        if self.title.text():
+            self.stats.setBaseline(self.title.text(), self.story.words)
+        
+    @pyqtSlot()
+    def showInstrumentation(self):
+        from .debugwindow import InstrumentationWindow
+        if getattr(self, 'instrumentWindow', None) is None:
+            self.instrumentWindow = InstrumentationWindow()
+        self.instrumentWindow.show()
+        self.instrumentWindow.raise_()
+        
     @pyqtSlot()
     def newStory(self):
-        # TODO prompt to save changes, then clear and set temp title (for savename)
-        pass
+        """ Start a new story in a new tab. """
+        self.showTab(self._addTab())
+        
+    def _addTab(self, filename=None, journal=None):
+        """ Add tab for story `filename`, which is opened when the tab is 
+            first shown, or a new story if it is None, and return its index. 
+            
+            The tab autosaves to `journal`, if given, e.g. to recover it; 
+            otherwise to the first journal which isn't in use, which is 
+            cleared. 
+        """
+        autosave = None
+        if journal is None:
+            names = {tab.journal for tab in self.tabs}
+            k = 2
+            while f"story-{k}" in names:
+                k += 1
+            journal = f"story-{k}"
+            autosave = AutosaveJournal(self.autosavePath, journal)
+            autosave.reset()
+        else:
+            autosave = AutosaveJournal(self.autosavePath, journal)
+        title = "" if filename is None else self._fileTitle(filename)
+        self.tabs.append(StoryTab(autosave, journal, filename, title))
+        self.tabBar.blockSignals(True)
+        index = self.tabBar.addTab(title or "Untitled")
+        self.tabBar.blockSignals(False)
+        return index
+        
+    def _storeTab(self):
+        """ Copy the state of the current tab to its `StoryTab`. """
+        tab = self.tabs[self.tabIndex]
+        if tab.story is None:
+            # not opened yet
+            return
+        tab.story = self.story
+        tab.chapter = self.chapter
+        tab.currentFile = self.currentFile
+        tab.title = self.title.text()
+        tab.goal = self.goal
+        
+    @pyqtSlot(int)
+    def showTab(self, index):
+        """ Show the story in tab `index`, opening it if it hasn't been 
+            opened yet. 
+        """
+        if not 0 <= index < len(self.tabs):
+            return
+        tab = self.tabs[index]
+        if index == self.tabIndex and tab.story is not None:
+            return
+        if self.loader.loading:
+            # the chapter being loaded would be left half loaded
+            self.statusBar().showMessage("The story is still loading", 5000)
+            self._setTabBarIndex(self.tabIndex)
+            return
+        self._storeTab()
+        # the journal of a story which isn't in the editor is kept as it is 
+        # until it's shown again
+        self.autosave.flush()
+        self.autosave.setDocument(None)
+        self.tabIndex = index
+        self._setTabBarIndex(index)
+        self.autosave = tab.autosave
+        self.autosave.setEnabled(False)
+        self._recordStats = False
+        filename = None
+        if tab.story is None:
+            tab.story = ChapteredStory.fromDocument(ChapteredStory.newDocument())
+            tab.chapter = 0
+            filename, tab.currentFile = tab.currentFile, None
+        self.currentFile = tab.currentFile
+        self.title.setText(tab.title)
+        self.setGoal(tab.goal)
+        self._openChapter(tab.story, tab.chapter)
+        if filename is not None:
+            self._openFile(filename)
+        elif not self.loader.loading:
+            self.autosave.setEnabled(True)
+            self._recordStats = True
+            self.wordCount.setCountLabel(self.story.words)
+            
+    def _setTabBarIndex(self, index):
+        self.tabBar.blockSignals(True)
+        self.tabBar.setCurrentIndex(index)
+        self.tabBar.blockSignals(False)
+            
+    @pyqtSlot(int)
+    def closeTab(self, index):
+        """ Close tab `index`, asking first if its story has unsaved 
+            changes. If it is the last tab, a new story is started. 
+        """
+        if index == self.tabIndex:
+            if self.loader.loading:
+                self.statusBar().showMessage("The story is still loading", 5000)
+                return
+            self._storeTab()
+        tab = self.tabs[index]
+        story = tab.story
+        unsaved = (story is not None and any(chapter.dirty for chapter in story.chapters) 
+                   and (story.path is not None or story.words > 0))
+        if unsaved:
+            msg = f"{tab.title or 'Untitled'} has unsaved changes. Close it anyway?"
+            if QMessageBox.question(self, "Close story", msg) != QMessageBox.Yes:
+                return
+        if len(self.tabs) == 1:
+            self.newStory()
+        elif index == self.tabIndex:
+            self.showTab(index - 1 if index > 0 else index + 1)
+        if self.tabIndex == index:
+            # still loading the story in the tab to show instead
+            return
+        del self.tabs[index]
+        if index < self.tabIndex:
+            self.tabIndex -= 1
+        self.tabBar.blockSignals(True)
+        self.tabBar.removeTab(index)
+        self.tabBar.setCurrentIndex(self.tabIndex)
+        self.tabBar.blockSignals(False)
+        tab.autosave.reset()
+        tab.autosave.close()
+        if story is not None:
+            self.documents.discardStory(story)
+            
+    @pyqtSlot(int, int)
+    def _tabMoved(self, start, end):
+        self.tabs.insert(end, self.tabs.pop(start))
+        self.tabIndex = self.tabBar.currentIndex()
+        
+    @pyqtSlot(str)
+    def _titleChanged(self, title):
+        self.autosave.setTitle(title)
+        self.tabBar.setTabText(self.tabIndex, title or "Untitled")
     
     def _clear(self):
         self.title.setText("")
@@ -160,11 +1057,26 @@ class StoryTeller(QMainWindow):
                                statusTip="View list of titles", triggered=self.showTitleList)
         
         self.exportAct = QAction(QIcon.fromTheme('text-x-generic'), "&Export", 
-                                 self, statusTip="Export plain text")
+                                 self, statusTip="Export stories as text or Markdown", 
+                                 triggered=self.exportStory)
+        
+        self.historyAct = QAction(QIcon.fromTheme('document-open-recent'), 
+                                  "&History", self, 
+                                  statusTip="Show and restore saved revisions", 
+                                  triggered=self.showHistory)
+        
+        self.statsAct = QAction(QIcon.fromTheme('x-office-spreadsheet'), 
+                                "S&tatistics", self, 
+                                statusTip="Show writing statistics", 
+                                triggered=self.showStats)
         
         self.setGoalAct = QAction(QIcon.fromTheme('insert-text'),
                                   "Set the word count goal", self)
 
+        self.instrumentAct = QAction("&Instrumentation", self,
+                                     statusTip="Show timing instrumentation",
+                                     triggered=self.showInstrumentation)
+
         self.exitAct = QAction("E&xit", self, shortcut="Ctrl+Q",
                                statusTip="Exit the application", 
                                triggered=self.close)
@@ -183,23 +1095,41 @@ class StoryTeller(QMainWindow):
                                  "Strikethrough", 
                                  self)#, shortcut="Ctrl+B")
         
-        self.fontMenu = QComboBox()
-        self.fontFamilies = self.fontDB.families()
-        currentFont = self.textEdit.font().family()
-        self.fontMenu.addItems(self.fontFamilies)
-        idx = self.fontFamilies.index(currentFont)
-        self.fontMenu.setCurrentIndex(idx)
+        self.spellAct = QAction(QIcon.fromTheme('tools-check-spelling'), 
+                                "Check spelling", self, checkable=True,
+                                statusTip="Underline misspelled words",
+                                toggled=self.setSpellcheck)
+        
+        self.analyticsDock = None
+        self.analyticsAct = QAction(QIcon.fromTheme('accessories-text-editor'), 
+                                    "Prose analytics", self, checkable=True,
+                                    statusTip="Show sentence lengths, readability "
+                                              "and repeated words", 
+                                    toggled=self.setAnalytics)
+        
+        # installed fonts are only listed when the menu is first opened
+        family = self.settings.value('fontFamily', self.textEdit.font().family())
+        self.fontMenu = FontComboBox(family)
         
         self.sizeMenu = QComboBox()
         self.sizes = [8, 9, 10, 11, 12, 14]
         self.sizeMenu.addItems([f"{size}pt" for size in self.sizes])
         self.defaultFontSize = 11 #self.textEdit.fontPointSize()
-        idx = self.sizes.index(self.defaultFontSize)
+        size = int(self.settings.value('fontSize', self.defaultFontSize))
+        if size not in self.sizes:
+            size = self.defaultFontSize
+        idx = self.sizes.index(size)
         self.sizeMenu.setCurrentIndex(idx)
         
+        self.chapterMenu = QComboBox()
+        self.chapterMenu.setToolTip("Chapter")
+        self.chapterMenu.setSizeAdjustPolicy(QComboBox.AdjustToContents)
+        self._updateChapterMenu()
+        
     def connectActions(self):
         self.fontMenu.currentIndexChanged.connect(self.setFontFamily)
         self.sizeMenu.currentIndexChanged.connect(self.setFontSize)
+        self.chapterMenu.activated[int].connect(self.showChapter)
         
     def createMenus(self):
         self.fileMenu = self.menuBar().addMenu("&File")
@@ -208,9 +1138,15 @@ class StoryTeller(QMainWindow):
         self.fileMenu.addAction(self.openAct)
         self.fileMenu.addAction(self.titleListAct)
         self.fileMenu.addAction(self.exportAct)
+        self.fileMenu.addAction(self.historyAct)
+        self.fileMenu.addAction(self.statsAct)
         self.fileMenu.addSeparator();
         self.fileMenu.addAction(self.exitAct)
         
+        if instrument.enabled:
+            self.debugMenu = self.menuBar().addMenu("&Debug")
+            self.debugMenu.addAction(self.instrumentAct)
+        
     def createToolBars(self):
         self.fileToolBar = self.addToolBar("File")
         self.fileToolBar.addAction(self.newAct)
@@ -224,7 +1160,12 @@ class StoryTeller(QMainWindow):
         self.editToolBar.addAction(self.italicAct)
         self.editToolBar.addAction(self.underlineAct)
         self.editToolBar.addAction(self.strikeAct)
+        self.editToolBar.addAction(self.spellAct)
+        self.editToolBar.addAction(self.analyticsAct)
         
         self.editToolBar.addWidget(self.fontMenu)
         self.editToolBar.addWidget(self.sizeMenu)
+        
+        self.chapterToolBar = self.addToolBar("Chapters")
+        self.chapterToolBar.addWidget(self.chapterMenu)
         
\ No newline at end of file
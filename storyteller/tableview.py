@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:02:15 2026
+
+@author: keziah
+"""
+import heapq
+from array import array
+from datetime import date
+from PyQt5.QtWidgets import QTableView
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+
+class ColumnTableModel(QAbstractTableModel):
+    """ Table model which stores each column in a single compact container.
+
+        Rows are only exposed to the view in batches of `batchSize`, as the
+        view asks for them with `fetchMore`.
+
+        Rows are referred to in two ways: the 'storage' row is the position
+        the row was added in, and the 'display' row is its position in the
+        view, after sorting and filtering.
+
+        Parameters
+        ----------
+        headerLabels : list
+            List of column header labels.
+        columnTypes : list, optional
+            Type of each column: `int` columns are stored in an int array,
+            `datetime.date` columns are given as ISO format strings and stored
+            as ordinals in an int array, and anything else is stored as a list
+            of strings. Default is all `str`.
+        readOnly : bool
+            If True, the whole table will be read-only. Default is False.
+        parent : QObject, optional
+            Parent object
+    """
+
+    batchSize = 1000
+
+    def __init__(self, headerLabels, columnTypes=None, readOnly=False, parent=None):
+        super().__init__(parent)
+
+        if columnTypes is None:
+            columnTypes = [str] * len(headerLabels)
+        if len(columnTypes) != len(headerLabels):
+            msg = "ColumnTableModel needs one column type per header label."
+            raise ValueError(msg)
+
+        self.headerLabels = list(headerLabels)
+        self.columnTypes = list(columnTypes)
+        self._columns = [self._makeColumn(t) for t in self.columnTypes]
+
+        # storage rows in display order, before and after filtering
+        self._sorted = array('l')
+        self._order = array('l')
+        self._filter = None
+        self._sortColumn = None
+        self._sortOrder = Qt.AscendingOrder
+        self._fetched = 0
+
+        self._flags = Qt.ItemIsEnabled|Qt.ItemIsSelectable
+        if not readOnly:
+            self._flags |= Qt.ItemIsEditable
+
+    @staticmethod
+    def _makeColumn(columnType):
+        if columnType is int or columnType is date:
+            return array('q')
+        else:
+            return []
+
+    def _toStorage(self, col, value):
+        columnType = self.columnTypes[col]
+        if columnType is int:
+            return int(value)
+        elif columnType is date:
+            return date.fromisoformat(str(value)).toordinal()
+        else:
+            return str(value)
+
+    def _fromStorage(self, col, value):
+        if self.columnTypes[col] is date:
+            return date.fromordinal(value).isoformat()
+        return value
+
+    @property
+    def storageRowCount(self):
+        """ Total number of rows, including those filtered out or not yet
+            fetched.
+        """
+        return len(self._columns[0]) if self._columns else 0
+
+    @property
+    def displayRowCount(self):
+        """ Number of rows that pass the filter, including those not yet
+            fetched.
+        """
+        return len(self._order)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._fetched
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headerLabels)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._fetched < len(self._order)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        n = min(self.batchSize, len(self._order) - self._fetched)
+        if n <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + n - 1)
+        self._fetched += n
+        self.endInsertRows()
+
+    def fetchAll(self):
+        """ Make all rows available to the view. """
+        while self.canFetchMore():
+            self.fetchMore()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in [Qt.DisplayRole, Qt.EditRole]:
+            return None
+        row = self._order[index.row()]
+        col = index.column()
+        return self._fromStorage(col, self._columns[col][row])
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        row = self._order[index.row()]
+        col = index.column()
+        try:
+            self._columns[col][row] = self._toStorage(col, value)
+        except ValueError:
+            return False
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return self._flags
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headerLabels[section]
+        return section + 1
+
+    def storageRow(self, row):
+        """ Return storage row for display `row`. """
+        return self._order[row]
+
+    def value(self, row, column):
+        """ Return value in storage `row` of column `column`. """
+        col = self.headerLabels.index(column)
+        return self._fromStorage(col, self._columns[col][row])
+
+    def getRow(self, row):
+        """ Return list of values in display `row`, as strings. """
+        if row < 0 or row >= len(self._order):
+            raise IndexError("ColumnTableModel display row out of range")
+        row = self._order[row]
+        return [str(self._fromStorage(col, values[row]))
+                for col, values in enumerate(self._columns)]
+
+    def getColumn(self, name):
+        """ Return list of values in column `name` for every storage row, as
+            strings.
+        """
+        col = self.headerLabels.index(name)
+        if self.columnTypes[col] is date:
+            return [date.fromordinal(value).isoformat() for value in self._columns[col]]
+        elif self.columnTypes[col] is int:
+            return [str(value) for value in self._columns[col]]
+        else:
+            return list(self._columns[col])
+
+    def addRows(self, rows):
+        """ Add rows to the table.
+
+            `rows` should be an iterable of either sequences of values, in
+            order, or dicts, where the keys correspond to header strings.
+        """
+        start = self.storageRowCount
+        for values in rows:
+            if isinstance(values, dict):
+                values = [values[key] for key in self.headerLabels]
+            elif not isinstance(values, (tuple, list)):
+                msg = f"Could not add item of type {type(values)} to ColumnTableModel."
+                raise TypeError(msg)
+            for col, value in enumerate(values):
+                self._columns[col].append(self._toStorage(col, value))
+        new = range(start, self.storageRowCount)
+        if len(new) == 0:
+            return
+
+        if self._sortColumn is not None:
+            # only the new rows need sorting, then they are merged in
+            values = self._columns[self._sortColumn]
+            reverse = self._sortOrder == Qt.DescendingOrder
+            batch = sorted(new, key=values.__getitem__, reverse=reverse)
+            self._sorted = array('l', heapq.merge(self._sorted, batch,
+                                                  key=values.__getitem__,
+                                                  reverse=reverse))
+            if self._filter is None:
+                # new rows aren't shown while there's a filter
+                self._insertRows(self._sorted, start)
+        else:
+            self._sorted.extend(new)
+            if self._filter is None:
+                self._order.extend(new)
+        # only need to tell the view about rows that have been fetched
+        if self._fetched < self.batchSize:
+            self.fetchMore()
+
+    def updateRows(self, rows):
+        """ Replace the values in storage rows, from dict of storage row:values,
+            where values are as for `addRows`.
+        """
+        for row, values in rows.items():
+            if isinstance(values, dict):
+                values = [values[key] for key in self.headerLabels]
+            for col, value in enumerate(values):
+                self._columns[col][row] = self._toStorage(col, value)
+        if not rows:
+            return
+        if self._sortColumn is not None:
+            # rows may have moved
+            self._applySort()
+        elif self._fetched:
+            self.dataChanged.emit(self.index(0, 0),
+                                  self.index(self._fetched - 1, len(self.headerLabels) - 1))
+
+    def dropRows(self, rows):
+        """ Stop showing storage `rows`, e.g. when the items they show have
+            gone. They keep their storage, so that the other rows keep their
+            storage row numbers.
+        """
+        rows = set(rows)
+        if not rows:
+            return
+        self._sorted = array('l', [row for row in self._sorted if row not in rows])
+        self._removeRows(rows)
+        if self._fetched < self.batchSize:
+            self.fetchMore()
+
+    def clear(self):
+        """ Remove all rows from the table. """
+        self.beginResetModel()
+        self._columns = [self._makeColumn(t) for t in self.columnTypes]
+        self._sorted = array('l')
+        self._order = array('l')
+        self._filter = None
+        self._fetched = 0
+        self.endResetModel()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """ Sort table by `column` index. """
+        self._sortColumn = column
+        self._sortOrder = order
+        self._applySort()
+
+    def _applySort(self):
+        values = self._columns[self._sortColumn]
+        reverse = self._sortOrder == Qt.DescendingOrder
+        self._sorted = array('l', sorted(self._sorted, key=values.__getitem__,
+                                         reverse=reverse))
+        if self._filter is None:
+            order = self._sorted
+        else:
+            order = array('l', [row for row in self._sorted if row in self._filter])
+        self._changeLayout(order)
+
+    @staticmethod
+    def _runs(positions):
+        """ Return list of (first, last) of the runs of consecutive numbers
+            in sorted list of `positions`.
+        """
+        runs = []
+        for n in positions:
+            if runs and runs[-1][1] == n - 1:
+                runs[-1][1] = n
+            else:
+                runs.append([n, n])
+        return runs
+
+    def _insertRows(self, order, start):
+        """ Set new display `order`, which is the current order with new
+            storage rows from `start` onwards inserted.
+
+            The view is told about the rows inserted among those it has
+            fetched, so selections stay on the same rows.
+        """
+        # new rows which could be shown are in the first `_fetched` rows,
+        # plus one for each new row before them
+        window = order[:self._fetched + self.storageRowCount - start]
+        positions = [n for n, row in enumerate(window) if row >= start]
+        for first, last in self._runs(positions):
+            if first >= self._fetched:
+                break
+            self.beginInsertRows(QModelIndex(), first, last)
+            self._order[first:first] = order[first:last+1]
+            self._fetched += last - first + 1
+            self.endInsertRows()
+        # the rows which have been fetched are now the same as in `order`
+        self._order = array('l', order)
+
+    def _removeRows(self, rows):
+        """ Remove set of storage `rows` from the display order.
+
+            The view is told about the rows removed from those it has fetched,
+            so selections stay on the same rows.
+        """
+        positions = [n for n, row in enumerate(self._order[:self._fetched])
+                     if row in rows]
+        # remove from the end, so the earlier positions don't change
+        for first, last in reversed(self._runs(positions)):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._order[first:last+1]
+            self._fetched -= last - first + 1
+            self.endRemoveRows()
+        self._order = array('l', [row for row in self._order if row not in rows])
+
+    def _changeLayout(self, order):
+        """ Set new display `order`, keeping selections and other persistent
+            indexes pointing at the same storage rows.
+
+            If `order` has as many rows as the current order, the view is
+            told that the layout has changed; otherwise the model is reset.
+        """
+        if len(order) != len(self._order):
+            self.beginResetModel()
+            self._order = order if order is not self._sorted else array('l', order)
+            self._fetched = min(self.batchSize, len(order))
+            self.endResetModel()
+            return
+
+        # the number of rows doesn't change, so the same number are fetched
+        self.layoutAboutToBeChanged.emit()
+        fetched = self._fetched
+
+        oldIndexes = self.persistentIndexList()
+        storageRows = [self._order[index.row()] for index in oldIndexes]
+        position = {row:n for n, row in enumerate(order)}
+        newIndexes = []
+        for index, row in zip(oldIndexes, storageRows):
+            newRow = position.get(row, None)
+            if newRow is None or newRow >= fetched:
+                newIndexes.append(QModelIndex())
+            else:
+                newIndexes.append(self.index(newRow, index.column()))
+
+        self._order = order if order is not self._sorted else array('l', order)
+        self.changePersistentIndexList(oldIndexes, newIndexes)
+        self.layoutChanged.emit()
+
+    def setRowFilter(self, rows=None, ordered=False):
+        """ Only show the given storage `rows`. If `rows` is None, show all
+            rows.
+
+            If `ordered` is True, rows are shown in the order given, rather
+            than the current sort order.
+        """
+        self.beginResetModel()
+        if rows is None:
+            self._filter = None
+            self._order = array('l', self._sorted)
+        elif ordered:
+            self._filter = set(rows)
+            self._order = array('l', rows)
+        else:
+            self._filter = set(rows)
+            self._order = array('l', [row for row in self._sorted if row in self._filter])
+        self._fetched = min(self.batchSize, len(self._order))
+        self.endResetModel()
+
+
+class TableView(QTableView):
+    """ Table view with the Pythonic interface of `TableWidget`, backed by a
+        `ColumnTableModel`.
+
+        Parameters
+        ----------
+        headerLabels : list
+            List of column header labels.
+        columnTypes : list, optional
+            Type of each column; see `ColumnTableModel`.
+        showRowNumbers : bool
+            If True (default behaviour), row numbers will be shown.
+        clickHeaderLabelsToSort : bool
+            Sort table when header labels clicked.
+        readOnly : bool
+            If True, the whole table will be read-only. Default is False.
+        parent : QObject, optional
+            Parent object
+    """
+
+    def __init__(self, headerLabels, columnTypes=None, showRowNumbers=True,
+                 clickHeaderLabelsToSort=True, readOnly=False, parent=None):
+        super().__init__(parent)
+
+        self.headerLabels = list(headerLabels)
+        self.tableModel = ColumnTableModel(self.headerLabels, columnTypes,
+                                      readOnly=readOnly, parent=self)
+        self.setModel(self.tableModel)
+
+        self.verticalHeader().setVisible(showRowNumbers)
+
+        self.columnSort = dict(zip(self.headerLabels, [None]*len(self.headerLabels)))
+        self.setClickHeaderLabelsToSort(clickHeaderLabelsToSort)
+
+    @property
+    def rowCount(self):
+        """ Number of rows that pass the current filter. """
+        return self.tableModel.displayRowCount
+
+    @property
+    def columnCount(self):
+        return self.tableModel.columnCount()
+
+    @property
+    def header(self):
+        return super().horizontalHeader()
+
+    def getRow(self, idx):
+        """ Return list of values in display row `idx`. """
+        return self.tableModel.getRow(idx)
+
+    def getColumn(self, name):
+        """ Return list of values in column `name`, for all rows in the order
+            they were added.
+        """
+        return self.tableModel.getColumn(name)
+
+    def addRow(self, *args):
+        """ Add row to the table.
+
+            Supply either the values to be added, in order, or a dict, where
+            the keys correspond to header strings.
+        """
+        if len(args) == 1 and isinstance(args[0], dict):
+            args = args[0]
+        self.tableModel.addRows([args])
+
+    def addRows(self, rows):
+        """ Add many rows to the table at once.
+
+            `rows` should be an iterable of either sequences of values, in
+            order, or dicts, where the keys correspond to header strings.
+        """
+        self.tableModel.addRows(rows)
+
+    def updateRows(self, rows):
+        """ Replace the values in rows, from dict of row:values, where rows
+            are indices in the order rows were added.
+        """
+        self.tableModel.updateRows(rows)
+
+    def dropRows(self, rows):
+        """ Stop showing `rows`, which are indices in the order rows were
+            added. The other rows keep their indices.
+        """
+        self.tableModel.dropRows(rows)
+
+    def clear(self):
+        """ Remove all rows from the table. """
+        self.tableModel.clear()
+
+    def currentValue(self, column):
+        """ Return the value of the given column in the currently selected
+            row, or None if no row is selected.
+        """
+        row = self.currentRow
+        return None if row is None else row[column]
+
+    @property
+    def currentRow(self):
+        """ Return dict of column name:value pairs for the currently selected
+            row, or None if no row is selected.
+        """
+        row = self.currentIndex().row()
+        if row < 0:
+            return None
+        values = self.tableModel.getRow(row)
+        return dict(zip(self.headerLabels, values))
+
+    def setRowFilter(self, rows=None, ordered=False):
+        """ Only show the given `rows`, which are indices in the order rows
+            were added. If `rows` is None, show all rows.
+
+            If `ordered` is True, rows are shown in the order given, rather
+            than the current sort order.
+        """
+        self.tableModel.setRowFilter(rows, ordered)
+
+    def sort(self, column, order=None):
+        if isinstance(column, int):
+            column = self.headerLabels[column]
+        if order is None:
+            if self.columnSort[column] is None or self.columnSort[column]==Qt.DescendingOrder:
+                order = Qt.AscendingOrder
+            else:
+                order = Qt.DescendingOrder
+        idx = self.headerLabels.index(column)
+        self.tableModel.sort(idx, order)
+        self.header.setSortIndicator(idx, order)
+        self.columnSort[column] = order
+
+    def setClickHeaderLabelsToSort(self, value):
+        # don't want multiple connections, so always disconnect and only
+        # reconnect if required
+        try:
+            self.header.sectionClicked.disconnect(self.sort)
+        except TypeError:
+            pass
+        if value:
+            self.header.setSectionsClickable(True)
+            self.header.setSortIndicatorShown(True)
+            self.header.sectionClicked.connect(self.sort)
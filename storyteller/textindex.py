@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:05:22 2026
+
+@author: keziah
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import zlib
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from .storyformat import readStoryText
+
+# punctuation stripped from the ends of words, so "word," matches "word"
+_punctuation = "\"'`.,;:!?()[]{}<>*_-–—‘’“”…"
+# errors reading a story which is damaged or can't be opened
+_readErrors = (OSError, ValueError, KeyError, IndexError, zlib.error)
+
+
+def normaliseWord(word):
+    """ Return casefolded `word` with surrounding punctuation removed. """
+    return word.strip(_punctuation).casefold()
+
+
+def tokenise(text):
+    """ Return list of normalised words in `text`.
+
+        Words are split on whitespace, as in `countWordsInText`, so the
+        position of each token is the number of the word in the text.
+    """
+    words = re.split(r"\s+", text.strip())
+    return [normaliseWord(word) for word in words if word]
+
+
+def _readText(path):
+    """ Return (text, None) of the story at `path`, or (None, message) if
+        it can't be read. This is a module level function so that it can be
+        used in a process pool.
+    """
+    try:
+        return readStoryText(path), None
+    except _readErrors as err:
+        return None, str(err)
+
+
+def _tokenBytes(tokens):
+    """ Return array of word ids `tokens` as little-endian bytes. """
+    if sys.byteorder == 'big':
+        tokens = array('I', tokens)
+        tokens.byteswap()
+    return tokens.tobytes()
+
+
+class TextIndex:
+    """ Inverted index of the text of every story, for full text search.
+
+        For each word, the index stores which stories contain it and how
+        many times. The sequence of words in each story is also kept, so that
+        phrase queries can be checked without reading the stories.
+
+        The index is kept in a file in the stories directory and is only
+        loaded when it is first needed. The file is a log of the stories
+        added and removed, each a line of JSON and (for stories added) the
+        story's word ids, so saving only appends the changes since the last
+        save; the log is rewritten once most of it is out of date. It isn't
+        a pickle, so an index synced from elsewhere can't run code; an index
+        in any other format is ignored, and rebuilt by `refresh`.
+
+        The index can be used from more than one thread, e.g. updated by
+        the saver while it is searched from the GUI thread.
+
+        Parameters
+        ----------
+        path : str
+            Path to directory where stories are stored.
+    """
+
+    indexName = '.textindex'
+    magic = b"TEXTINDEX1\n"
+
+    k1 = 1.2
+    b = 0.75
+
+    # the log is rewritten when it has more than this many bytes which are
+    # out of date, and more than it has in use
+    minWaste = 1024*1024
+
+    def __init__(self, path):
+        self.path = path
+        self.indexPath = os.path.join(self.path, self.indexName)
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._vocabSorted = None
+
+    def _reset(self):
+        # token id 0 is the empty string, for words which are only punctuation
+        self.words = ['']
+        self.wordIds = {'':0}
+        # word id: (array of doc ids, array of counts)
+        self.postings = {}
+        # doc id: (filename, mtime, array of word ids)
+        self.docs = {}
+        self.docIds = {}
+        self.nextDoc = 0
+        self.totalLength = 0
+        self._vocabSorted = None
+        # log records which haven't been written, the number of words which
+        # have been logged, and the size of the valid part of the file
+        self._pending = []
+        self._loggedWords = 1
+        self._logSize = 0
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            self._reset()
+            try:
+                with open(self.indexPath, 'rb') as fileobj:
+                    self._readLog(fileobj)
+            except OSError:
+                self._reset()
+            self._loaded = True
+
+    def _readLog(self, fileobj):
+        """ Replay the records in the index file `fileobj`, up to the end or
+            the first one which is incomplete or damaged.
+        """
+        if fileobj.readline() != self.magic:
+            # e.g. an index from an older version
+            return
+        end = fileobj.tell()
+        while True:
+            line = fileobj.readline()
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+                words = record.get('words', [])
+                tokens = array('I')
+                if 'add' in record:
+                    data = fileobj.read(4 * record['length'])
+                    if len(data) != 4 * record['length'] or zlib.crc32(data) != record['crc']:
+                        break
+                    tokens.frombytes(data)
+                    if sys.byteorder == 'big':
+                        tokens.byteswap()
+                    if tokens and max(tokens) >= len(self.words) + len(words):
+                        break
+            except (ValueError, TypeError, KeyError, AttributeError):
+                break
+            for word in words:
+                self.wordIds[word] = len(self.words)
+                self.words.append(word)
+            if 'add' in record:
+                self._add(record['add'], record.get('mtime', None), tokens)
+            elif 'remove' in record:
+                self._remove(record['remove'])
+            end = fileobj.tell()
+        self._logSize = end
+        self._loggedWords = len(self.words)
+
+    def _log(self, record, tokens=None):
+        """ Add `record` (and the story's `tokens`) to those to write when
+            the index is next saved, with any words which are new since the
+            last record.
+        """
+        if self._loggedWords < len(self.words):
+            record['words'] = self.words[self._loggedWords:]
+            self._loggedWords = len(self.words)
+        data = b""
+        if tokens is not None:
+            data = _tokenBytes(tokens)
+            record['length'] = len(tokens)
+            record['crc'] = zlib.crc32(data)
+        self._pending.append(json.dumps(record).encode() + b"\n" + data)
+
+    def save(self):
+        """ Write the changes since the index was last saved to disk. """
+        with self._lock:
+            self._load()
+            inUse = 4 * self.totalLength + 100 * len(self.docs)
+            waste = self._logSize + sum(map(len, self._pending)) - inUse
+            if self._logSize == 0 or waste > max(inUse, self.minWaste):
+                self._rewrite()
+                return
+            if not self._pending:
+                return
+            with open(self.indexPath, 'r+b') as fileobj:
+                # anything after the valid records is from an interrupted save
+                fileobj.seek(self._logSize)
+                fileobj.write(b"".join(self._pending))
+                fileobj.truncate()
+                self._logSize = fileobj.tell()
+            self._pending = []
+
+    def _rewrite(self):
+        """ Write the whole index to a new log, replacing the old one. """
+        self._pending = []
+        self._loggedWords = 1
+        for docId in sorted(self.docs):
+            filename, mtime, tokens = self.docs[docId]
+            self._log({'add':filename, 'mtime':mtime}, tokens)
+        tmp = self.indexPath + '.tmp'
+        with open(tmp, 'wb') as fileobj:
+            fileobj.write(self.magic)
+            fileobj.write(b"".join(self._pending))
+            self._logSize = fileobj.tell()
+        os.replace(tmp, self.indexPath)
+        self._pending = []
+
+    def __len__(self):
+        self._load()
+        return len(self.docs)
+
+    def __contains__(self, filename):
+        self._load()
+        return filename in self.docIds
+
+    def mtime(self, filename):
+        """ Return modification time of `filename` when it was indexed. """
+        self._load()
+        docId = self.docIds.get(filename, None)
+        if docId is None:
+            return None
+        return self.docs[docId][1]
+
+    def _wordId(self, word):
+        wordId = self.wordIds.get(word, None)
+        if wordId is None:
+            wordId = len(self.words)
+            self.words.append(word)
+            self.wordIds[word] = wordId
+            self._vocabSorted = None
+        return wordId
+
+    def update(self, filename, text, mtime=None):
+        """ Add or replace story `filename`, with plain text `text`. """
+        with self._lock:
+            self._load()
+            tokens = array('I', [self._wordId(word) for word in tokenise(text)])
+            self._add(filename, mtime, tokens)
+            self._log({'add':filename, 'mtime':mtime}, tokens)
+
+    def _add(self, filename, mtime, tokens):
+        self._remove(filename)
+        docId = self.nextDoc
+        self.nextDoc += 1
+        for wordId, count in Counter(tokens).items():
+            if wordId == 0:
+                continue
+            docs, tfs = self.postings.setdefault(wordId, (array('I'), array('I')))
+            docs.append(docId)
+            tfs.append(count)
+
+        self.docs[docId] = (filename, mtime, tokens)
+        self.docIds[filename] = docId
+        self.totalLength += len(tokens)
+
+    def remove(self, filename):
+        """ Remove story `filename` from the index. """
+        with self._lock:
+            self._load()
+            if self._remove(filename):
+                self._log({'remove':filename})
+
+    def _remove(self, filename):
+        """ Remove story `filename`, and return True if it was indexed. """
+        docId = self.docIds.pop(filename, None)
+        if docId is None:
+            return False
+        _, _, tokens = self.docs.pop(docId)
+        self.totalLength -= len(tokens)
+        for wordId in set(tokens):
+            if wordId == 0:
+                continue
+            docs, tfs = self.postings[wordId]
+            # doc ids are added in increasing order, so postings are sorted
+            idx = bisect_left(docs, docId)
+            docs.pop(idx)
+            tfs.pop(idx)
+            if len(docs) == 0:
+                self.postings.pop(wordId)
+        return True
+
+    def refresh(self, records, jobs=1, storage=None):
+        """ Re-index any stories in `records` (list of `StoryRecord`s) that
+            have changed since they were indexed, remove those that no
+            longer exist, and save the index if anything changed.
+
+            Stories are read from `storage`, if given, or from files in
+            `path`. If `jobs` is more than 1, changed story files are read
+            in a pool of that many processes; they are always indexed in
+            this one.
+
+            Returns list of (filename, message) of the stories which could
+            not be read. They are left as they were in the index, and tried
+            again next time.
+        """
+        with self._lock:
+            self._load()
+            current = {record.filename for record in records}
+            stale = [record for record in records
+                     if self.mtime(record.filename) != record.mtime]
+            paths = [os.path.join(self.path, record.filename) for record in stale]
+            executor = None
+            if storage is not None and storage.directory is None:
+                texts = (self._storageText(storage, record.filename) for record in stale)
+            elif jobs > 1 and len(stale) > 1:
+                executor = ProcessPoolExecutor(max_workers=jobs)
+                texts = executor.map(_readText, paths, chunksize=16)
+            else:
+                texts = map(_readText, paths)
+            failed = []
+            changed = False
+            try:
+                for record, (text, message) in zip(stale, texts):
+                    if message is not None:
+                        failed.append((record.filename, message))
+                        continue
+                    self.update(record.filename, text, record.mtime)
+                    changed = True
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+            for filename in list(self.docIds.keys()):
+                if filename not in current:
+                    self.remove(filename)
+                    changed = True
+            if changed:
+                self.save()
+            return failed
+
+    @staticmethod
+    def _storageText(storage, filename):
+        try:
+            return storage.text(filename), None
+        except _readErrors as err:
+            return None, str(err)
+
+    @staticmethod
+    def parseQuery(query):
+        """ Split `query` into list of terms.
+
+            Each term is a tuple of (kind, words), where kind is 'word',
+            'prefix' or 'phrase'. Phrases are given in double quotes and
+            prefixes end with '*'.
+        """
+        terms = []
+        for phrase, word in re.findall(r'"([^"]*)"?|(\S+)', query):
+            if phrase:
+                words = [w for w in tokenise(phrase) if w]
+                if len(words) == 1:
+                    terms.append(('word', words))
+                elif words:
+                    terms.append(('phrase', words))
+            elif word.endswith('*'):
+                word = normaliseWord(word.rstrip('*'))
+                if word:
+                    terms.append(('prefix', [word]))
+            else:
+                word = normaliseWord(word)
+                if word:
+                    terms.append(('word', [word]))
+        return terms
+
+    def _prefixIds(self, prefix):
+        """ Return list of ids of words starting with `prefix`. """
+        if self._vocabSorted is None:
+            self._vocabSorted = sorted(self.words)
+        vocab = self._vocabSorted
+        ids = []
+        idx = bisect_left(vocab, prefix)
+        while idx < len(vocab) and vocab[idx].startswith(prefix):
+            wordId = self.wordIds[vocab[idx]]
+            if wordId in self.postings:
+                ids.append(wordId)
+            idx += 1
+        return ids
+
+    def _termCounts(self, wordIds):
+        """ Return dict of doc id: count for documents containing any of
+            `wordIds`.
+        """
+        counts = {}
+        for wordId in wordIds:
+            posting = self.postings.get(wordId, None)
+            if posting is None:
+                continue
+            for docId, count in zip(*posting):
+                counts[docId] = counts.get(docId, 0) + count
+        return counts
+
+    def _phraseCounts(self, words):
+        """ Return dict of doc id: number of occurrences of phrase `words`. """
+        wordIds = [self.wordIds.get(word, None) for word in words]
+        if None in wordIds:
+            return {}
+        # candidate documents contain all the words
+        candidates = None
+        for wordId in wordIds:
+            posting = self.postings.get(wordId, None)
+            if posting is None:
+                return {}
+            docs = set(posting[0])
+            candidates = docs if candidates is None else candidates & docs
+        # find the phrase by searching the bytes of the word sequences
+        needle = array('I', wordIds).tobytes()
+        size = array('I').itemsize
+        counts = {}
+        for docId in candidates:
+            haystack = self.docs[docId][2].tobytes()
+            count = 0
+            idx = haystack.find(needle)
+            while idx >= 0:
+                if idx % size == 0:
+                    count += 1
+                idx = haystack.find(needle, idx + 1)
+            if count:
+                counts[docId] = count
+        return counts
+
+    def search(self, query, limit=None):
+        """ Return list of (filename, score) tuples for stories matching
+            every term in `query`, best match first.
+
+            Search is not case sensitive. See `parseQuery` for query syntax.
+        """
+        with self._lock:
+            return self._search(query, limit)
+
+    def _search(self, query, limit):
+        self._load()
+        terms = self.parseQuery(query)
+        if not terms or not self.docs:
+            return []
+
+        numDocs = len(self.docs)
+        avgLength = max(1, self.totalLength / numDocs)
+
+        scores = None
+        for kind, words in terms:
+            if kind == 'phrase':
+                counts = self._phraseCounts(words)
+            elif kind == 'prefix':
+                counts = self._termCounts(self._prefixIds(words[0]))
+            else:
+                counts = self._termCounts([self.wordIds.get(words[0], None)])
+            if not counts:
+                return []
+            # BM25 score for this term
+            idf = math.log(1 + (numDocs - len(counts) + 0.5) / (len(counts) + 0.5))
+            termScores = {}
+            for docId, tf in counts.items():
+                if scores is not None and docId not in scores:
+                    continue
+                length = len(self.docs[docId][2])
+                norm = self.k1 * (1 - self.b + self.b * length / avgLength)
+                termScores[docId] = idf * tf * (self.k1 + 1) / (tf + norm)
+            if scores is None:
+                scores = termScores
+            else:
+                scores = {docId:scores[docId] + score
+                          for docId, score in termScores.items()}
+            if not scores:
+                return []
+
+        results = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if limit is not None:
+            results = results[:limit]
+        return [(self.docs[docId][0], score) for docId, score in results]
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:40:06 2026
+
+@author: keziah
+"""
+
+import os
+import sys
+import json
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+# sorts after any character that can appear in a title
+_maxChar = '\U0010ffff'
+
+
+class PackedStrings:
+    """ Read-only sequence of strings, stored as one string and an array of
+        offsets, which is much smaller and quicker to load than a list.
+    """
+
+    def __init__(self, text="", offsets=None):
+        self.text = text
+        self.offsets = array('q', [0]) if offsets is None else offsets
+
+    @classmethod
+    def fromList(cls, strings):
+        offsets = array('q', [0])
+        total = 0
+        for string in strings:
+            total += len(string)
+            offsets.append(total)
+        return cls("".join(strings), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, n):
+        if n < 0 or n >= len(self):
+            raise IndexError("PackedStrings index out of range")
+        return self.text[self.offsets[n]:self.offsets[n+1]]
+
+
+def makeTrigrams(key, pad=True):
+    """ Return set of trigrams in `key`.
+
+        If `pad` is True, `key` is padded with spaces first, so that the start
+        and end of the key have trigrams of their own.
+    """
+    if pad:
+        key = f"  {key} "
+    return {key[n:n+3] for n in range(len(key) - 2)}
+
+
+class TitleIndex:
+    """ Sorted index of the titles in the 'title_list' file.
+
+        The titles are sorted (ignoring case) so that prefix matches can be
+        found by binary search. A trigram index maps each three character
+        sequence to the titles that contain it, for substring and fuzzy
+        matching.
+
+        Both are kept in files in the stories directory and are rebuilt when
+        'title_list' changes. The trigram index is only loaded when it is
+        first needed. Each file is a line of JSON saying which strings and
+        arrays follow, rather than a pickle, so an index synced from
+        elsewhere can't run code; a file in any other format is rebuilt.
+
+        Parameters
+        ----------
+        path : str
+            Path to directory where stories are stored.
+    """
+
+    listName = 'title_list'
+    indexName = '.titleindex'
+    trigramName = '.titleindex.trigrams'
+    magic = b"TITLEINDEX1\n"
+
+    def __init__(self, path):
+        self.path = path
+        self.listPath = os.path.join(self.path, self.listName)
+        self.indexPath = os.path.join(self.path, self.indexName)
+        self.trigramPath = os.path.join(self.path, self.trigramName)
+        self._trigrams = None
+        self.load()
+
+    def _sourceStat(self):
+        # make file if it doesn't exist
+        if not os.path.exists(self.listPath):
+            with open(self.listPath, 'w') as fileobj:
+                fileobj.write("")
+        stat = os.stat(self.listPath)
+        return (stat.st_size, stat.st_mtime)
+
+    def _readIndex(self, path):
+        """ Return dict of the strings and arrays in index file at `path`, or
+            None if it can't be read or was made from a different version of
+            the title list.
+        """
+        try:
+            with open(path, 'rb') as fileobj:
+                if fileobj.readline() != self.magic:
+                    return None
+                header = json.loads(fileobj.readline())
+                if header['source'] != list(self._source):
+                    return None
+                data = {}
+                for name, typecode, size in header['sections']:
+                    raw = fileobj.read(size)
+                    if len(raw) != size:
+                        return None
+                    if typecode == 'str':
+                        data[name] = raw.decode('utf-8')
+                    else:
+                        values = array(typecode)
+                        values.frombytes(raw)
+                        # arrays are stored little endian
+                        if sys.byteorder == 'big':
+                            values.byteswap()
+                        data[name] = values
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return data
+
+    def _writeIndex(self, path, data):
+        """ Write dict of strings and arrays `data` to index file at `path`. """
+        header = {'source':list(self._source), 'sections':[]}
+        chunks = []
+        for name, values in data.items():
+            if isinstance(values, str):
+                typecode = 'str'
+                raw = values.encode('utf-8')
+            else:
+                typecode = values.typecode
+                if sys.byteorder == 'big':
+                    values = array(typecode, values)
+                    values.byteswap()
+                raw = values.tobytes()
+            header['sections'].append([name, typecode, len(raw)])
+            chunks.append(raw)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as fileobj:
+            fileobj.write(self.magic)
+            fileobj.write(json.dumps(header).encode() + b"\n")
+            for raw in chunks:
+                fileobj.write(raw)
+        os.replace(tmp, path)
+
+    def load(self):
+        """ Load the sorted titles, rebuilding the index if the title list
+            has changed.
+        """
+        self._source = self._sourceStat()
+        self._trigrams = None
+        data = self._readIndex(self.indexPath)
+        if data is None:
+            data = self._build()
+        self._setTitles(data)
+
+    def _setTitles(self, data):
+        self.titles = PackedStrings(data['titles'], data['titleOffsets'])
+        self.keys = PackedStrings(data['keys'], data['keyOffsets'])
+
+    def _build(self):
+        with open(self.listPath) as fileobj:
+            titles = [title for title in fileobj.read().split('\n') if title]
+        titles.sort(key=lambda title: (title.casefold(), title))
+        keys = [title.casefold() for title in titles]
+
+        packedTitles = PackedStrings.fromList(titles)
+        packedKeys = PackedStrings.fromList(keys)
+        data = {'titles':packedTitles.text, 'titleOffsets':packedTitles.offsets,
+                'keys':packedKeys.text, 'keyOffsets':packedKeys.offsets}
+
+        postings = {}
+        for n, key in enumerate(keys):
+            for trigram in makeTrigrams(key):
+                rows = postings.get(trigram, None)
+                if rows is None:
+                    rows = postings[trigram] = array('q')
+                rows.append(n)
+        # every trigram is three characters, so they are stored as one
+        # string, with the number of rows of each and all the rows in order
+        trigrams = sorted(postings)
+        counts = array('q', (len(postings[trigram]) for trigram in trigrams))
+        allRows = array('q')
+        for trigram in trigrams:
+            allRows.extend(postings[trigram])
+
+        self._writeIndex(self.indexPath, data)
+        self._writeIndex(self.trigramPath, {'trigrams':"".join(trigrams),
+                                            'counts':counts, 'rows':allRows})
+        self._trigrams = {'postings':postings}
+        return data
+
+    @property
+    def trigrams(self):
+        """ Dict with 'postings': array of the rows of the titles containing
+            each trigram.
+        """
+        if self._trigrams is None:
+            data = self._readIndex(self.trigramPath)
+            if data is None or len(data['trigrams']) != 3 * len(data['counts']):
+                # rebuild both, so that the rows match
+                self._source = self._sourceStat()
+                self._setTitles(self._build())
+            else:
+                self._trigrams = {'postings':self._unpackPostings(data)}
+        return self._trigrams
+
+    @staticmethod
+    def _unpackPostings(data):
+        trigrams = data['trigrams']
+        rows = data['rows']
+        postings = {}
+        start = 0
+        for n, count in enumerate(data['counts']):
+            postings[trigrams[3*n:3*n+3]] = rows[start:start+count]
+            start += count
+        return postings
+
+    def __len__(self):
+        return len(self.titles)
+
+    def __getitem__(self, n):
+        return self.titles[n]
+
+    def prefix(self, text, caseSensitive=False):
+        """ Return iterable of rows of titles which start with `text`, in
+            order.
+        """
+        key = text.casefold()
+        lo = bisect_left(self.keys, key)
+        hi = bisect_left(self.keys, key + _maxChar, lo)
+        if caseSensitive:
+            return (n for n in range(lo, hi) if self.titles[n].startswith(text))
+        return range(lo, hi)
+
+    def substring(self, text, caseSensitive=False):
+        """ Return iterator over rows of titles which contain `text`, in
+            order.
+
+            `text` must be at least three characters long; shorter strings
+            only match titles which start with them.
+        """
+        key = text.casefold()
+        if len(key) < 3:
+            return iter(self.prefix(text, caseSensitive))
+        postings = self.trigrams['postings']
+        candidates = None
+        for trigram in makeTrigrams(key, pad=False):
+            rows = postings.get(trigram, None)
+            if rows is None:
+                return iter(())
+            if candidates is None or len(rows) < len(candidates):
+                candidates = rows
+        # every title containing `text` contains its rarest trigram, so only
+        # those titles need to be checked (and they are already in order)
+        if caseSensitive:
+            return (n for n in candidates if text in self.titles[n])
+        return (n for n in candidates if key in self.keys[n])
+
+    def fuzzy(self, text, limit=50, threshold=0.3, maxCandidates=20000):
+        """ Return up to `limit` rows of titles similar to `text`, best first.
+
+            Similarity is the Jaccard index of the sets of trigrams in the
+            text and title, and must be at least `threshold`.
+
+            Candidates are found from the rarest trigrams in `text`, until
+            there are about `maxCandidates` of them, so that common trigrams
+            don't make this slow.
+        """
+        queryTrigrams = makeTrigrams(text.casefold())
+        postings = self.trigrams['postings']
+        lists = sorted((postings[trigram] for trigram in queryTrigrams
+                        if trigram in postings), key=len)
+        shared = Counter()
+        total = 0
+        for rows in lists:
+            if total > 0 and total + len(rows) > maxCandidates:
+                break
+            shared.update(rows)
+            total += len(rows)
+
+        scores = []
+        for n, _ in shared.most_common(limit * 5):
+            trigrams = makeTrigrams(self.keys[n])
+            count = len(trigrams & queryTrigrams)
+            score = count / (len(trigrams) + len(queryTrigrams) - count)
+            if score >= threshold:
+                scores.append((score, n))
+        return [n for _, n in heapq.nlargest(limit, scores)]
+
+    def search(self, text, caseSensitive=False, fuzzyCount=20):
+        """ Return iterator over rows of titles matching `text`.
+
+            Titles starting with `text` come first, then other titles
+            containing it. If there are fewer than `fuzzyCount` of these,
+            titles similar to `text` follow, to allow for typos.
+
+            Matches are found as the iterator is consumed, so the first ones
+            are available straight away, however many titles there are.
+        """
+        key = text.casefold()
+        found = set()
+        for n in self.prefix(text, caseSensitive):
+            found.add(n)
+            yield n
+        if len(key) < 3:
+            return
+        for n in self.substring(text, caseSensitive):
+            if n not in found:
+                found.add(n)
+                yield n
+        if len(found) < fuzzyCount:
+            for n in self.fuzzy(text):
+                if n not in found:
+                    yield n
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:05:51 2026
+
+@author: keziah
+"""
+
+from array import array
+from itertools import islice
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+
+class TitleListModel(QAbstractListModel):
+    """ List model showing the titles in a `TitleIndex`, or only those that
+        match a search.
+
+        Matches are taken from the search iterator in batches of `batchSize`,
+        as the view asks for them with `fetchMore`, so only as many are found
+        as are needed to fill the view.
+
+        Parameters
+        ----------
+        titles : TitleIndex
+            Sequence of titles to show.
+        parent : QObject, optional
+            Parent object
+    """
+
+    batchSize = 500
+
+    def __init__(self, titles, parent=None):
+        super().__init__(parent)
+        self.titles = titles
+        # rows of titles matching the current search, or None to show all
+        self._rows = None
+        self._matches = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self._rows is None:
+            return len(self.titles)
+        return len(self._rows)
+
+    def titleRow(self, row):
+        """ Return row in `titles` of the title at `row` in the model. """
+        return row if self._rows is None else self._rows[row]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self.titles[self.titleRow(index.row())]
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._matches is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._matches is None:
+            return
+        rows = array('l', islice(self._matches, self.batchSize))
+        if len(rows) < self.batchSize:
+            # search is finished
+            self._matches = None
+        if not rows:
+            return
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self._rows += rows
+        self.endInsertRows()
+
+    def setMatches(self, matches=None):
+        """ Show only the titles whose rows are given by iterable `matches`.
+
+            If `matches` is None, all titles are shown.
+        """
+        self.beginResetModel()
+        if matches is None:
+            self._rows = None
+            self._matches = None
+        else:
+            self._rows = array('l')
+            self._matches = iter(matches)
+        self.endResetModel()
+        self.fetchMore()
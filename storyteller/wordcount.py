@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:20:47 2026
+
+@author: keziah
+"""
+
+import os
+import re
+import mmap
+from html.entities import html5
+from .storyparser import blockTags
+
+# only text after the <html> tag is in the editor; an <h1> before it is the
+# title (see `StoryHtmlParser`)
+_htmlPattern = re.compile(rb"<html\b", re.IGNORECASE)
+_commentPattern = re.compile(rb"<!--.*?-->", re.DOTALL)
+_skipPattern = re.compile(rb"<(head|style|script|title)\b.*?</\1\s*>",
+                          re.DOTALL | re.IGNORECASE)
+# elements which separate words: paragraphs, and line breaks within them
+_breakTags = b"|".join(sorted(tag.encode() for tag in blockTags | {'br'}))
+_breakPattern = re.compile(rb"</?(?:" + _breakTags + rb")\b[^>]*>", re.IGNORECASE)
+_tagPattern = re.compile(rb"<[^>]*>")
+# entities for whitespace characters; any other entity is part of a word
+_spaceEntities = sorted((re.escape(name.encode()) for name, char in html5.items()
+                         if char.isspace()), key=len, reverse=True)
+_spaceEntityPattern = re.compile(rb"&(?:" + b"|".join(_spaceEntities) + rb")")
+_numericEntityPattern = re.compile(rb"&#(?:[xX]([0-9a-fA-F]+)|([0-9]+));?")
+# UTF-8 encoded whitespace characters beyond ASCII, i.e. the rest of those
+# which str.isspace is True for
+_unicodeSpaces = ("\x85\xa0\u1680" + "".join(map(chr, range(0x2000, 0x200b)))
+                  + "\u2028\u2029\u202f\u205f\u3000")
+_unicodeSpacePattern = re.compile(b"|".join(re.escape(char.encode())
+                                            for char in _unicodeSpaces))
+# maps ASCII whitespace to b" " and every other byte to b"x", so that words
+# can be counted as the ends of runs of b"x"
+_wordTable = bytes(0x20 if chr(n).isspace() else 0x78 for n in range(128)) + b"x" * 128
+
+
+def countWordsInText(text):
+    """ Return number of whitespace-separated words in `text`. """
+    # str.split splits on the same (unicode) whitespace as the regex \s
+    return len(text.split())
+
+
+def countWordsInBytes(data):
+    """ Return number of whitespace-separated words in UTF-8 encoded `data`,
+        the same as `countWordsInText` would for the decoded text, but
+        without splitting it into words.
+    """
+    if not data.isascii():
+        data = _unicodeSpacePattern.sub(b" ", data)
+    data = data.translate(_wordTable)
+    return data.count(b"x ") + data.endswith(b"x")
+
+
+def _numericEntity(match):
+    hexCode, code = match.groups()
+    try:
+        char = chr(int(hexCode, 16) if hexCode is not None else int(code))
+    except (ValueError, OverflowError):
+        return b"x"
+    return b" " if char.isspace() else b"x"
+
+
+def countWordsInHtml(data):
+    """ Return number of words in the text of story html, as shown in the
+        editor.
+
+        `data` can be bytes, or any buffer such as an mmap. Markup is
+        removed with a few passes of compiled patterns, rather than being
+        parsed: comments and the content of <head>, <style>, <script> and
+        <title>, then tags (block elements and line breaks separate words;
+        inline elements don't) and entities. The words in the remaining
+        text are counted with `countWordsInBytes`.
+    """
+    start = _htmlPattern.search(data)
+    if start is None:
+        return 0
+    view = memoryview(data)[start.start():]
+    try:
+        text = _commentPattern.sub(b"", view)
+    finally:
+        view.release()
+    text = _skipPattern.sub(b"", text)
+    text = _breakPattern.sub(b" ", text)
+    text = _tagPattern.sub(b"", text)
+    if b"&" in text:
+        text = _spaceEntityPattern.sub(b" ", text)
+        text = _numericEntityPattern.sub(_numericEntity, text)
+    return countWordsInBytes(text)
+
+
+def countWordsInFile(path):
+    """ Return number of words in story html file at `path`, mapping it
+        into memory rather than reading it.
+    """
+    with open(path, 'rb') as fileobj:
+        if os.fstat(fileobj.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return countWordsInHtml(data)
+
+
+def countWordsInFiles(paths, jobs=1):
+    """ Return list of the number of words in each of the story html files
+        in `paths`, counted in a pool of `jobs` processes if more than 1.
+    """
+    if jobs > 1 and len(paths) > 1:
+        # imported here, as the editor imports this module at startup
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunkSize = max(1, len(paths) // (4 * jobs))
+            return list(executor.map(countWordsInFile, paths, chunksize=chunkSize))
+    return [countWordsInFile(path) for path in paths]
+
+
+class BlockWordCounter:
+    """ Running word count of a document, cached per text block.
+
+        When part of the document changes, only the blocks touched by the
+        change need to be recounted with `update`; the total for the whole
+        document is available as `total`.
+    """
+
+    def __init__(self):
+        self.counts = []
+        self.total = 0
+
+    def reset(self, texts):
+        """ Count the words in every block, from list of block `texts`. """
+        self.counts = [countWordsInText(text) for text in texts]
+        self.total = sum(self.counts)
+
+    def update(self, first, texts, blockCount):
+        """ Recount the blocks affected by an edit.
+
+            Parameters
+            ----------
+            first : int
+                Number of the first block touched by the edit.
+            texts : list
+                Text of the blocks touched by the edit, as they are now,
+                starting with block `first`.
+            blockCount : int
+                Number of blocks in the document after the edit.
+
+            Returns
+            -------
+            True if the cache was updated, False if the edit could not be
+            reconciled with the cache, in which case `reset` should be called.
+        """
+        # the blocks after the edited region are the same as before, but
+        # shifted by the change in the number of blocks
+        delta = blockCount - len(self.counts)
+        lastOld = first + len(texts) - 1 - delta
+        if first < 0 or lastOld < first or lastOld >= len(self.counts):
+            return False
+        counts = [countWordsInText(text) for text in texts]
+        self.total += sum(counts) - sum(self.counts[first:lastOld+1])
+        self.counts[first:lastOld+1] = counts
+        return True
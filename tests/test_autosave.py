@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 11:20:05 2026
+
+@author: keziah
+"""
+
+import os
+import pytest
+
+QtGui = pytest.importorskip('PyQt5.QtGui')
+QtWidgets = pytest.importorskip('PyQt5.QtWidgets')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from storyteller.autosave import AutosaveJournal
+from storyteller.loader import documentParagraphs
+
+
+@pytest.fixture(scope='module')
+def app():
+    # a QApplication, so that tests of widgets can share it
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def _document():
+    document = QtGui.QTextDocument()
+    # changes are only signalled once the document has a layout
+    document.documentLayout()
+    return document
+
+
+def _append(document, text):
+    cursor = QtGui.QTextCursor(document)
+    cursor.movePosition(QtGui.QTextCursor.End)
+    cursor.insertText(text)
+
+
+def test_recoverSnapshot(app, tmp_path):
+    journal = AutosaveJournal(str(tmp_path))
+    document = _document()
+    journal.setDocument(document)
+    document.setPlainText("Once upon\na time")
+    journal.flush()
+    _append(document, " there was")
+    journal.close()
+
+    recovered = _document()
+    journal = AutosaveJournal(str(tmp_path))
+    assert not journal.isSavedSnapshot()
+    journal.recover(recovered)
+    assert recovered.toPlainText() == "Once upon\na time there was"
+    journal.close()
+
+
+def test_recoverFromSaved(app, tmp_path):
+    journal = AutosaveJournal(str(tmp_path))
+    document = _document()
+    journal.setDocument(document)
+    document.setPlainText("Once upon\na time")
+    journal.flush()
+    saved = documentParagraphs(document)
+
+    journal.reset(saved=True)
+    generation = journal._generation
+    # nothing to recover until the document is edited
+    journal.flush()
+    assert journal._generation == generation
+    _append(document, " there was")
+    journal.setTitle("Title")
+    journal.close()
+
+    recovered = _document()
+    journal = AutosaveJournal(str(tmp_path))
+    assert journal.isSavedSnapshot()
+    assert journal.recover(recovered, saved) == "Title"
+    assert recovered.toPlainText() == "Once upon\na time there was"
+    journal.close()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 11:02:37 2026
+
+@author: keziah
+"""
+
+import os
+import pytest
+from storyteller.chapters import (chapterTable, chapterTitle, isHeading, readChapter,
+                                  readChapterTable, splitChapters, writeChapters)
+from storyteller.storyformat import readHeaderSlots
+
+
+@pytest.mark.parametrize('text', [
+    "Chapter 1",
+    "Chapter 12: The Storm",
+    "CHAPTER IV",
+    "chapter xiv.",
+    "Part One",
+    "Part Two — Home",
+    "Chapter Twenty-One",
+    "Book III",
+    "  Chapter 3  ",
+    "Prologue",
+    "Epilogue: Ten Years Later",
+    "Interlude.",
+    "# Heading",
+    "### A scene",
+])
+def test_headings(text):
+    assert isHeading(text)
+
+
+@pytest.mark.parametrize('text', [
+    "Part of me wanted to leave.",
+    "Part I wanted to leave, part I didn't.",
+    "Chapter and verse, she said.",
+    "Book me a table for two.",
+    "Books lined the walls.",
+    "Partly cloudy.",
+    "Prologues are overrated.",
+    "Epilogue aside, it was a good book.",
+    "Interlude music played while we waited.",
+    "Chapter 1 was the hardest to write.",
+    "Part mid",
+    "#hashtag",
+    "",
+    "Chapter " + "1" * 100,
+])
+def test_notHeadings(text):
+    assert not isHeading(text)
+
+
+def paragraphs(*texts):
+    return [[(text, {})] for text in texts]
+
+
+def test_splitChapters():
+    story = paragraphs("It begins.", "Part of me wanted to leave.", "Chapter 1",
+                       "Chapter and verse.", "Prologue to nothing.", "Chapter 2: Home",
+                       "The end.")
+    assert splitChapters(story) == [(0, 2), (2, 5), (5, 7)]
+    assert [chapterTitle(story, start, n)
+            for n, (start, _) in enumerate(splitChapters(story))] == \
+        ["Opening", "Chapter 1", "Chapter 2: Home"]
+
+
+def test_chapterTable():
+    story = paragraphs("# One", "a b c", "# Two", "d e")
+    table = chapterTable(story)
+    assert [chapter['title'] for chapter in table] == ["One", "Two"]
+    assert [chapter['words'] for chapter in table] == [5, 4]
+    assert [chapter['paragraphs'] for chapter in table] == [story[:2], story[2:]]
+
+
+def _chapters(n, version=0, words=3):
+    return [paragraphs(f"# Chapter {m}", " ".join([f"v{version}"] * words))
+            for m in range(n)]
+
+
+def _readStory(path):
+    header, table = readChapterTable(path)
+    return header, [readChapter(path, chapter['entries'], header) for chapter in table]
+
+
+def _saveChapter(path, n, story, compress=True):
+    """ Save the story at `path` with chapter `n` replaced by `story`, and
+        the other chapters kept from the file.
+    """
+    header, table = readChapterTable(path)
+    chapters = [{'entries':chapter['entries']} for chapter in table]
+    chapters[n] = {'paragraphs':story}
+    return writeChapters(path, header['title'], chapters, compress=compress)
+
+
+def _slots(path):
+    with open(path, 'rb') as fileobj:
+        _, _, slots = readHeaderSlots(fileobj)
+    return slots
+
+
+def test_incrementalSaves(tmp_path):
+    path = str(tmp_path / 'story.story')
+    story = _chapters(3)
+    writeChapters(path, "Story", [{'paragraphs':chapter} for chapter in story])
+    inode = os.stat(path).st_ino
+    for version in range(1, 6):
+        n = version % 3
+        story[n] = _chapters(3, version)[n]
+        _saveChapter(path, n, story[n])
+        # appended in place, not rewritten
+        assert os.stat(path).st_ino == inode
+        header, chapters = _readStory(path)
+        assert chapters == story
+        assert header['wordcount'] == 18
+        assert max(seq for _, _, seq in _slots(path)) == version + 1
+
+
+def test_interruptedHeaderWrite(tmp_path):
+    path = str(tmp_path / 'story.story')
+    story = _chapters(2)
+    writeChapters(path, "Story", [{'paragraphs':chapter} for chapter in story])
+    _saveChapter(path, 1, _chapters(2, 1)[1])
+    before = _readStory(path)
+    slots = _slots(path)
+    # the next header would be written over the older slot
+    offset, size, _ = min(slots, key=lambda slot: slot[2])
+
+    # blocks appended, then the new header half written
+    _saveChapter(path, 0, _chapters(2, 2)[0])
+    with open(path, 'r+b') as fileobj:
+        fileobj.seek(offset)
+        line = fileobj.read(size)
+        fileobj.seek(offset)
+        fileobj.write(line[:size//2] + b"\0" * (size - size//2 - 1) + b"\n")
+    assert _readStory(path) == before
+
+    # the slot's CRC is checked, not just its JSON
+    assert b'"title": "Story"' in line
+    with open(path, 'r+b') as fileobj:
+        fileobj.seek(offset)
+        fileobj.write(line.replace(b'"title": "Story"', b'"title": "Stody"'))
+    assert _readStory(path) == before
+
+
+def test_interruptedBlockWrite(tmp_path):
+    path = str(tmp_path / 'story.story')
+    story = _chapters(2)
+    writeChapters(path, "Story", [{'paragraphs':chapter} for chapter in story])
+    before = _readStory(path)
+    # a block was being appended when the save was interrupted
+    with open(path, 'ab') as fileobj:
+        fileobj.write(b"x\x9c\x01\x02")
+    assert _readStory(path) == before
+
+    # the next save appends after it
+    story[1] = _chapters(2, 1)[1]
+    _saveChapter(path, 1, story[1])
+    assert _readStory(path)[1] == story
+
+
+def test_corruptHeaders(tmp_path):
+    path = str(tmp_path / 'story.story')
+    writeChapters(path, "Story", [{'paragraphs':chapter} for chapter in _chapters(2)])
+    with open(path, 'r+b') as fileobj:
+        for offset, size, _ in _slots(path):
+            fileobj.seek(offset + 1)
+            fileobj.write(b"x")
+    with pytest.raises(ValueError):
+        readChapterTable(path)
+
+
+def test_rewriteUnusedBlocks(tmp_path):
+    path = str(tmp_path / 'story.story')
+    # uncompressed, so the blocks are large enough to reach the threshold
+    story = _chapters(2, words=5000)
+    writeChapters(path, "Story", [{'paragraphs':chapter} for chapter in story],
+                  compress=False)
+    used = os.path.getsize(path)
+    inode = os.stat(path).st_ino
+    rewritten = False
+    for version in range(1, 10):
+        story[1] = _chapters(2, version, words=5000)[1]
+        _saveChapter(path, 1, story[1], compress=False)
+        assert _readStory(path)[1] == story
+        if os.stat(path).st_ino != inode:
+            rewritten = True
+            break
+    assert rewritten
+    # the old blocks have gone
+    assert os.path.getsize(path) <= used + 1024
+    # and saves are appended again
+    inode = os.stat(path).st_ino
+    story[0] = _chapters(2, 20, words=5000)[0]
+    _saveChapter(path, 0, story[0], compress=False)
+    assert os.stat(path).st_ino == inode
+    assert _readStory(path)[1] == story
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:02:37 2026
+
+@author: keziah
+"""
+
+import os
+import random
+import pytest
+
+QtGui = pytest.importorskip('PyQt5.QtGui')
+QtWidgets = pytest.importorskip('PyQt5.QtWidgets')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from storyteller.editor import StoryEditor
+from storyteller.wordcount import countWordsInText
+
+_text = ("Once upon a time\n"
+         "there was a story\n"
+         "\n"
+         "about a café, naïve and “quoted”\n"
+         "The end.")
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def editor(app):
+    editor = StoryEditor()
+    editor.setPlainText(_text)
+    editor.firstBlocks = []
+    editor.blocksChanged.connect(lambda first, texts, count: editor.firstBlocks.append(first))
+    return editor
+
+
+def _cursor(editor, start, end=None):
+    cursor = QtGui.QTextCursor(editor.document())
+    cursor.setPosition(start)
+    if end is not None:
+        cursor.setPosition(end, QtGui.QTextCursor.KeepAnchor)
+    return cursor
+
+
+def _check(editor):
+    """ The running count matches a full count, and was updated incrementally. """
+    doc = editor.document()
+    blocks = [doc.findBlockByNumber(n).text() for n in range(doc.blockCount())]
+    assert editor.counter.counts == [countWordsInText(text) for text in blocks]
+    assert editor.count == countWordsInText(doc.toPlainText())
+    # a full count would hide a mistake in the blocks given to the counter
+    assert editor.firstBlocks and -1 not in editor.firstBlocks
+    editor.firstBlocks.clear()
+
+
+def test_pasteAcrossParagraphs(editor):
+    text = editor.document().toPlainText()
+    start = text.index("was")
+    end = text.index("naïve")
+    # replace the end of one paragraph to the middle of another with several
+    _cursor(editor, start, end).insertText("is\nanother one two\nthree and")
+    _check(editor)
+    assert editor.document().blockCount() == 5
+    # pasted at the start and end of the document
+    _cursor(editor, 0).insertText("New first\nparagraph ")
+    _check(editor)
+    cursor = _cursor(editor, 0)
+    cursor.movePosition(QtGui.QTextCursor.End)
+    cursor.insertText(" more\nand a last one\n")
+    _check(editor)
+    assert editor.document().blockCount() == 8
+
+
+def test_deleteSeparator(editor):
+    text = editor.document().toPlainText()
+    # join the first two paragraphs
+    cursor = _cursor(editor, text.index("\n"))
+    cursor.deleteChar()
+    _check(editor)
+    assert editor.document().blockCount() == 4
+    # backspace at the start of a paragraph, joining an empty one
+    cursor = _cursor(editor, editor.document().toPlainText().index("about"))
+    cursor.deletePreviousChar()
+    _check(editor)
+    # select across a separator and delete
+    text = editor.document().toPlainText()
+    _cursor(editor, text.index("quoted"), text.index("end")).removeSelectedText()
+    _check(editor)
+    assert editor.document().blockCount() == 2
+
+
+def test_undo(editor):
+    doc = editor.document()
+    text = doc.toPlainText()
+    _cursor(editor, text.index("there"), text.index("The")).insertText("one\ntwo three")
+    _check(editor)
+    doc.undo()
+    _check(editor)
+    assert doc.toPlainText() == text
+    doc.redo()
+    _check(editor)
+    _cursor(editor, doc.toPlainText().index("\n")).deleteChar()
+    _check(editor)
+    doc.undo()
+    _check(editor)
+    doc.undo()
+    _check(editor)
+    assert doc.toPlainText() == text
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_randomEdits(editor, seed):
+    """ Random pastes and deletions, and undoing them, through the editor. """
+    rng = random.Random(seed)
+    words = ["once", "upon", "a", "time", "don't", "café", "—", "\n", "\n", " "]
+    doc = editor.document()
+    for _ in range(100):
+        length = doc.characterCount() - 1
+        start = rng.randint(0, length)
+        end = min(length, start + rng.randint(0, 20))
+        action = rng.random()
+        if action < 0.2 and doc.isUndoAvailable():
+            doc.undo()
+        else:
+            pasted = " ".join(rng.choice(words) for _ in range(rng.randint(0, 6)))
+            cursor = _cursor(editor, start, end)
+            if pasted or cursor.hasSelection():
+                cursor.insertText(pasted)
+            else:
+                continue
+        _check(editor)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 16:40:27 2026
+
+@author: keziah
+"""
+
+import os
+import zipfile
+import pytest
+from storyteller import export
+from storyteller.export import LibraryExport, formatStory, libraryStories
+from storyteller.storyformat import writeStory
+
+_names = ['2026-10-01 One.story', '2026-10-02 Two.story', '2026-10-03 Three.story']
+
+
+def _write(path, filename, text):
+    writeStory(os.path.join(path, filename), filename[11:-6],
+               [[(text, {'bold':True})], [("The end.", {})]])
+
+
+@pytest.fixture
+def library(tmp_path):
+    path = tmp_path / 'stories'
+    path.mkdir()
+    for name in _names:
+        _write(str(path), name, f"Story {name[11:-6]}")
+    return str(path)
+
+
+@pytest.fixture
+def converted(monkeypatch):
+    """ List of the stories converted by each export. """
+    paths = []
+    convert = export._convertStory
+
+    def counted(path, fmt):
+        paths.append(os.path.basename(path))
+        return convert(path, fmt)
+
+    monkeypatch.setattr(export, '_convertStory', counted)
+    return paths
+
+
+def _change(path, filename, text):
+    mtime = os.stat(os.path.join(path, filename)).st_mtime
+    _write(path, filename, text)
+    # in case the file system's times are coarse
+    os.utime(os.path.join(path, filename), (mtime + 10, mtime + 10))
+
+
+def _exported(name, fmt='md'):
+    return os.path.splitext(name)[0] + '.' + fmt
+
+
+def test_directoryExport(library, tmp_path, converted):
+    dest = str(tmp_path / 'export')
+    exporter = LibraryExport(library, dest, fmt='md')
+    assert exporter.run() == 3
+    assert sorted(converted) == sorted(_names)
+    assert sorted(os.listdir(dest)) == sorted([_exported(name) for name in _names]
+                                              + [LibraryExport.manifestName])
+    with open(os.path.join(dest, _exported(_names[0]))) as fileobj:
+        assert fileobj.read() == "# One\n\n**Story One**\n\nThe end.\n"
+    inodes = {name:os.stat(os.path.join(dest, _exported(name))).st_ino for name in _names}
+
+    # nothing has changed
+    converted.clear()
+    assert LibraryExport(library, dest, fmt='md').run() == 0
+    assert converted == []
+
+    # only the changed story is converted and written again
+    _change(library, _names[1], "Rewritten")
+    os.remove(os.path.join(library, _names[2]))
+    assert LibraryExport(library, dest, fmt='md').run() == 1
+    assert converted == [_names[1]]
+    assert os.stat(os.path.join(dest, _exported(_names[0]))).st_ino == inodes[_names[0]]
+    assert os.stat(os.path.join(dest, _exported(_names[1]))).st_ino != inodes[_names[1]]
+    with open(os.path.join(dest, _exported(_names[1]))) as fileobj:
+        assert "**Rewritten**" in fileobj.read()
+    # and the removed story's export is removed
+    assert not os.path.exists(os.path.join(dest, _exported(_names[2])))
+
+    # a different format is exported again
+    converted.clear()
+    assert LibraryExport(library, dest, fmt='txt').run() == 2
+
+
+def test_archiveExport(library, tmp_path, converted):
+    dest = str(tmp_path / 'export.zip')
+    assert LibraryExport(library, dest, fmt='txt', archive=True).run() == 3
+
+    converted.clear()
+    _change(library, _names[0], "Rewritten")
+    os.remove(os.path.join(library, _names[2]))
+    assert LibraryExport(library, dest, fmt='txt', archive=True).run() == 1
+    assert converted == [_names[0]]
+    with zipfile.ZipFile(dest) as zf:
+        assert sorted(zf.namelist()) == sorted([_exported(name, 'txt') for name in _names[:2]]
+                                               + [LibraryExport.archiveManifestName])
+        assert zf.read(_exported(_names[0], 'txt')).decode() == "One\n\nRewritten\nThe end.\n"
+        assert zf.read(_exported(_names[1], 'txt')).decode() == "Two\n\nStory Two\nThe end.\n"
+    assert not os.path.exists(dest + '.tmp')
+
+
+def test_unreadableStory(library, tmp_path):
+    with open(os.path.join(library, '2026-10-04 Bad.story'), 'wb') as fileobj:
+        fileobj.write(b"STORY1\n{")
+    dest = str(tmp_path / 'export')
+    exporter = LibraryExport(library, dest)
+    assert exporter.run() == 3
+    assert list(exporter.errors) == ['2026-10-04 Bad.story']
+    # it is tried again next time
+    exporter = LibraryExport(library, dest)
+    assert exporter.run() == 0
+    assert list(exporter.errors) == ['2026-10-04 Bad.story']
+
+
+def test_nativeCopyPreferred(library):
+    with open(os.path.join(library, '2026-10-01 One.html'), 'w') as fileobj:
+        fileobj.write("<h1>One</h1><html><body><p>Old</p></body></html>")
+    with open(os.path.join(library, '2026-10-05 Five.html'), 'w') as fileobj:
+        fileobj.write("<h1>Five</h1><html><body><p>Html only</p></body></html>")
+    assert sorted(libraryStories(library)) == sorted(_names + ['2026-10-05 Five.html'])
+
+
+def test_formatStory():
+    paragraphs = [[("A ", {}), ("bold", {'bold':True}), (" *move*", {})], [],
+                  [("under", {'underline':True, 'italic':True})]]
+    assert formatStory("T_1", paragraphs, 'md') == \
+        "# T\\_1\n\nA **bold** \\*move\\*\n\n*<u>under</u>*\n"
+    assert formatStory("T_1", paragraphs, 'txt') == "T_1\n\nA bold *move*\n\nunder\n"
+    with pytest.raises(ValueError):
+        formatStory("T", paragraphs, 'pdf')
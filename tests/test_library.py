@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 09:41:18 2026
+
+@author: keziah
+"""
+
+import os
+import time
+import pytest
+from storyteller.storage import FileStorage
+
+_filename = '2026-10-26 In place.story'
+
+
+def _paragraphs(words):
+    return [[(" ".join(["word"] * words), {})]]
+
+
+def _appendChapter(storage, words):
+    """ Save a new chapter of `words` words at the end of the story, which
+        appends it to the file in place.
+    """
+    header, table = storage.readChapterTable(_filename)
+    chapters = [{'entries':chapter['entries']} for chapter in table]
+    chapters.append({'paragraphs':[[("Chapter 2", {})]] + _paragraphs(words)})
+    path = os.path.join(storage.path, _filename)
+    inode = os.stat(path).st_ino
+    storage.writeChapters(_filename, header['title'], chapters)
+    assert os.stat(path).st_ino == inode
+
+
+def test_inPlaceWriteIsChanged(tmp_path):
+    storage = FileStorage(str(tmp_path))
+    storage.save(_filename, "In place", _paragraphs(10))
+    records = {record.filename:record for record in storage.records()}
+
+    _appendChapter(storage, 5)
+    changed, removed = storage.changes(records)
+    assert removed == []
+    assert [(record.filename, record.wordcount) for record in changed] == [(_filename, 17)]
+
+
+def _waitFor(app, condition, timeout=5):
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "timed out"
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def _settle(app, library, quiet=0.2):
+    end = time.monotonic() + quiet
+    while time.monotonic() < end:
+        app.processEvents()
+        if library._updating or library.timer.isActive():
+            end = time.monotonic() + quiet
+        time.sleep(0.01)
+
+
+def test_libraryNoticesInPlaceWrite(tmp_path):
+    QtCore = pytest.importorskip('PyQt5.QtCore')
+    from storyteller.library import StoryLibrary
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+    storage = FileStorage(str(tmp_path))
+    storage.save(_filename, "In place", _paragraphs(10))
+    library = StoryLibrary(storage, delay=10)
+    changed = []
+    library.storiesChanged.connect(changed.extend)
+    library.start()
+    _waitFor(app, lambda: library.isReady)
+    assert library.records[_filename].wordcount == 10
+    # let the updates from the index being written in the directory finish
+    _settle(app, library)
+
+    # the directory's own watch isn't told about this
+    _appendChapter(storage, 5)
+    _waitFor(app, lambda: changed)
+    assert library.records[_filename].wordcount == 17
+    library.stop()
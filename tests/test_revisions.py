@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 09:52:44 2026
+
+@author: keziah
+"""
+
+import os
+import random
+import pytest
+from storyteller.revisions import RevisionStore, paragraphBytes, paragraphChunks
+
+day = 86400
+
+
+def _paragraphs(n, seed=0):
+    rng = random.Random(seed)
+    words = ["once", "upon", "a", "time", "there", "was", "a", "story"]
+    return [[(" ".join(rng.choice(words) for _ in range(8)), {}),
+             (f" {m}", {'bold':True} if m % 3 == 0 else {})]
+            for m in range(n)]
+
+
+def _count(store):
+    return len(store._index)
+
+
+def test_roundTrip(tmp_path):
+    store = RevisionStore(str(tmp_path))
+    paragraphs = _paragraphs(50) + [[]] + _paragraphs(3)
+    revision = store.commit("Story", paragraphs, goal=100, t=1000)
+    assert revision['words'] == 9 * 53
+    assert revision['goal'] == 100
+
+    # read back by a new store
+    store = RevisionStore(str(tmp_path))
+    assert store.stories() == ["Story"]
+    assert store.revisions("Story") == [revision]
+    assert store.paragraphs(revision) == paragraphs
+
+
+def test_deduplication(tmp_path):
+    store = RevisionStore(str(tmp_path))
+    paragraphs = _paragraphs(500)
+    first = store.commit("Story", paragraphs)
+    chunks = _count(store)
+    size = os.path.getsize(store.packPath)
+
+    # the same paragraphs again are the same revision
+    assert store.commit("Story", paragraphs) == first
+    assert len(store.revisions("Story")) == 1
+
+    # one paragraph changed adds it, its group and a root
+    paragraphs[250] = [("Changed.", {})]
+    second = store.commit("Story", paragraphs)
+    assert second['id'] == first['id'] + 1
+    assert _count(store) == chunks + 3
+    assert os.path.getsize(store.packPath) - size < 2048
+
+    # inserting a paragraph only changes the groups around it
+    paragraphs.insert(10, [("New.", {})])
+    store.commit("Story", paragraphs)
+    assert _count(store) <= chunks + 3 + 4
+
+    # another story with the same paragraphs shares them
+    chunks = _count(store)
+    store.commit("Copy", paragraphs)
+    assert _count(store) == chunks
+    assert len(store.revisions("Copy")) == 1
+
+
+def test_commitKeys(tmp_path):
+    store = RevisionStore(str(tmp_path))
+    paragraphs = _paragraphs(20)
+    keys, chunks = paragraphChunks(paragraphs)
+    with pytest.raises(ValueError):
+        store.commitKeys("Story", keys, 100)
+    revision = store.commitKeys("Story", keys, 100, chunks)
+    assert store.paragraphs(revision) == paragraphs
+    # the paragraphs are stored now
+    assert store.commitKeys("Story", keys[:10], 50)['paragraphs'] == 10
+
+
+def _text(text):
+    return [[(line, {})] for line in text.split()]
+
+
+def test_diff(tmp_path):
+    store = RevisionStore(str(tmp_path))
+    old = store.commit("Story", _text("a b c d e f g h"))
+    new = store.commit("Story", _text("a b X d e f g h Y"))
+    assert store.diff(old, new, context=1) == [
+        (None, 1), (' ', "b"), ('-', "c"), ('+', "X"), (' ', "d"), (None, 3),
+        (' ', "h"), ('+', "Y")]
+    assert store.diff(old, new, context=3) == [
+        (' ', "a"), (' ', "b"), ('-', "c"), ('+', "X"), (' ', "d"), (' ', "e"),
+        (' ', "f"), (' ', "g"), (' ', "h"), ('+', "Y")]
+    assert store.diff(None, old) == [('+', text) for text in "abcdefgh"]
+    assert store.diff(old, old) == [(None, 8)]
+
+
+def test_prune(tmp_path):
+    store = RevisionStore(str(tmp_path))
+    now = 1000 * day
+    times = {
+        # within keepAll days: all kept
+        'recent':[now - 1 * day - 100, now - 1 * day - 50, now - 2 * day],
+        # within keepDaily days: the last of each day
+        'daily':[now - 20 * day + 10, now - 20 * day + 20, now - 20 * day + 30,
+                 now - 21 * day + 10],
+        # older: the last of each week
+        'weekly':[now - 200 * day, now - 200 * day + 10, now - 250 * day,
+                  now - 251 * day, now - 300 * day],
+    }
+    for n, t in enumerate(sorted(sum(times.values(), []))):
+        store.commit("Story", _text(f"revision {n}"), t=t)
+        store.commit("Other", _text(f"other {n}"), t=t)
+    # the latest revision of "Old" is kept however old it is
+    store.commit("Old", _text("old"), t=now - 400 * day)
+    store.commit("Old", _text("older"), t=now - 399 * day)
+
+    times = [revision['time'] for revision in store.revisions("Story")]
+    removed = store.prune(keepAll=7, keepDaily=90, now=now)
+    kept = [revision['time'] for revision in store.revisions("Story")]
+
+    def weekOf(t):
+        return int(t // (7 * day))
+
+    weeks = {}
+    for t in times:
+        if now - t >= 90 * day:
+            weeks[weekOf(t)] = max(weeks.get(weekOf(t), t), t)
+    assert kept == sorted([now - 2 * day, now - 1 * day - 100, now - 1 * day - 50,
+                           now - 21 * day + 10, now - 20 * day + 30]
+                          + list(weeks.values()))
+    assert [revision['time'] for revision in store.revisions("Other")] == kept
+    assert [revision['time'] for revision in store.revisions("Old")] == [now - 399 * day]
+    assert removed == 2 * (len(times) - len(kept)) + 1
+
+    # and the store reads the pruned list back
+    assert RevisionStore(str(tmp_path)).revisions("Story") == store.revisions("Story")
+
+
+def test_collectGarbage(tmp_path):
+    store = RevisionStore(str(tmp_path))
+    rng = random.Random(1)
+    paragraphs = _paragraphs(200)
+    saved = []
+    t = 0
+    for n in range(30):
+        # edit, insert and delete paragraphs, as writing does
+        for _ in range(5):
+            m = rng.randrange(len(paragraphs))
+            action = rng.random()
+            if action < 0.6:
+                paragraphs[m] = [(f"edit {n} {m}", {'italic':True})]
+            elif action < 0.8:
+                paragraphs.insert(m, [(f"insert {n} {m}", {})])
+            else:
+                del paragraphs[m]
+        t += 5 * day
+        revision = store.commit("Story", list(paragraphs), t=t)
+        saved.append((revision, [paragraphBytes(runs) for runs in paragraphs]))
+
+    assert store.prune(keepAll=7, keepDaily=30, now=t) > 0
+    assert store.collectGarbage() > 0
+    # nothing more to free
+    assert store.collectGarbage() == 0
+
+    store = RevisionStore(str(tmp_path))
+    kept = store.revisions("Story")
+    assert kept[-1]['id'] == saved[-1][0]['id']
+    original = {revision['id']:data for revision, data in saved}
+    for revision in kept:
+        restored = [paragraphBytes(runs) for runs in store.paragraphs(revision)]
+        assert restored == original[revision['id']]
+    # new commits can use the paragraphs which were kept
+    assert store.commit("Story", paragraphs, t=t + 1) == kept[-1]
+
+
+def test_rebuildIndex(tmp_path):
+    store = RevisionStore(str(tmp_path))
+    paragraphs = _paragraphs(50)
+    revision = store.commit("Story", paragraphs)
+    # index lost, e.g. if interrupted while garbage was collected
+    os.remove(store.indexPath)
+    assert RevisionStore(str(tmp_path)).paragraphs(revision) == paragraphs
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 14:08:51 2026
+
+@author: keziah
+"""
+
+import os
+import pytest
+from storyteller.storage import FileStorage, SqliteStorage, StorageError
+
+_bold = {'bold':True}
+
+
+def _story(words, title="Story"):
+    return [[(title, _bold)],
+            [("Some ", {}), ("bold", _bold), (" words", {})],
+            [(" ".join(["word"] * words), {})]]
+
+
+@pytest.fixture(params=['files', 'sqlite'])
+def storage(request, tmp_path):
+    if request.param == 'files':
+        return FileStorage(str(tmp_path))
+    return SqliteStorage(str(tmp_path / 'stories.sqlite'))
+
+
+def test_saveAndLoad(storage):
+    paragraphs = _story(10)
+    header = storage.save('2026-10-01 First.story', "First", paragraphs, goal=500)
+    assert header['wordcount'] == 14
+    assert storage.exists('2026-10-01 First.story')
+    assert not storage.exists('2026-10-01 Second.story')
+
+    header, loaded = storage.load('2026-10-01 First.story')
+    assert loaded == paragraphs
+    assert header['title'] == "First"
+    assert header['goal'] == 500
+    assert storage.text('2026-10-01 First.story') == "Story\nSome bold words\n" + " ".join(["word"] * 10)
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_saveAgain(storage, compress):
+    storage.save('2026-10-01 First.story', "First", _story(10), compress=compress)
+    paragraphs = _story(3, title="Changed")
+    storage.save('2026-10-01 First.story', "First", paragraphs, compress=compress)
+    assert storage.load('2026-10-01 First.story')[1] == paragraphs
+    assert storage.record('2026-10-01 First.story').wordcount == 7
+
+
+def test_recordsAndQuery(storage):
+    stories = [('2026-09-01 Winter.story', 2), ('2026-10-01 Summer days.story', 4),
+               ('2026-10-05 Summer nights.story', 6), ('2026-10-09 Autumn.story', 8)]
+    for filename, words in stories:
+        storage.save(filename, filename[11:-6], _story(words))
+
+    records = {record.filename:record for record in storage.records()}
+    assert set(records) == {filename for filename, _ in stories}
+    assert records['2026-10-01 Summer days.story'].title == "Summer days"
+    assert records['2026-10-01 Summer days.story'].date == "2026-10-01"
+    assert records['2026-10-01 Summer days.story'].wordcount == 8
+
+    def names(records):
+        return [record.filename for record in records]
+
+    assert names(storage.query()) == ['2026-10-09 Autumn.story',
+                                      '2026-10-05 Summer nights.story',
+                                      '2026-10-01 Summer days.story',
+                                      '2026-09-01 Winter.story']
+    assert names(storage.query(title="summer")) == ['2026-10-05 Summer nights.story',
+                                                    '2026-10-01 Summer days.story']
+    assert names(storage.query(since="2026-10-01", limit=2)) == ['2026-10-09 Autumn.story',
+                                                                 '2026-10-05 Summer nights.story']
+    assert names(storage.query(title="%")) == []
+
+
+def test_delete(storage):
+    storage.save('2026-10-01 First.story', "First", _story(1))
+    storage.save('2026-10-02 Second.story', "Second", _story(2))
+    storage.delete('2026-10-01 First.story')
+    assert not storage.exists('2026-10-01 First.story')
+    assert [record.filename for record in storage.records()] == ['2026-10-02 Second.story']
+    with pytest.raises(OSError):
+        storage.load('2026-10-01 First.story')
+
+
+def test_missingStory(storage):
+    with pytest.raises(OSError):
+        storage.readChapterTable('2026-10-01 Missing.story')
+    if isinstance(storage, SqliteStorage):
+        with pytest.raises(StorageError):
+            storage.record('2026-10-01 Missing.story')
+
+
+def test_changesFindsModified(storage):
+    storage.save('2026-10-01 First.story', "First", _story(1))
+    storage.save('2026-10-02 Second.story', "Second", _story(2))
+    records = {record.filename:record for record in storage.records()}
+    assert storage.changes(records) == ([], [])
+
+    storage.save('2026-10-02 Second.story', "Second", _story(20))
+    if isinstance(storage, FileStorage):
+        # in case the file system's times are coarse
+        path = os.path.join(storage.path, '2026-10-02 Second.story')
+        mtime = records['2026-10-02 Second.story'].mtime
+        os.utime(path, (mtime + 10, mtime + 10))
+    changed, removed = storage.changes(records)
+    assert removed == []
+    assert [(record.filename, record.wordcount) for record in changed] == \
+           [('2026-10-02 Second.story', 24)]
+
+
+def test_changesFindsRemoved(storage):
+    storage.save('2026-10-01 First.story', "First", _story(1))
+    records = {record.filename:record for record in storage.records()}
+    storage.delete('2026-10-01 First.story')
+    assert storage.changes(records) == ([], ['2026-10-01 First.story'])
+
+
+def test_renamedFileKeepsRecord(tmp_path):
+    storage = FileStorage(str(tmp_path))
+    storage.save('2026-10-01 First.story', "First", _story(5), goal=1000)
+    records = {record.filename:record for record in storage.records()}
+
+    os.rename(tmp_path / '2026-10-01 First.story', tmp_path / '2026-10-03 Renamed.story')
+    changed, removed = storage.changes(records)
+    assert removed == ['2026-10-01 First.story']
+    old = records['2026-10-01 First.story']
+    assert changed == [old._replace(filename='2026-10-03 Renamed.story',
+                                    date='2026-10-03', title="Renamed")]
+    assert changed[0].goal == 1000
+    # and the index keeps it
+    assert [record.filename for record in storage.records()] == ['2026-10-03 Renamed.story']
+
+
+def test_savedHtmlHidden(tmp_path):
+    storage = FileStorage(str(tmp_path))
+    with open(tmp_path / '2026-10-01 Old.html', 'w') as fileobj:
+        fileobj.write("<h1>Old</h1><html><body><p>Three old words</p></body></html>")
+    records = {record.filename:record for record in storage.records()}
+    assert list(records) == ['2026-10-01 Old.html']
+
+    # saved again in the native format, the html copy isn't listed
+    storage.save('2026-10-01 Old.story', "Old", _story(5))
+    changed, removed = storage.changes(records)
+    assert [record.filename for record in changed] == ['2026-10-01 Old.story']
+    assert removed == ['2026-10-01 Old.html']
+    assert [record.filename for record in storage.records()] == ['2026-10-01 Old.story']
+    assert [record.filename for record in FileStorage(str(tmp_path)).records()] == \
+           ['2026-10-01 Old.story']
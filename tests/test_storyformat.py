@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 16:32:10 2026
+
+@author: keziah
+"""
+
+import zlib
+import pytest
+from storyteller.storyformat import (decodeStory, encodeHeaderSlot, encodeStory,
+                                     readHeader, readStoryParagraphs, readStoryText,
+                                     slottedMagic, writeStory)
+from storyteller.storyparser import paragraphText
+from storyteller.wordcount import countWordsInText
+
+_story = [[("Chapter 1", {'bold':True, 'size':14.0})],
+          [("It was a ", {}), ("dark", {'italic':True}), (" and stormy ", {}),
+           ("night", {'bold':True, 'italic':True, 'underline':True}), (".", {})],
+          [],
+          [("Café — naïve “quotes” ", {'family':'Serif'}), ("日本語", {'strike':True})],
+          [("The end.", {})]]
+_text = "\n".join(paragraphText(runs) for runs in _story)
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_roundTrip(compress):
+    data = encodeStory("A story", _story, date="2026-10-26", goal=1000,
+                       compress=compress)
+    header, paragraphs = decodeStory(data)
+    assert paragraphs == _story
+    assert header == {'title':"A story", 'date':"2026-10-26", 'goal':1000,
+                      'wordcount':countWordsInText(_text),
+                      'compression':'zlib' if compress else None}
+
+
+def test_runsAreMerged():
+    # adjacent runs with the same format are stored, and read, as one
+    story = [[("one ", {'bold':True}), ("two", {'bold':True}), (" three", {'bold':False})]]
+    _, paragraphs = decodeStory(encodeStory("", story))
+    assert paragraphs == [[("one two", {'bold':True}), (" three", {})]]
+
+
+def test_emptyStory():
+    _, paragraphs = decodeStory(encodeStory("", [[]]))
+    assert paragraphs == [[]]
+
+
+def test_badMagic():
+    data = encodeStory("A story", _story)
+    with pytest.raises(ValueError):
+        decodeStory(b"STORY9" + data[6:])
+    with pytest.raises(ValueError):
+        decodeStory(b"<html>" + data)
+
+
+def _slottedStory(header, body, seqs=(1, 0)):
+    return slottedMagic + b"".join(encodeHeaderSlot(header, seq, 256) for seq in seqs) + body
+
+
+def test_badCrc():
+    header = {'title':"A story", 'compression':None}
+    body = encodeStory("A story", _story, compress=False).split(b"\n", 2)[2]
+    data = _slottedStory(header, body)
+    assert decodeStory(data) == (header, _story)
+
+    # a slot whose CRC doesn't match is ignored
+    first = len(slottedMagic)
+    bad = data[:first] + data[first:first+256].replace(b'"A story"', b'"B story"') + data[first+256:]
+    assert decodeStory(bad)[1] == _story
+    assert decodeStory(bad)[0]['title'] == "A story"
+
+    # and if neither matches, the story can't be read
+    bad = bad.replace(b'"A story"', b'"B story"')
+    with pytest.raises(ValueError):
+        decodeStory(bad)
+
+
+def test_newestSlot():
+    old = {'title':"Old", 'compression':None}
+    new = {'title':"New", 'compression':None}
+    body = encodeStory("", _story, compress=False).split(b"\n", 2)[2]
+    for first, second in [(old, new), (new, old)]:
+        seqs = (1, 2) if first is old else (2, 1)
+        data = slottedMagic + encodeHeaderSlot(first, seqs[0], 256) \
+            + encodeHeaderSlot(second, seqs[1], 256) + body
+        assert decodeStory(data)[0]['title'] == "New"
+
+
+def test_corruptBody():
+    data = encodeStory("A story", _story)
+    with pytest.raises((ValueError, zlib.error)):
+        decodeStory(data[:-10])
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_readFile(tmp_path, compress):
+    path = str(tmp_path / '2026-10-26 A story.story')
+    writeStory(path, "A story", _story, goal=500, compress=compress)
+    assert readHeader(path)['goal'] == 500
+    assert readStoryParagraphs(path) == ("A story", _story)
+    assert readStoryText(path) == _text
+
+
+def test_readHtml(tmp_path):
+    path = str(tmp_path / '2026-10-26 A story.html')
+    with open(path, 'w') as fileobj:
+        fileobj.write('<h1>A story</h1>\n<html><body>'
+                      '<p>It was a <span style=" font-style:italic;">dark</span> night.</p>\n'
+                      '<p>The end.</p></body></html>')
+    for chunkSize in [7, 65536]:
+        title, paragraphs = readStoryParagraphs(path, chunkSize)
+        assert title == "A story"
+        assert paragraphs == [[("It was a ", {}), ("dark", {'italic':True}), (" night.", {})],
+                              [("The end.", {})]]
+    assert readStoryText(path) == "It was a dark night.\nThe end."
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 13:15:09 2026
+
+@author: keziah
+"""
+
+import os
+import pytest
+from storyteller.storyformat import writeStory
+from storyteller.storyindex import StoryRecord
+from storyteller.textindex import TextIndex
+
+
+@pytest.mark.parametrize('query, terms', [
+    ('wolf', [('word', ['wolf'])]),
+    ('The, WOLF!', [('word', ['the']), ('word', ['wolf'])]),
+    ('"dark forest" wolf*', [('phrase', ['dark', 'forest']), ('prefix', ['wolf'])]),
+    ('"Dark,  forest." "single"', [('phrase', ['dark', 'forest']), ('word', ['single'])]),
+    ('"unclosed phrase', [('phrase', ['unclosed', 'phrase'])]),
+    ('"" * -- ""', []),
+    ('“curly” don’t*', [('word', ['curly']), ('prefix', ['don’t'])]),
+])
+def test_parseQuery(query, terms):
+    assert TextIndex.parseQuery(query) == terms
+
+
+def _index(tmp_path, stories):
+    index = TextIndex(str(tmp_path))
+    for filename, text in stories.items():
+        index.update(filename, text)
+    return index
+
+
+def _names(results):
+    return [filename for filename, _ in results]
+
+
+def test_search(tmp_path):
+    index = _index(tmp_path, {
+        'a': "The dark forest was quiet. A wolf howled.",
+        'b': "Forest paths are dark at night; wolfpacks hunt there.",
+        'c': "A bright meadow, far from any forest.",
+    })
+    assert sorted(_names(index.search("forest"))) == ['a', 'b', 'c']
+    # every term must match
+    assert sorted(_names(index.search("dark forest"))) == ['a', 'b']
+    # phrases must be in order and next to each other
+    assert _names(index.search('"dark forest"')) == ['a']
+    assert _names(index.search('"forest dark"')) == []
+    assert _names(index.search('"forest was quiet"')) == ['a']
+    # prefixes, and case and punctuation are ignored
+    assert sorted(_names(index.search("WOLF*"))) == ['a', 'b']
+    assert _names(index.search("Quiet!")) == ['a']
+    assert index.search("unicorn") == []
+    assert index.search("forest unicorn") == []
+    assert index.search("") == []
+
+
+def test_ranking(tmp_path):
+    index = _index(tmp_path, {
+        'once': "wolf " + "tree " * 20,
+        'often': "wolf " * 5 + "tree " * 16,
+        'short': "wolf tree",
+        'none': "tree " * 21,
+    })
+    # more occurrences rank higher, and a shorter story ranks higher for
+    # the same number
+    assert _names(index.search("wolf")) == ['often', 'short', 'once']
+    scores = dict(index.search("wolf"))
+    assert scores['often'] > scores['short'] > scores['once'] > 0
+    assert _names(index.search("wolf", limit=1)) == ['often']
+    # a word in every story counts for less than a rarer one
+    assert max(score for _, score in index.search("tree")) < scores['once']
+
+
+def test_reopen(tmp_path):
+    stories = {f"story {n}": f"chapter {n} the end of part {n % 3}" for n in range(20)}
+    index = _index(tmp_path, stories)
+    index.save()
+    index.update("story 3", "rewritten completely")
+    index.remove("story 4")
+    index.save()
+
+    reopened = TextIndex(str(tmp_path))
+    assert len(reopened) == 19
+    assert "story 4" not in reopened
+    for query in ["end", "rewritten", '"part 1"', "chap*", "4"]:
+        assert reopened.search(query) == index.search(query)
+
+    # an interrupted save leaves the records which were written
+    size = os.path.getsize(index.indexPath)
+    index.update("story 5", "added later")
+    index.save()
+    with open(index.indexPath, 'r+b') as fileobj:
+        fileobj.truncate(os.path.getsize(index.indexPath) - 3)
+    reopened = TextIndex(str(tmp_path))
+    assert reopened.search("later") == []
+    assert _names(reopened.search("rewritten")) == ["story 3"]
+    # and the next save writes over the damaged record
+    reopened.update("story 6", "added again")
+    reopened.save()
+    assert os.path.getsize(index.indexPath) > size
+    assert _names(TextIndex(str(tmp_path)).search("added")) == ["story 6"]
+
+
+def test_otherFormatIgnored(tmp_path):
+    with open(tmp_path / TextIndex.indexName, 'wb') as fileobj:
+        fileobj.write(b"\x80\x04not an index")
+    index = TextIndex(str(tmp_path))
+    assert len(index) == 0
+    index.update("story", "some words")
+    index.save()
+    assert _names(TextIndex(str(tmp_path)).search("words")) == ["story"]
+
+
+def _record(path, filename):
+    stat = os.stat(os.path.join(path, filename))
+    return StoryRecord(filename, filename[11:-6], filename[:10], 0, None,
+                       stat.st_size, stat.st_mtime)
+
+
+def test_refresh(tmp_path):
+    path = str(tmp_path)
+    names = ['2026-10-01 One.story', '2026-10-02 Two.story', '2026-10-03 Three.story']
+    for name in names:
+        writeStory(os.path.join(path, name), name[11:-6], [[(f"Story {name[11:-6]}", {})]])
+    index = TextIndex(path)
+    records = [_record(path, name) for name in names]
+    assert index.refresh(records) == []
+    assert sorted(_names(index.search("story"))) == sorted(names)
+
+    # removed stories are dropped
+    os.remove(os.path.join(path, names[0]))
+    records = records[1:]
+    # and unreadable ones are reported and left as they were,
+    damaged = os.path.join(path, names[1])
+    mtime = os.stat(damaged).st_mtime
+    with open(damaged, 'wb') as fileobj:
+        fileobj.write(b"garbage")
+    os.utime(damaged, (mtime + 10, mtime + 10))
+    records[0] = _record(path, names[1])
+    # and so are new ones, which aren't added
+    with open(os.path.join(path, '2026-10-04 Four.story'), 'wb') as fileobj:
+        fileobj.write(b"STORY1\n{")
+    records.append(_record(path, '2026-10-04 Four.story'))
+    failed = index.refresh(records)
+    assert sorted(filename for filename, _ in failed) == [names[1], '2026-10-04 Four.story']
+    assert sorted(_names(index.search("story"))) == sorted(names[1:])
+    assert '2026-10-04 Four.story' not in index
+
+    reopened = TextIndex(path)
+    assert sorted(_names(reopened.search("story"))) == sorted(names[1:])
+    # the unreadable stories are tried again next time
+    assert len(reopened.refresh(records)) == 2
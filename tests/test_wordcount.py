@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 10:14:52 2026
+
+@author: keziah
+"""
+
+import random
+import pytest
+from storyteller.storyparser import lineSeparator, storyText
+from storyteller.wordcount import (BlockWordCounter, countWordsInBytes,
+                                   countWordsInHtml, countWordsInText)
+
+_words = ["once", "upon", "a", "time", "don't", "café", "naïve", "—", "42",
+          "well...", "“quoted”"]
+_spaces = [" ", "  ", "\t", "\xa0", " ", "　", lineSeparator]
+
+# html written by Qt's QTextDocument.toHtml, after the story's <h1> title
+_htmlHeader = ('<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.0//EN" '
+               '"http://www.w3.org/TR/REC-html40/strict.dtd">\n'
+               '<html><head><meta name="qrichtext" content="1" />'
+               '<style type="text/css">\np, li { white-space: pre-wrap; }\n</style>'
+               '</head><body style=" font-family:\'Sans Serif\'; font-size:11pt; '
+               'font-weight:400; font-style:normal;">\n')
+_paraStyle = ('margin-top:0px; margin-bottom:0px; margin-left:0px; '
+              'margin-right:0px; -qt-block-indent:0; text-indent:0px;')
+_emptyStyle = '-qt-paragraph-type:empty; ' + _paraStyle
+# how whitespace and other characters can appear in the html
+_htmlSpaces = [" ", "&nbsp;", "&#160;", "&#x2009;", "　", "\t", "<br />",
+               "\xa0", "&ensp;"]
+_htmlWords = ["once", "upon", "&amp;", "&lt;tag&gt;", "caf&eacute;", "don&#39;t",
+              "naïve", "—", "&quot;hi&quot;"]
+
+
+def makeText(rng, maxWords=8):
+    """ Return random text of up to `maxWords` words, which may start or end
+        with whitespace.
+    """
+    parts = [rng.choice(_spaces) if rng.random() < 0.2 else ""]
+    for n in range(rng.randint(0, maxWords)):
+        if n:
+            parts.append(rng.choice(_spaces))
+        parts.append(rng.choice(_words))
+    if rng.random() < 0.2:
+        parts.append(rng.choice(_spaces))
+    return "".join(parts)
+
+
+def randomEdit(rng, blocks):
+    """ Make a random edit to list of block texts `blocks`, as a text editor
+        would, and return the number of the first block it touched.
+    """
+    first = rng.randrange(len(blocks))
+    kind = rng.choice(['insert', 'delete', 'split', 'paste'])
+    if kind == 'insert':
+        text = blocks[first]
+        pos = rng.randint(0, len(text))
+        blocks[first] = text[:pos] + makeText(rng, 3) + text[pos:]
+    elif kind == 'delete':
+        # from somewhere in one block to somewhere in the same or a later
+        # one, which joins them
+        last = rng.randrange(first, min(first + 3, len(blocks)))
+        start = rng.randint(0, len(blocks[first]))
+        end = rng.randint(0, len(blocks[last]))
+        if last == first:
+            start, end = sorted([start, end])
+        blocks[first:last+1] = [blocks[first][:start] + blocks[last][end:]]
+    elif kind == 'split':
+        text = blocks[first]
+        pos = rng.randint(0, len(text))
+        blocks[first:first+1] = [text[:pos], text[pos:]]
+    else:
+        text = blocks[first]
+        pos = rng.randint(0, len(text))
+        pasted = [makeText(rng) for _ in range(rng.randint(1, 4))]
+        pasted[0] = text[:pos] + pasted[0]
+        pasted[-1] += text[pos:]
+        blocks[first:first+1] = pasted
+    return first
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_randomEdits(seed):
+    """ The running count matches a full count after every edit. """
+    rng = random.Random(seed)
+    blocks = [makeText(rng) for _ in range(rng.randint(1, 10))]
+    counter = BlockWordCounter()
+    counter.reset(blocks)
+    for _ in range(200):
+        before = len(blocks)
+        first = randomEdit(rng, blocks)
+        # every block from `first` whose position changed could have changed
+        touched = max(1, len(blocks) - before + 1)
+        assert counter.update(first, blocks[first:first+touched], len(blocks))
+        assert counter.counts == [countWordsInText(text) for text in blocks]
+        assert counter.total == countWordsInText("\n".join(blocks))
+
+
+def test_updateOutOfRange():
+    """ An edit which doesn't fit the cached blocks asks for a reset. """
+    counter = BlockWordCounter()
+    counter.reset(["one two", "three"])
+    assert not counter.update(5, ["four"], 2)
+    assert not counter.update(0, [], 2)
+    assert not counter.update(0, ["a", "b", "c", "d"], 3)
+    assert counter.total == 3
+
+
+
+def makeParagraphHtml(rng):
+    """ Return a random paragraph of Qt html. """
+    if rng.random() < 0.1:
+        return f'<p style="{_emptyStyle}"><br /></p>'
+    parts = []
+    for n in range(rng.randint(0, 12)):
+        if n or rng.random() < 0.2:
+            parts.append(rng.choice(_htmlSpaces))
+        word = rng.choice(_htmlWords)
+        if rng.random() < 0.2:
+            word = f'<span style=" font-weight:600;">{word}</span>'
+        elif word.isalpha() and rng.random() < 0.1:
+            # formatting can change in the middle of a word
+            word = f'{word[:1]}<span style=" font-style:italic;">{word[1:]}</span>'
+        parts.append(word)
+    return f'<p style="{_paraStyle}">{"".join(parts)}</p>'
+
+
+def makeStoryHtml(rng, title="Title"):
+    """ Return random story html, as saved by the editor. """
+    body = "\n".join(makeParagraphHtml(rng) for _ in range(rng.randint(0, 20)))
+    return f"<h1>{title}</h1>" + _htmlHeader + body + "</body></html>"
+
+
+def test_countWordsInText():
+    assert countWordsInText("") == 0
+    assert countWordsInText(" \t\n") == 0
+    assert countWordsInText("one two\xa0three\u2009four") == 4
+    assert countWordsInText(f"one{lineSeparator}two") == 2
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_countWordsInBytes(seed):
+    """ Counting UTF-8 bytes matches counting the decoded text. """
+    rng = random.Random(seed)
+    text = "".join(makeText(rng) + rng.choice(_spaces) for _ in range(20))
+    assert countWordsInBytes(text.encode()) == countWordsInText(text)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_countWordsInHtml(seed):
+    """ Counting words in story html matches counting the words in the text
+        it is parsed into.
+    """
+    rng = random.Random(seed)
+    html = makeStoryHtml(rng, title=" ".join(["not", "counted"] * seed))
+    expected = countWordsInText(storyText(html))
+    assert countWordsInHtml(html.encode()) == expected
+
+
+@pytest.mark.parametrize('html, expected', [
+    ('<h1>Title</h1><html><body><p>one&nbsp;two</p></body></html>', 2),
+    ('<h1>Title</h1><html><body><p>one<br />two</p></body></html>', 2),
+    ('<h1>Title</h1><html><body><p>one<span>two</span></p></body></html>', 1),
+    ('<h1>Title</h1><html><body><p>one</p><p>two</p></body></html>', 2),
+    ('<h1>Title</h1><html><body><p>one&#x3000;two&ensp;three</p></body></html>', 3),
+    ('<h1>Title</h1><html><body><p>one&amp;two</p></body></html>', 1),
+    ('<h1>Title</h1><html><head><title>a b</title></head>'
+     '<body><!-- c d --><p>one</p></body></html>', 1),
+    ('<p>no html tag</p>', 0),
+])
+def test_countWordsInHtmlCases(html, expected):
+    assert countWordsInText(storyText(html)) == expected
+    assert countWordsInHtml(html.encode()) == expected